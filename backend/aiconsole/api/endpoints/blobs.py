@@ -0,0 +1,41 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import mimetypes
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from aiconsole.core.blobs.blob_store import BLOB_NAME_RE, BlobStore
+
+router = APIRouter()
+
+
+@router.get("/api/blobs/{name}")
+async def get_blob(name: str):
+    if not BLOB_NAME_RE.match(name):
+        raise HTTPException(status_code=400, detail="Invalid blob name")
+
+    path = BlobStore().get_path(name)
+
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    # Blobs are named after their content, so they never change
+    return FileResponse(
+        str(path),
+        media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{name}"'},
+    )
@@ -17,10 +17,22 @@
 
 from fastapi import APIRouter
 
-from aiconsole.api.endpoints.chats import chat, chat_options, index
+from aiconsole.api.endpoints.chats import (
+    chat,
+    chat_options,
+    export,
+    import_chats,
+    index,
+    migrate,
+    search,
+)
 
 router = APIRouter()
 
 router.include_router(index.router)
 router.include_router(chat.router)
 router.include_router(chat_options.router)
+router.include_router(migrate.router)
+router.include_router(search.router)
+router.include_router(export.router)
+router.include_router(import_chats.router)
@@ -16,7 +16,12 @@
 from fastapi import APIRouter, Response, status
 from send2trash import send2trash
 
-from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_journal import close_chat_journal, get_chat_journal_path
+from aiconsole.core.chat.chat_search_index import get_chat_search_index
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.chat_window import read_older_message_groups
+from aiconsole.core.chat.locking import read_chat_outside_of_lock
 from aiconsole.core.chat.save_chat_history import save_chat_history
 from aiconsole.core.project.paths import get_history_directory
 
@@ -25,9 +30,15 @@ router = APIRouter()
 
 @router.delete("/{chat_id}")
 async def delete_history(chat_id: str):
-    file_path = get_history_directory() / f"{chat_id}.json"
-    if file_path.exists():
-        send2trash(file_path)
+    store = get_chat_store()
+    journal_path = get_chat_journal_path(chat_id)
+    if store.get_version(chat_id) is not None or journal_path.exists():
+        close_chat_journal(chat_id)
+        chat_cache().invalidate(chat_id)
+        await store.delete(chat_id)
+        if journal_path.exists():
+            send2trash(journal_path)
+        await get_chat_search_index().remove(chat_id)
         return Response(
             status_code=status.HTTP_200_OK,
             content="Chat history deleted successfully",
@@ -44,10 +55,18 @@ async def get_history_path(chat_id: str):
     return {"path": str(get_history_directory() / f"{chat_id}.json")}
 
 
+@router.get("/{chat_id}/message_groups")
+async def get_message_groups(chat_id: str, before: str, limit: int = 50):
+    chat_window = await read_older_message_groups(chat_id, before, limit)
+    return {"message_groups": chat_window.chat.message_groups, "cursor": chat_window.cursor}
+
+
 @router.patch("/{chat_id}")
 async def chat_options(chat_id: str, chat_odj: dict):
-    chat = await load_chat_history(id=chat_id)
+    chat = await read_chat_outside_of_lock(chat_id)
     if chat_odj.get("name"):
         chat.name = str(chat_odj.get("name"))
-        save_chat_history(chat, scope="name")
+        chat.title_edited = True
+        chat.mark_dirty("name")
+        await save_chat_history(chat, scope="name")
     return Response(status_code=status.HTTP_200_OK)
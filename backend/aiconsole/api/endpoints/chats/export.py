@@ -0,0 +1,70 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from aiconsole.core.chat.chat_export import (
+    ChatExportFormat,
+    export_chat,
+    export_project_chats,
+)
+from aiconsole.core.chat.chat_journal import get_chat_journal_path
+from aiconsole.core.chat.locking import (
+    chats,
+    get_chat_snapshot,
+    read_chat_outside_of_lock,
+)
+
+router = APIRouter()
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "markdown": "text/markdown",
+}
+
+_EXTENSIONS = {
+    "ndjson": "ndjson",
+    "markdown": "md",
+}
+
+
+@router.get("/export")
+async def export_all_chats(format: ChatExportFormat = "ndjson"):
+    return StreamingResponse(
+        export_project_chats(format),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="chats.{_EXTENSIONS[format]}"'},
+    )
+
+
+@router.get("/{chat_id}/export")
+async def export_single_chat(chat_id: str, format: ChatExportFormat = "ndjson"):
+    document = None
+
+    # Chats in use or with journaled mutations are newer in memory than in the store
+    if chat_id in chats or get_chat_journal_path(chat_id).exists():
+        chat = get_chat_snapshot(await read_chat_outside_of_lock(chat_id))
+        document = chat.model_dump(mode="json", exclude={"id", "last_modified"})
+
+    chunks = export_chat(chat_id, format, document=document)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    return StreamingResponse(
+        chunks,
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{chat_id}.{_EXTENSIONS[format]}"'},
+    )
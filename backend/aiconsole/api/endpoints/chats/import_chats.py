@@ -0,0 +1,74 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from aiconsole.api.websockets.connection_manager import connection_manager
+from aiconsole.api.websockets.server_messages import ChatImportProgressServerMessage
+from aiconsole.core.chat.chatgpt_import import (
+    ChatImportProgress,
+    import_chatgpt_conversations,
+)
+from aiconsole.core.project.paths import get_project_directory
+
+_log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Running imports, so their tasks are not garbage collected
+_imports: dict[str, asyncio.Task] = {}
+
+
+class ImportChatGPTConversations(BaseModel):
+    path: str  # conversations.json of a ChatGPT data export
+
+
+@router.post("/import/chatgpt")
+async def import_chatgpt(request: ImportChatGPTConversations):
+    """Starts the import, its progress is sent to all connections as ChatImportProgressServerMessage."""
+    file_path = Path(request.path)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    import_id = str(uuid4())
+    project_path = get_project_directory()
+
+    async def send_progress(progress: ChatImportProgress, is_finished: bool = False, error: str | None = None):
+        await connection_manager().send_to_all(
+            ChatImportProgressServerMessage(
+                import_id=import_id, is_finished=is_finished, error=error, **asdict(progress)
+            )
+        )
+
+    async def run_import():
+        try:
+            progress = await import_chatgpt_conversations(file_path, project_path, on_progress=send_progress)
+            await send_progress(progress, is_finished=True)
+        except Exception as e:
+            _log.exception(f"Failed to import {file_path}: {e}")
+            await send_progress(ChatImportProgress(), is_finished=True, error=str(e))
+        finally:
+            _imports.pop(import_id, None)
+
+    _imports[import_id] = asyncio.create_task(run_import())
+
+    return {"import_id": import_id}
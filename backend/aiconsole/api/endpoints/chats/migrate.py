@@ -0,0 +1,29 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from dataclasses import asdict
+
+from fastapi import APIRouter
+
+from aiconsole.core.chat.chat_migrations import migrate_project_chats
+
+router = APIRouter()
+
+
+@router.post("/migrate")
+async def migrate_chats():
+    """Upgrades all chats of the project to the current chat schema, so loading them skips the migrations."""
+    report = await migrate_project_chats()
+    return asdict(report)
@@ -0,0 +1,41 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi import APIRouter
+
+from aiconsole.api.websockets.connection_manager import connection_manager
+from aiconsole.core.chat.chat_lock_manager import chat_locks_stats
+from aiconsole.core.chat.chat_mutation_actor import chat_mutation_actors_stats
+
+router = APIRouter()
+
+
+@router.get("/api/metrics/chat_mutations")
+async def chat_mutations_metrics():
+    """Queue depth and latency of the per chat mutation workers."""
+    return chat_mutation_actors_stats()
+
+
+@router.get("/api/metrics/chat_locks")
+async def chat_locks_metrics():
+    """Holders, queue length and wait and hold times of the per chat locks."""
+    return chat_locks_stats()
+
+
+@router.get("/api/metrics/websockets")
+async def websockets_metrics():
+    """Outgoing queue depth, sent and dropped messages and send times of the websocket connections."""
+    return connection_manager().stats()
@@ -52,4 +52,7 @@ async def websocket_endpoint(
                 _log.exception(e)
                 _log.error(f"Error handling message: {e}")
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also after the connection was closed as a slow consumer
         connection_manager.disconnect(connection)
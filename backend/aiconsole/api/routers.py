@@ -18,12 +18,14 @@ from fastapi import APIRouter
 
 from aiconsole.api.endpoints import (
     agents,
+    blobs,
     chats,
     check_key,
     commands_history,
     genui,
     image,
     materials,
+    metrics,
     ping,
     profile,
     projects,
@@ -34,8 +36,10 @@ from aiconsole.api.endpoints import (
 app_router = APIRouter()
 
 app_router.include_router(ping.router)
+app_router.include_router(metrics.router)
 app_router.include_router(genui.router)
 app_router.include_router(image.router)
+app_router.include_router(blobs.router)
 app_router.include_router(check_key.router)
 app_router.include_router(profile.router, tags=["Profile"])
 app_router.include_router(chats.router, prefix="/api/chats", tags=["Chats"])
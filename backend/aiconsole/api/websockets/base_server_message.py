@@ -1,3 +1,5 @@
+import json
+
 from pydantic import BaseModel
 
 
@@ -8,3 +10,16 @@ class BaseServerMessage(BaseModel):
     def model_dump(self, **kwargs):
         # Don't include None values, call to super to avoid recursion
         return {k: v for k, v in super().model_dump(**kwargs).items() if v is not None}
+
+    def to_frame_data(self) -> dict:
+        """The message as it is sent over the websocket, before it is encoded."""
+        return {"type": self.get_type(), **self.model_dump(exclude_none=True, mode="json")}
+
+    def encode(self) -> str:
+        """The message as a websocket text frame."""
+        return encode_frame(self.to_frame_data())
+
+
+def encode_frame(data: dict) -> str:
+    # Same encoding as WebSocket.send_json
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
@@ -47,6 +47,18 @@ class ReleaseLockClientMessage(BaseClientMessage):
 
 class OpenChatClientMessage(BaseClientMessage):
     request_id: str
+    # Number of the last message groups to send, all of them if None
+    window: int | None = None
+    # When reopening, stream_id and seq of the last received mutation. Only the mutations published after it
+    # are sent if they are still kept, a ChatOpenedServerMessage otherwise
+    stream_id: str | None = None
+    since_seq: int | None = None
+
+
+class FetchOlderMessageGroupsClientMessage(BaseClientMessage):
+    request_id: str
+    before: str
+    limit: int
 
 
 class StopChatClientMessage(BaseClientMessage):
@@ -15,17 +15,38 @@
 # limitations under the License.
 """
 Connection manager for websockets. Keeps track of all active connections
+
+Every connection has a bounded queue of outgoing messages drained by its own writer task,
+so sending never waits for a browser and one slow connection does not hold back the others.
 """
+import asyncio
 import logging
-from dataclasses import dataclass
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
 from functools import lru_cache
+from typing import Literal
+from uuid import uuid4
 
 from fastapi import WebSocket
 
-from aiconsole.api.websockets.base_server_message import BaseServerMessage
+from aiconsole.api.websockets.base_server_message import BaseServerMessage, encode_frame
+from aiconsole.api.websockets.server_messages import (
+    ChatMutationAckServerMessage,
+    ChatResyncRequiredServerMessage,
+    NotifyAboutChatMutationServerMessage,
+)
+from aiconsole.consts import (
+    CHAT_MUTATION_LOG_MAX_CHATS,
+    CHAT_MUTATION_LOG_SIZE,
+    WEBSOCKET_SEND_QUEUE_SIZE,
+    WEBSOCKET_SLOW_CONSUMER_POLICY,
+)
 
 _log = logging.getLogger(__name__)
 
+SlowConsumerPolicy = Literal["resync", "disconnect"]
+
 
 @dataclass(frozen=True)
 class AcquiredLock:
@@ -33,19 +54,201 @@ class AcquiredLock:
     request_id: str
 
 
+@dataclass
+class OutgoingFrame:
+    data: dict
+    chat_id: str | None  # set for chat mutations, which can be dropped and replaced by a resync
+    _text: str | None = field(default=None, repr=False, compare=False)
+
+    @staticmethod
+    def of(msg: BaseServerMessage) -> "OutgoingFrame":
+        # Dumped right away, messages may reference chats that keep changing until they are written
+        return OutgoingFrame(
+            data=msg.to_frame_data(),
+            chat_id=msg.chat_id if isinstance(msg, NotifyAboutChatMutationServerMessage) else None,
+        )
+
+    def encode(self) -> str:
+        """Encoded once, however many connections the frame is queued on."""
+        if self._text is None:
+            self._text = encode_frame(self.data)
+        return self._text
+
+
+class ChatMutationLog:
+    """
+    Mutation frames recently published to a chat, numbered by seq in publishing order.
+
+    Every log has its own stream_id, a seq from before a restart or from an evicted log is never mistaken for one of it.
+    """
+
+    def __init__(self, max_size: int = CHAT_MUTATION_LOG_SIZE):
+        self.stream_id = uuid4().hex
+        self.seq = 0
+        self._frames: deque[tuple[int, OutgoingFrame]] = deque(maxlen=max_size)
+
+    def next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def append(self, seq: int, frame: OutgoingFrame) -> None:
+        self._frames.append((seq, frame))
+
+    def since(self, stream_id: str, seq: int) -> list[OutgoingFrame] | None:
+        """Frames published after seq, None if they are not all kept."""
+        if stream_id != self.stream_id or seq > self.seq or seq < 0:
+            return None
+
+        if seq == self.seq:
+            return []
+
+        if not self._frames or self._frames[0][0] > seq + 1:
+            return None
+
+        return [frame for frame_seq, frame in self._frames if frame_seq > seq]
+
+
 class AICConnection:
-    def __init__(self, websocket: WebSocket):
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue_size: int = WEBSOCKET_SEND_QUEUE_SIZE,
+        slow_consumer_policy: SlowConsumerPolicy = WEBSOCKET_SLOW_CONSUMER_POLICY,  # type: ignore[assignment]
+    ):
         self.websocket = websocket
         self.open_chats_ids: set[str] = set()
         self.acquired_locks: list[AcquiredLock] = []
 
+        self.max_queue_size = max_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.is_closed = False
+        self._queue: deque[OutgoingFrame] = deque()
+        self._has_messages = asyncio.Event()
+        self._is_drained = asyncio.Event()
+        self._is_sending = False
+        self._writer: asyncio.Task | None = None
+        # Kept so the task closing a slow consumer is not garbage collected before it finishes
+        self._closer: asyncio.Task | None = None
+
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.resync_count = 0
+        self.max_queue_depth = 0
+        self.total_send_time = 0.0
+        self.max_send_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue) + (1 if self._is_sending else 0)
+
     async def send(self, msg: BaseServerMessage):
-        await self.websocket.send_json({"type": msg.get_type(), **msg.model_dump(exclude_none=True, mode="json")})
+        """Enqueues the message without waiting for it to be written."""
+        self.enqueue(msg)
+
+    def enqueue(self, msg: BaseServerMessage) -> None:
+        if not self.is_closed:
+            self.enqueue_frame(OutgoingFrame.of(msg))
+
+    async def drain(self) -> None:
+        """Waits until all messages enqueued so far are written or the connection is closed."""
+        while (self._queue or self._is_sending) and not self.is_closed:
+            self._is_drained.clear()
+            await self._is_drained.wait()
+
+    def close(self) -> None:
+        self.is_closed = True
+        self._queue.clear()
+        self._is_drained.set()
+        if self._writer is not None:
+            self._writer.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "open_chats_ids": sorted(self.open_chats_ids),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "sent_count": self.sent_count,
+            "dropped_count": self.dropped_count,
+            "resync_count": self.resync_count,
+            "avg_send_time": self.total_send_time / self.sent_count if self.sent_count else 0.0,
+            "max_send_time": self.max_send_time,
+            "is_closed": self.is_closed,
+        }
+
+    def enqueue_frame(self, frame: OutgoingFrame) -> None:
+        if self.is_closed:
+            return
+
+        if len(self._queue) >= self.max_queue_size and not self._handle_slow_consumer():
+            return
+
+        self._queue.append(frame)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._has_messages.set()
+
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+
+    def _handle_slow_consumer(self) -> bool:
+        """Makes room in the full queue, returns False if the connection was closed instead."""
+        if self.slow_consumer_policy == "resync":
+            # Mutations are not needed by a client that reopens their chats, everything else is kept in order
+            chat_ids = {message.chat_id for message in self._queue if message.chat_id is not None}
+            kept = [message for message in self._queue if message.chat_id is None]
+
+            if chat_ids and len(kept) < self.max_queue_size:
+                _log.warning(f"Connection fell behind, dropping {len(self._queue) - len(kept)} chat mutations")
+                self.dropped_count += len(self._queue) - len(kept)
+                self.resync_count += 1
+                self._queue = deque(kept)
+                self._queue.append(OutgoingFrame.of(ChatResyncRequiredServerMessage(chat_ids=sorted(chat_ids))))
+                return True
+
+        _log.warning(f"Connection fell behind with {len(self._queue)} queued messages, disconnecting")
+        self.dropped_count += len(self._queue) + 1
+        self.close()
+        self._closer = asyncio.create_task(self._close_websocket())
+        return False
+
+    async def _write(self) -> None:
+        while not self.is_closed:
+            if not self._queue:
+                self._is_drained.set()
+                self._has_messages.clear()
+                await self._has_messages.wait()
+                continue
+
+            frame = self._queue.popleft()
+            self._is_sending = True
+            start = time.monotonic()
+            try:
+                await self.websocket.send_text(frame.encode())
+            except Exception as e:
+                _log.info(f"Failed to send a message, closing the connection: {e}")
+                self.close()
+                return
+            finally:
+                self._is_sending = False
+
+            send_time = time.monotonic() - start
+            self.sent_count += 1
+            self.total_send_time += send_time
+            self.max_send_time = max(self.max_send_time, send_time)
+
+    async def _close_websocket(self) -> None:
+        try:
+            await self.websocket.close(code=1013)  # try again later
+        except Exception as e:
+            _log.debug(f"Failed to close the websocket: {e}")
 
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: list[AICConnection] = []
+        # Connections that have a chat open, kept in sync with their open_chats_ids
+        self._chat_subscribers: dict[str, set[AICConnection]] = {}
+        # Least recently published last
+        self._chat_mutation_logs: OrderedDict[str, ChatMutationLog] = OrderedDict()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -55,19 +258,104 @@ class ConnectionManager:
         return connection
 
     def disconnect(self, connection: AICConnection):
-        self.active_connections.remove(connection)
+        if connection in self.active_connections:
+            self.active_connections.remove(connection)
+        for chat_id in list(connection.open_chats_ids):
+            self.unsubscribe(connection, chat_id)
+        connection.close()
         _log.info("Disconnected")
 
+    def subscribe(self, connection: AICConnection, chat_id: str) -> None:
+        connection.open_chats_ids.add(chat_id)
+        self._chat_subscribers.setdefault(chat_id, set()).add(connection)
+
+    def unsubscribe(self, connection: AICConnection, chat_id: str) -> None:
+        connection.open_chats_ids.discard(chat_id)
+
+        subscribers = self._chat_subscribers.get(chat_id)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._chat_subscribers[chat_id]
+
+    def get_chat_stream_position(self, chat_id: str) -> tuple[str, int]:
+        """stream_id and seq of the last mutation published to the chat, a snapshot taken now includes it."""
+        log = self._get_chat_mutation_log(chat_id)
+        return log.stream_id, log.seq
+
+    def resume_chat(self, connection: AICConnection, chat_id: str, stream_id: str, since_seq: int) -> bool:
+        """
+        Subscribes the connection to the chat and sends it the mutations published after since_seq.
+        Returns False without subscribing if they are not all kept, the chat has to be opened from a snapshot then.
+        """
+        log = self._chat_mutation_logs.get(chat_id)
+        frames = log.since(stream_id, since_seq) if log is not None else None
+        if frames is None:
+            return False
+
+        self.subscribe(connection, chat_id)
+        for frame in frames:
+            connection.enqueue_frame(frame)
+
+        return True
+
     async def send_to_chat(
         self, message: BaseServerMessage, chat_id: str, except_connection: AICConnection | None = None
     ):
-        for connection in self.active_connections:
-            if chat_id in connection.open_chats_ids and except_connection != connection:
-                await connection.send(message)
+        frame: OutgoingFrame | None = None
+        except_frame: OutgoingFrame | None = None
+
+        if isinstance(message, NotifyAboutChatMutationServerMessage):
+            # Kept even without subscribers, clients that reconnect later may have missed it
+            log = self._get_chat_mutation_log(chat_id)
+            message.seq = log.next_seq()
+            frame = OutgoingFrame.of(message)
+            log.append(message.seq, frame)
+
+            # The client the mutation came from gets only its seq, a gap in its seqs would make it reopen the chat
+            except_frame = OutgoingFrame.of(
+                ChatMutationAckServerMessage(request_id=message.request_id, chat_id=chat_id, seq=message.seq)
+            )
+
+        subscribers = self._chat_subscribers.get(chat_id)
+        if not subscribers:
+            return
+
+        # Enqueued without awaiting, so a chat snapshot taken later already contains the message
+        frame = frame or OutgoingFrame.of(message)
+        for connection in subscribers:
+            if connection is not except_connection:
+                connection.enqueue_frame(frame)
+            elif except_frame is not None:
+                connection.enqueue_frame(except_frame)
 
     async def send_to_all(self, message: BaseServerMessage):
+        if not self.active_connections:
+            return
+
+        frame = OutgoingFrame.of(message)
         for connection in self.active_connections:
-            await connection.send(message)
+            connection.enqueue_frame(frame)
+
+    def stats(self) -> list[dict]:
+        return [connection.stats() for connection in self.active_connections]
+
+    def _get_chat_mutation_log(self, chat_id: str) -> ChatMutationLog:
+        log = self._chat_mutation_logs.get(chat_id)
+        if log is not None:
+            self._chat_mutation_logs.move_to_end(chat_id)
+            return log
+
+        log = self._chat_mutation_logs[chat_id] = ChatMutationLog()
+
+        # Logs of chats that are open somewhere are kept, their subscribers rely on the seq continuing
+        for evicted_chat_id in list(self._chat_mutation_logs):
+            if len(self._chat_mutation_logs) <= CHAT_MUTATION_LOG_MAX_CHATS:
+                break
+            if evicted_chat_id != chat_id and evicted_chat_id not in self._chat_subscribers:
+                del self._chat_mutation_logs[evicted_chat_id]
+
+        return log
 
 
 @lru_cache
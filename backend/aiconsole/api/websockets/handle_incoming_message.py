@@ -23,6 +23,7 @@ from aiconsole.api.websockets.client_messages import (
     AcceptCodeClientMessage,
     AcquireLockClientMessage,
     CloseChatClientMessage,
+    FetchOlderMessageGroupsClientMessage,
     InitChatMutationClientMessage,
     OpenChatClientMessage,
     ProcessChatClientMessage,
@@ -41,9 +42,12 @@ from aiconsole.api.websockets.render_materials import (
 from aiconsole.api.websockets.server_messages import (
     ChatOpenedServerMessage,
     NotificationServerMessage,
+    OlderMessageGroupsServerMessage,
     ResponseServerMessage,
 )
 from aiconsole.core.assets.agents.agent import AICAgent
+from aiconsole.core.chat.chat_window import open_chat_window, read_older_message_groups
+from aiconsole.core.chat.coalescing_chat_mutator import CoalescingChatMutator
 from aiconsole.core.chat.execution_modes.utils.import_and_validate_execution_mode import (
     import_and_validate_execution_mode,
 )
@@ -72,6 +76,7 @@ async def handle_incoming_message(connection: AICConnection, json: dict):
         AcquireLockClientMessage.__name__: _handle_acquire_lock_ws_message,
         ReleaseLockClientMessage.__name__: _handle_release_lock_ws_message,
         OpenChatClientMessage.__name__: _handle_open_chat_ws_message,
+        FetchOlderMessageGroupsClientMessage.__name__: _handle_fetch_older_message_groups_ws_message,
         StopChatClientMessage.__name__: _handle_stop_chat_ws_message,
         CloseChatClientMessage.__name__: _handle_close_chat_ws_message,
         InitChatMutationClientMessage.__name__: _handle_init_chat_mutation_ws_message,
@@ -147,38 +152,76 @@ async def _handle_open_chat_ws_message(connection: AICConnection, json: dict):
     message = OpenChatClientMessage(**json)
 
     try:
-        connection.open_chats_ids.add(message.chat_id)
+        if message.stream_id is not None and message.since_seq is not None:
+            # A reconnecting client gets only the mutations it missed, if they are still kept
+            if connection_manager().resume_chat(connection, message.chat_id, message.stream_id, message.since_seq):
+                await connection.send(
+                    ResponseServerMessage(
+                        request_id=message.request_id,
+                        payload={"chat_id": message.chat_id, "resumed": True},
+                        is_error=False,
+                    )
+                )
+                return
 
-        chat_mutator = SequentialChatMutator(
-            DefaultChatMutator(
-                chat_id=message.chat_id,
-                request_id=message.request_id,
-                connection=connection,
+        stream_position: tuple[str, int] | None = None
+
+        def subscribe():
+            nonlocal stream_position
+            connection_manager().subscribe(connection, message.chat_id)
+            stream_position = connection_manager().get_chat_stream_position(message.chat_id)
+
+        # Subscribes the connection at the point the window is taken,
+        # so it gets exactly the mutations published after the window
+        chat_window = await open_chat_window(message.chat_id, message.window, subscribe=subscribe)
+        stream_id, seq = stream_position or (None, None)
+
+        await connection.send(
+            ChatOpenedServerMessage(
+                chat=chat_window.chat,
+                cursor=chat_window.cursor,
+                stream_id=stream_id,
+                seq=seq,
             )
         )
 
-        chat = await chat_mutator.read()
+        await connection.send(
+            ResponseServerMessage(request_id=message.request_id, payload={"chat_id": message.chat_id}, is_error=False)
+        )
+    except Exception as e:
+        _log.error(f"Error during opening chat {message.chat_id}: {e}")
+        _log.exception(e)
 
-        if message.chat_id in connection.open_chats_ids:
-            await connection.send(
-                ResponseServerMessage(
-                    request_id=message.request_id, payload={"chat_id": message.chat_id}, is_error=False
-                )
+        await connection.send(
+            ResponseServerMessage(
+                request_id=message.request_id,
+                payload={"error": "Error during opening chat", "chat_id": message.chat_id},
+                is_error=True,
             )
+        )
 
-            await connection.send(
-                ChatOpenedServerMessage(
-                    chat=chat,
-                )
+
+async def _handle_fetch_older_message_groups_ws_message(connection: AICConnection, json: dict):
+    message = FetchOlderMessageGroupsClientMessage(**json)
+
+    try:
+        chat_window = await read_older_message_groups(message.chat_id, message.before, message.limit)
+
+        await connection.send(
+            OlderMessageGroupsServerMessage(
+                request_id=message.request_id,
+                chat_id=message.chat_id,
+                message_groups=chat_window.chat.message_groups,
+                cursor=chat_window.cursor,
             )
+        )
     except Exception as e:
-        _log.error(f"Error during opening chat {message.chat_id}: {e}")
         _log.exception(e)
 
         await connection.send(
             ResponseServerMessage(
                 request_id=message.request_id,
-                payload={"error": "Error during opening chat", "chat_id": message.chat_id},
+                payload={"error": "Error during fetching message groups", "chat_id": message.chat_id},
                 is_error=True,
             )
         )
@@ -207,7 +250,7 @@ async def _handle_stop_chat_ws_message(connection: AICConnection, json: dict):
 
 async def _handle_close_chat_ws_message(connection: AICConnection, json: dict):
     message = CloseChatClientMessage(**json)
-    connection.open_chats_ids.discard(message.chat_id)
+    connection_manager().unsubscribe(connection, message.chat_id)
 
 
 async def _handle_init_chat_mutation_ws_message(connection: AICConnection | None, json: dict):
@@ -242,10 +285,12 @@ async def _handle_accept_code_ws_message(connection: AICConnection, json: dict):
         chat = await acquire_lock(chat_id=message.chat_id, request_id=message.request_id)
 
         chat_mutator = SequentialChatMutator(
-            DefaultChatMutator(
-                chat_id=message.chat_id,
-                request_id=message.request_id,
-                connection=None,  # Source connection is None because the originating mutations come from server
+            CoalescingChatMutator(
+                DefaultChatMutator(
+                    chat_id=message.chat_id,
+                    request_id=message.request_id,
+                    connection=None,  # Source connection is None because the originating mutations come from server
+                )
             )
         )
 
@@ -290,17 +335,17 @@ async def _handle_process_chat_ws_message(connection: AICConnection, json: dict)
     try:
 
         chat_mutator = SequentialChatMutator(
-            DefaultChatMutator(
-                chat_id=message.chat_id,
-                request_id=message.request_id,
-                connection=None,  # Source connection is None because the originating mutations come from server
+            CoalescingChatMutator(
+                DefaultChatMutator(
+                    chat_id=message.chat_id,
+                    request_id=message.request_id,
+                    connection=None,  # Source connection is None because the originating mutations come from server
+                )
             )
         )
 
-        async def f():
-            await acquire_lock(chat_id=message.chat_id, request_id=message.request_id)
-
-        await chat_mutator.in_sequence(f)
+        # Not in sequence, waiting for the lock on the chat worker would block the release of the current holder
+        await acquire_lock(chat_id=message.chat_id, request_id=message.request_id)
 
         await chat_mutator.wait_for_all_mutations()
 
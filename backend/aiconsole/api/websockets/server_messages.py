@@ -17,8 +17,22 @@ import os
 
 from aiconsole.api.websockets.base_server_message import BaseServerMessage
 from aiconsole.core.assets.types import AssetType
-from aiconsole.core.chat.chat_mutations import ChatMutation
-from aiconsole.core.chat.types import Chat
+from aiconsole.core.chat.chat_mutations import (
+    AppendToAnalysisMessageGroupMutation,
+    AppendToCodeToolCallMutation,
+    AppendToContentMessageMutation,
+    AppendToHeadlineToolCallMutation,
+    AppendToOutputToolCallMutation,
+    AppendToTaskMessageGroupMutation,
+    ChatMutation,
+    SetCodeToolCallMutation,
+    SetContentMessageMutation,
+    SetIsExecutingToolCallMutation,
+    SetIsStreamingMessageMutation,
+    SetIsStreamingToolCallMutation,
+    SetOutputToolCallMutation,
+)
+from aiconsole.core.chat.types import AICMessageGroup, Chat
 
 
 class NotificationServerMessage(BaseServerMessage):
@@ -63,10 +77,31 @@ class SettingsServerMessage(BaseServerMessage):
     initial: bool
 
 
+# Mutations sent for every streamed token, their fields are all plain JSON values
+_PLAIN_MUTATIONS: frozenset[type] = frozenset(
+    {
+        AppendToAnalysisMessageGroupMutation,
+        AppendToCodeToolCallMutation,
+        AppendToContentMessageMutation,
+        AppendToHeadlineToolCallMutation,
+        AppendToOutputToolCallMutation,
+        AppendToTaskMessageGroupMutation,
+        SetCodeToolCallMutation,
+        SetContentMessageMutation,
+        SetIsExecutingToolCallMutation,
+        SetIsStreamingMessageMutation,
+        SetIsStreamingToolCallMutation,
+        SetOutputToolCallMutation,
+    }
+)
+
+
 class NotifyAboutChatMutationServerMessage(BaseServerMessage):
     request_id: str
     chat_id: str
     mutation: ChatMutation
+    # Position in the mutation stream of the chat, assigned when the mutation is published
+    seq: int | None = None
 
     def model_dump(self, **kwargs):
         # include type of mutation in the dump of "mutation"
@@ -78,6 +113,31 @@ class NotifyAboutChatMutationServerMessage(BaseServerMessage):
             },
         }
 
+    def to_frame_data(self) -> dict:
+        if type(self.mutation) not in _PLAIN_MUTATIONS:
+            return super().to_frame_data()
+
+        # Skips the pydantic serialization, the fields can be encoded as they are
+        return {
+            "type": "NotifyAboutChatMutationServerMessage",
+            "request_id": self.request_id,
+            "chat_id": self.chat_id,
+            "mutation": {key: value for key, value in self.mutation.__dict__.items() if value is not None},
+            **({"seq": self.seq} if self.seq is not None else {}),
+        }
+
+
+class ChatMutationAckServerMessage(BaseServerMessage):
+    # Sent instead of the mutation to the client it came from, which already applied it, to keep its seq in step
+    request_id: str
+    chat_id: str
+    seq: int
+
+
+class ChatResyncRequiredServerMessage(BaseServerMessage):
+    # Mutations of these chats were dropped because the connection fell behind, they have to be reopened
+    chat_ids: list[str]
+
 
 class ResponseServerMessage(BaseServerMessage):
     request_id: str
@@ -95,3 +155,26 @@ class ResponseServerMessage(BaseServerMessage):
 
 class ChatOpenedServerMessage(BaseServerMessage):
     chat: Chat
+    # Id of the oldest sent message group if there are older ones, see FetchOlderMessageGroupsClientMessage
+    cursor: str | None = None
+    # Mutation stream of the chat and the seq of the last mutation included in the chat, see OpenChatClientMessage
+    stream_id: str | None = None
+    seq: int | None = None
+
+
+class OlderMessageGroupsServerMessage(BaseServerMessage):
+    request_id: str
+    chat_id: str
+    message_groups: list[AICMessageGroup]
+    cursor: str | None = None
+
+
+class ChatImportProgressServerMessage(BaseServerMessage):
+    import_id: str
+    imported: int
+    skipped: int
+    failed: int
+    bytes_read: int
+    total_bytes: int
+    is_finished: bool = False
+    error: str | None = None
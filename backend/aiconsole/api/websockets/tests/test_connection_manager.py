@@ -0,0 +1,214 @@
+import asyncio
+import json
+
+import pytest
+
+from aiconsole.api.websockets.connection_manager import (
+    AICConnection,
+    ChatMutationLog,
+    ConnectionManager,
+    OutgoingFrame,
+)
+from aiconsole.api.websockets.server_messages import (
+    NotificationServerMessage,
+    NotifyAboutChatMutationServerMessage,
+)
+from aiconsole.core.chat.chat_mutations import AppendToContentMessageMutation
+
+
+class _WebSocket:
+    def __init__(self, is_blocked: bool = False):
+        self.sent: list[dict] = []
+        self.is_closed = False
+        self.unblocked = asyncio.Event()
+        if not is_blocked:
+            self.unblocked.set()
+
+    async def send_text(self, data: str) -> None:
+        await self.unblocked.wait()
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000) -> None:
+        self.is_closed = True
+
+
+def _mutation(chat_id: str, delta: str) -> NotifyAboutChatMutationServerMessage:
+    return NotifyAboutChatMutationServerMessage(
+        request_id="request",
+        chat_id=chat_id,
+        mutation=AppendToContentMessageMutation(message_id="message", content_delta=delta),
+    )
+
+
+def _notification(message: str) -> NotificationServerMessage:
+    return NotificationServerMessage(title="title", message=message)
+
+
+@pytest.mark.asyncio
+async def test_should_not_wait_for_a_slow_connection():
+    manager = ConnectionManager()
+    slow, fast = _WebSocket(is_blocked=True), _WebSocket()
+    slow_connection, fast_connection = AICConnection(slow), AICConnection(fast)  # type: ignore[arg-type]
+    manager.active_connections += [slow_connection, fast_connection]
+
+    for i in range(5):
+        await asyncio.wait_for(manager.send_to_all(_notification(str(i))), timeout=1)
+    await asyncio.wait_for(fast_connection.drain(), timeout=1)
+
+    assert [data["message"] for data in fast.sent] == ["0", "1", "2", "3", "4"]
+    assert slow.sent == []
+
+    slow.unblocked.set()
+    await asyncio.wait_for(slow_connection.drain(), timeout=1)
+
+    assert slow.sent == fast.sent
+    assert slow_connection.stats()["sent_count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_should_send_chat_messages_only_to_subscribers():
+    manager = ConnectionManager()
+    websockets = [_WebSocket() for _ in range(3)]
+    connections = [AICConnection(websocket) for websocket in websockets]  # type: ignore[arg-type]
+    manager.active_connections += connections
+
+    manager.subscribe(connections[0], "chat")
+    manager.subscribe(connections[1], "chat")
+    manager.subscribe(connections[1], "other chat")
+    manager.subscribe(connections[2], "other chat")
+
+    await manager.send_to_chat(_mutation("chat", "a"), "chat", except_connection=connections[0])
+    manager.unsubscribe(connections[1], "chat")
+    await manager.send_to_chat(_mutation("chat", "b"), "chat")
+    manager.disconnect(connections[2])
+    await manager.send_to_chat(_mutation("other chat", "c"), "other chat")
+    await asyncio.gather(*(connection.drain() for connection in connections))
+
+    # The excluded connection gets only the seq of its own mutation
+    assert [
+        [data.get("mutation", {}).get("content_delta", data["type"]) for data in websocket.sent]
+        for websocket in websockets
+    ] == [
+        ["ChatMutationAckServerMessage", "b"],
+        ["a", "c"],
+        [],
+    ]
+    assert connections[1].open_chats_ids == {"other chat"}
+    assert connections[2].open_chats_ids == set()
+
+
+@pytest.mark.asyncio
+async def test_should_replace_dropped_mutations_with_a_resync():
+    websocket = _WebSocket(is_blocked=True)
+    connection = AICConnection(websocket, max_queue_size=4, slow_consumer_policy="resync")  # type: ignore[arg-type]
+
+    connection.enqueue(_notification("first"))
+    await asyncio.sleep(0)  # the writer takes the first message and blocks on it
+    for i in range(4):
+        connection.enqueue(_mutation("chat", str(i)))
+    connection.enqueue(_notification("kept"))
+    connection.enqueue(_mutation("chat", "after"))
+
+    websocket.unblocked.set()
+    await asyncio.wait_for(connection.drain(), timeout=1)
+
+    assert [data["type"] for data in websocket.sent] == [
+        "NotificationServerMessage",
+        "ChatResyncRequiredServerMessage",
+        "NotificationServerMessage",
+        "NotifyAboutChatMutationServerMessage",
+    ]
+    assert websocket.sent[1]["chat_ids"] == ["chat"]
+    assert connection.stats()["dropped_count"] == 4
+    assert connection.stats()["resync_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_should_disconnect_a_slow_consumer():
+    websocket = _WebSocket(is_blocked=True)
+    connection = AICConnection(websocket, max_queue_size=2, slow_consumer_policy="disconnect")  # type: ignore[arg-type]
+
+    for i in range(4):
+        connection.enqueue(_notification(str(i)))
+    await asyncio.sleep(0)
+
+    assert connection.is_closed
+    assert websocket.is_closed
+    assert websocket.sent == []
+
+
+@pytest.mark.asyncio
+async def test_should_number_chat_mutations_and_replay_missed_ones():
+    manager = ConnectionManager()
+    websocket = _WebSocket()
+    connection = AICConnection(websocket)  # type: ignore[arg-type]
+    manager.active_connections.append(connection)
+    manager.subscribe(connection, "chat")
+
+    await manager.send_to_chat(_mutation("chat", "a"), "chat")
+    await manager.send_to_chat(_mutation("other chat", "x"), "other chat")
+    await manager.send_to_chat(_mutation("chat", "b"), "chat")
+    await connection.drain()
+
+    assert [(data["mutation"]["content_delta"], data["seq"]) for data in websocket.sent] == [("a", 1), ("b", 2)]
+    stream_id, seq = manager.get_chat_stream_position("chat")
+    assert seq == 2
+
+    # The connection drops, mutations keep being published
+    manager.disconnect(connection)
+    await manager.send_to_chat(_mutation("chat", "c"), "chat")
+    await manager.send_to_chat(_mutation("chat", "d"), "chat")
+
+    reconnected_websocket = _WebSocket()
+    reconnected = AICConnection(reconnected_websocket)  # type: ignore[arg-type]
+    manager.active_connections.append(reconnected)
+
+    assert not manager.resume_chat(reconnected, "chat", "another stream", 2)
+    assert not manager.resume_chat(reconnected, "chat", stream_id, 5)
+    assert reconnected.open_chats_ids == set()
+
+    assert manager.resume_chat(reconnected, "chat", stream_id, 2)
+    await manager.send_to_chat(_mutation("chat", "e"), "chat")
+    await reconnected.drain()
+
+    assert [(data["mutation"]["content_delta"], data["seq"]) for data in reconnected_websocket.sent] == [
+        ("c", 3),
+        ("d", 4),
+        ("e", 5),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_should_acknowledge_mutations_to_the_client_they_came_from():
+    manager = ConnectionManager()
+    origin_websocket, other_websocket = _WebSocket(), _WebSocket()
+    origin, other = AICConnection(origin_websocket), AICConnection(other_websocket)  # type: ignore[arg-type]
+    for connection in (origin, other):
+        manager.active_connections.append(connection)
+        manager.subscribe(connection, "chat")
+
+    # Edited by the client, then mutated by the server
+    await manager.send_to_chat(_mutation("chat", "edit"), "chat", except_connection=origin)
+    await manager.send_to_chat(_mutation("chat", "reply"), "chat")
+    await origin.drain()
+    await other.drain()
+
+    assert [(data["type"], data["seq"]) for data in origin_websocket.sent] == [
+        ("ChatMutationAckServerMessage", 1),
+        ("NotifyAboutChatMutationServerMessage", 2),
+    ]
+    assert [(data["mutation"]["content_delta"], data["seq"]) for data in other_websocket.sent] == [
+        ("edit", 1),
+        ("reply", 2),
+    ]
+
+
+def test_chat_mutation_log_should_not_resume_beyond_kept_frames():
+    log = ChatMutationLog(max_size=2)
+    for _ in range(3):
+        seq = log.next_seq()
+        log.append(seq, OutgoingFrame(data={"seq": seq}, chat_id="chat"))
+
+    assert log.since(log.stream_id, 0) is None
+    assert [frame.data["seq"] for frame in log.since(log.stream_id, 1) or []] == [2, 3]
+    assert log.since(log.stream_id, 3) == []
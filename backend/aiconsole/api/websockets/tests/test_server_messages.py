@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from aiconsole.api.websockets.server_messages import (
+    _PLAIN_MUTATIONS,
+    NotifyAboutChatMutationServerMessage,
+)
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    AppendToOutputToolCallMutation,
+    CreateMessageGroupMutation,
+    SetIsStreamingToolCallMutation,
+    SetOutputToolCallMutation,
+)
+
+
+def _encoded_with_pydantic(message: NotifyAboutChatMutationServerMessage) -> dict:
+    return {"type": message.get_type(), **message.model_dump(exclude_none=True, mode="json")}
+
+
+@pytest.mark.parametrize(
+    "mutation",
+    [
+        AppendToContentMessageMutation(message_id="message", content_delta='zażółć "quoted"\n'),
+        AppendToOutputToolCallMutation(tool_call_id="tool call", output_delta="output"),
+        SetIsStreamingToolCallMutation(tool_call_id="tool call", is_streaming=False),
+        SetOutputToolCallMutation(tool_call_id="tool call", output=None),
+        CreateMessageGroupMutation(
+            message_group_id="group",
+            actor_id={"type": "agent", "id": "agent"},
+            role="assistant",
+            task="",
+            materials_ids=["material"],
+            analysis="",
+        ),
+    ],
+)
+def test_should_encode_mutations_like_pydantic(mutation):
+    message = NotifyAboutChatMutationServerMessage(request_id="request", chat_id="chat", mutation=mutation)
+
+    assert json.loads(message.encode()) == _encoded_with_pydantic(message)
+
+
+def test_plain_mutations_should_only_have_plain_fields():
+    for mutation_type in _PLAIN_MUTATIONS:
+        for name, field in mutation_type.model_fields.items():
+            if name != "type":
+                assert field.annotation in (str, bool, str | None), f"{mutation_type.__name__}.{name} is not plain"
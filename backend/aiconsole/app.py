@@ -14,6 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from logging import config, getLogger
@@ -24,6 +25,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from aiconsole.api.routers import app_router
 from aiconsole.consts import log_config
+from aiconsole.core.chat.chat_archive import run_chat_archiver
+from aiconsole.core.chat.chat_store import close_chat_stores
 from aiconsole.core.project.paths import get_project_directory_safe
 from aiconsole.core.settings.fs.settings_file_storage import SettingsFileStorage
 from aiconsole.core.settings.settings import settings
@@ -40,7 +43,11 @@ logger = getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings().configure(SettingsFileStorage(project_path=get_project_directory_safe()))
+
+    chat_archiver = asyncio.create_task(run_chat_archiver())
     yield
+    chat_archiver.cancel()
+    close_chat_stores()
 
 
 def app():
@@ -0,0 +1,244 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Replays chat mutation streams through the chat core and reports throughput, latency and memory as JSON.
+
+    python -m aiconsole.benchmarks.chat_mutations_benchmark generate --groups 10 --tool-calls 2 --tokens 500 stream.ndjson
+    python -m aiconsole.benchmarks.chat_mutations_benchmark record --project ~/my-project --chat-id <id> stream.ndjson
+    python -m aiconsole.benchmarks.chat_mutations_benchmark run --fixture stream.ndjson --output report.json
+
+Mutations are published to stub connections that encode every message like a websocket would, but send it nowhere.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Literal
+
+from aiconsole.api.websockets.connection_manager import (
+    AICConnection,
+    connection_manager,
+)
+from aiconsole.benchmarks.mutation_streams import (
+    chat_to_mutation_stream,
+    generate_mutation_stream,
+    load_mutation_stream,
+    save_mutation_stream,
+)
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_mutations import ChatMutation
+from aiconsole.core.chat.chat_mutator import ChatMutator
+from aiconsole.core.chat.coalescing_chat_mutator import CoalescingChatMutator
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.locking import (
+    DefaultChatMutator,
+    SequentialChatMutator,
+    acquire_lock,
+    release_lock,
+)
+from aiconsole.core.chat.types import Chat
+from aiconsole.core.project import project
+
+BenchmarkTarget = Literal["apply_mutation", "DefaultChatMutator", "SequentialChatMutator", "CoalescingChatMutator"]
+
+# CoalescingChatMutator is wrapped like in production streaming, see handle_incoming_message
+TARGETS: list[BenchmarkTarget] = [
+    "apply_mutation",
+    "DefaultChatMutator",
+    "SequentialChatMutator",
+    "CoalescingChatMutator",
+]
+
+
+class _StubWebSocket:
+    async def send_text(self, data: str) -> None:
+        data.encode()
+
+
+@contextlib.contextmanager
+def _benchmark_project() -> Iterator[Path]:
+    """Runs the chat core against a throwaway project, so chat files and journals do not touch a real one."""
+    cwd = os.getcwd()
+    was_initialized = project._project_initialized
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        project._project_initialized = True
+        try:
+            yield Path(directory)
+        finally:
+            project._project_initialized = was_initialized
+            os.chdir(cwd)
+            chat_cache().clear()
+
+
+@contextlib.contextmanager
+def _stub_connections(chat_id: str, count: int) -> Iterator[list[AICConnection]]:
+    connections = [AICConnection(_StubWebSocket()) for _ in range(count)]  # type: ignore[arg-type]
+    for connection in connections:
+        connection_manager().active_connections.append(connection)
+        connection_manager().subscribe(connection, chat_id)
+    try:
+        yield connections
+    finally:
+        for connection in connections:
+            connection_manager().disconnect(connection)
+
+
+async def _replay(target: BenchmarkTarget, mutations: list[ChatMutation], chat_id: str) -> list[int]:
+    """Returns the latency of every mutation in nanoseconds."""
+    latencies: list[int] = []
+
+    if target == "apply_mutation":
+        chat = Chat(id=chat_id, name="", last_modified=datetime.now(), message_groups=[])
+        for mutation in mutations:
+            start = time.perf_counter_ns()
+            apply_mutation(chat, mutation)
+            latencies.append(time.perf_counter_ns() - start)
+        return latencies
+
+    request_id = f"{chat_id}-request"
+    await acquire_lock(chat_id=chat_id, request_id=request_id)
+    try:
+        mutator = DefaultChatMutator(chat_id=chat_id, request_id=request_id, connection=None)
+        chat_mutator: ChatMutator = mutator
+        if target == "SequentialChatMutator":
+            chat_mutator = SequentialChatMutator(mutator)
+        elif target == "CoalescingChatMutator":
+            chat_mutator = SequentialChatMutator(CoalescingChatMutator(mutator))
+
+        for mutation in mutations:
+            start = time.perf_counter_ns()
+            await chat_mutator.mutate(mutation)
+            latencies.append(time.perf_counter_ns() - start)
+    finally:
+        await release_lock(chat_id=chat_id, request_id=request_id)
+
+    return latencies
+
+
+def _percentile(sorted_values: list[int], percent: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, round(percent / 100 * (len(sorted_values) - 1)))]
+
+
+async def benchmark_target(target: BenchmarkTarget, mutations: list[ChatMutation], connections: int = 1) -> dict:
+    with _benchmark_project():
+        with _stub_connections("timed", connections) as stub_connections:
+            start = time.perf_counter()
+            latencies = await _replay(target, mutations, "timed")
+            # Messages are written by the connection writers, include what is still queued
+            await asyncio.gather(*(connection.drain() for connection in stub_connections))
+            seconds = time.perf_counter() - start
+
+        # Separate pass, tracing allocations slows everything down
+        with _stub_connections("traced", connections):
+            tracemalloc.start()
+            try:
+                await _replay(target, mutations, "traced")
+                _, peak_memory = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+    latencies.sort()
+
+    return {
+        "target": target,
+        "mutations": len(mutations),
+        "seconds": seconds,
+        "mutations_per_second": len(mutations) / seconds if seconds else 0.0,
+        "p50_latency_us": _percentile(latencies, 50) / 1000,
+        "p99_latency_us": _percentile(latencies, 99) / 1000,
+        "max_latency_us": (latencies[-1] if latencies else 0) / 1000,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+async def run_benchmark(
+    mutations: list[ChatMutation], source: str, targets: list[BenchmarkTarget] = TARGETS, connections: int = 1
+) -> dict:
+    return {
+        "source": source,
+        "mutations": len(mutations),
+        "connections": connections,
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(),
+        "results": [await benchmark_target(target, mutations, connections) for target in targets],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Chat mutation replay benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Write a synthetic mutation stream")
+    record = subparsers.add_parser("record", help="Write the mutation stream of a saved chat")
+    run = subparsers.add_parser("run", help="Replay a mutation stream and print a JSON report")
+
+    for subparser in (generate, run):
+        subparser.add_argument("--groups", type=int, default=10, help="Message groups in a synthetic stream")
+        subparser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per message group")
+        subparser.add_argument("--tokens", type=int, default=500, help="Tokens in every streamed text")
+
+    for subparser in (generate, record):
+        subparser.add_argument("output", type=Path)
+
+    record.add_argument("--project", type=Path, required=True)
+    record.add_argument("--chat-id", required=True)
+    record.add_argument("--chunk-size", type=int, default=5, help="Characters per streamed chunk")
+
+    run.add_argument("--fixture", type=Path, help="Recorded stream, or a chat journal, instead of a synthetic one")
+    run.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    run.add_argument("--connections", type=int, default=1, help="Stub connections the chat is open in")
+    run.add_argument("--output", type=Path, help="Write the report here instead of printing it")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        chat = await load_chat_history(args.chat_id, args.project)
+        save_mutation_stream(chat_to_mutation_stream(chat, args.chunk_size), args.output)
+        return
+
+    if args.command == "run" and args.fixture:
+        mutations = load_mutation_stream(args.fixture)
+        source = str(args.fixture)
+    else:
+        mutations = generate_mutation_stream(args.groups, args.tool_calls, args.tokens)
+        source = f"synthetic groups={args.groups} tool_calls={args.tool_calls} tokens={args.tokens}"
+
+    if args.command == "generate":
+        save_mutation_stream(mutations, args.output)
+        return
+
+    report = json.dumps(await run_benchmark(mutations, source, args.targets, args.connections), indent=2)
+
+    if args.output:
+        args.output.write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Chat mutation streams used as benchmark input.
+
+Fixtures use the chat journal format, one {"seq": ..., "mutation": ...} record per line,
+so a copy of any chats/<id>.journal can be replayed as is.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated, Iterable
+
+from pydantic import Field, TypeAdapter
+
+from aiconsole.core.chat.actor_id import ActorId
+from aiconsole.core.chat.chat_mutations import (
+    AppendToCodeToolCallMutation,
+    AppendToContentMessageMutation,
+    AppendToOutputToolCallMutation,
+    ChatMutation,
+    CreateMessageGroupMutation,
+    CreateMessageMutation,
+    CreateToolCallMutation,
+    SetIsExecutingToolCallMutation,
+    SetIsStreamingMessageMutation,
+    SetIsStreamingToolCallMutation,
+)
+from aiconsole.core.chat.types import Chat
+
+_mutation_adapter: TypeAdapter[ChatMutation] = TypeAdapter(
+    Annotated[ChatMutation, Field(discriminator="type")]  # type: ignore[arg-type]
+)
+
+# Roughly what a single streamed LLM token adds
+_TOKEN = "word "
+
+
+def generate_mutation_stream(groups: int, tool_calls: int, tokens: int) -> list[ChatMutation]:
+    """
+    A synthetic agent conversation: each of the groups streams a message of tokens tokens,
+    followed by tool_calls tool calls whose code and output are streamed token by token as well.
+    """
+    mutations: list[ChatMutation] = []
+
+    for group_index in range(groups):
+        group_id = f"group-{group_index}"
+        message_id = f"message-{group_index}"
+
+        mutations.append(
+            CreateMessageGroupMutation(
+                message_group_id=group_id,
+                actor_id=ActorId(type="agent", id="benchmark"),
+                role="assistant",
+                task="",
+                materials_ids=[],
+                analysis="",
+            )
+        )
+        mutations.append(
+            CreateMessageMutation(
+                message_group_id=group_id,
+                message_id=message_id,
+                timestamp=datetime.now().isoformat(),
+                content="",
+            )
+        )
+        mutations.append(SetIsStreamingMessageMutation(message_id=message_id, is_streaming=True))
+        mutations.extend(
+            AppendToContentMessageMutation(message_id=message_id, content_delta=_TOKEN) for _ in range(tokens)
+        )
+        mutations.append(SetIsStreamingMessageMutation(message_id=message_id, is_streaming=False))
+
+        for tool_call_index in range(tool_calls):
+            tool_call_id = f"tool-call-{group_index}-{tool_call_index}"
+
+            mutations.append(
+                CreateToolCallMutation(
+                    message_id=message_id, tool_call_id=tool_call_id, code="", language="python", headline=""
+                )
+            )
+            mutations.append(SetIsStreamingToolCallMutation(tool_call_id=tool_call_id, is_streaming=True))
+            mutations.extend(
+                AppendToCodeToolCallMutation(tool_call_id=tool_call_id, code_delta=_TOKEN) for _ in range(tokens)
+            )
+            mutations.append(SetIsStreamingToolCallMutation(tool_call_id=tool_call_id, is_streaming=False))
+            mutations.append(SetIsExecutingToolCallMutation(tool_call_id=tool_call_id, is_executing=True))
+            mutations.extend(
+                AppendToOutputToolCallMutation(tool_call_id=tool_call_id, output_delta=_TOKEN) for _ in range(tokens)
+            )
+            mutations.append(SetIsExecutingToolCallMutation(tool_call_id=tool_call_id, is_executing=False))
+
+    return mutations
+
+
+def chat_to_mutation_stream(chat: Chat, chunk_size: int = len(_TOKEN)) -> list[ChatMutation]:
+    """
+    Recreates the stream that produced a saved chat, with texts streamed in chunk_size pieces.
+    """
+    mutations: list[ChatMutation] = []
+
+    def chunks(text: str) -> Iterable[str]:
+        return (text[i : i + chunk_size] for i in range(0, len(text), chunk_size))
+
+    for group in chat.message_groups:
+        mutations.append(
+            CreateMessageGroupMutation(
+                message_group_id=group.id,
+                actor_id=group.actor_id,
+                role=group.role,
+                task=group.task,
+                materials_ids=group.materials_ids,
+                analysis=group.analysis,
+            )
+        )
+
+        for message in group.messages:
+            mutations.append(
+                CreateMessageMutation(
+                    message_group_id=group.id,
+                    message_id=message.id,
+                    timestamp=message.timestamp,
+                    content="",
+                    requested_format=message.requested_format,
+                )
+            )
+            mutations.extend(
+                AppendToContentMessageMutation(message_id=message.id, content_delta=chunk)
+                for chunk in chunks(message.content)
+            )
+            mutations.append(SetIsStreamingMessageMutation(message_id=message.id, is_streaming=False))
+
+            for tool_call in message.tool_calls:
+                mutations.append(
+                    CreateToolCallMutation(
+                        message_id=message.id,
+                        tool_call_id=tool_call.id,
+                        code="",
+                        language=tool_call.language,
+                        headline=tool_call.headline,
+                    )
+                )
+                mutations.extend(
+                    AppendToCodeToolCallMutation(tool_call_id=tool_call.id, code_delta=chunk)
+                    for chunk in chunks(tool_call.code)
+                )
+                mutations.extend(
+                    AppendToOutputToolCallMutation(tool_call_id=tool_call.id, output_delta=chunk)
+                    for chunk in chunks(tool_call.output or "")
+                )
+
+    return mutations
+
+
+def save_mutation_stream(mutations: list[ChatMutation], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf8", errors="replace") as f:
+        for seq, mutation in enumerate(mutations, start=1):
+            f.write(json.dumps({"seq": seq, "mutation": mutation.model_dump(mode="json")}) + "\n")
+
+
+def load_mutation_stream(path: Path) -> list[ChatMutation]:
+    with open(path, "r", encoding="utf8", errors="replace") as f:
+        return [_mutation_adapter.validate_python(json.loads(line)["mutation"]) for line in f if line.strip()]
@@ -0,0 +1,15 @@
+import pytest
+
+from aiconsole.benchmarks.chat_mutations_benchmark import benchmark_target
+from aiconsole.benchmarks.mutation_streams import generate_mutation_stream
+
+
+@pytest.mark.asyncio
+async def test_should_benchmark_coalesced_streaming():
+    mutations = generate_mutation_stream(groups=1, tool_calls=1, tokens=200)
+
+    result = await benchmark_target("CoalescingChatMutator", mutations)
+
+    assert result["target"] == "CoalescingChatMutator"
+    assert result["mutations"] == len(mutations)
+    assert result["seconds"] > 0
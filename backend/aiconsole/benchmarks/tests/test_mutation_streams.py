@@ -0,0 +1,28 @@
+from datetime import datetime
+from pathlib import Path
+
+from aiconsole.benchmarks.mutation_streams import (
+    chat_to_mutation_stream,
+    generate_mutation_stream,
+    load_mutation_stream,
+    save_mutation_stream,
+)
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.types import Chat
+
+
+def _replay(mutations) -> Chat:
+    chat = Chat(id="chat", name="", last_modified=datetime.now(), message_groups=[])
+    for mutation in mutations:
+        apply_mutation(chat, mutation)
+    return chat
+
+
+def test_recorded_stream_should_recreate_chat(tmp_path: Path):
+    chat = _replay(generate_mutation_stream(groups=2, tool_calls=1, tokens=3))
+
+    fixture = tmp_path / "stream.ndjson"
+    save_mutation_stream(chat_to_mutation_stream(chat, chunk_size=4), fixture)
+    recreated = _replay(load_mutation_stream(fixture))
+
+    assert recreated.model_dump(exclude={"last_modified"}) == chat.model_dump(exclude={"last_modified"})
@@ -0,0 +1,12 @@
+from aiconsole.benchmarks.mutation_streams import generate_mutation_stream
+from aiconsole.benchmarks.websocket_frames_benchmark import run_benchmark
+
+
+def test_should_report_bytes_and_cpu_of_frames():
+    mutations = generate_mutation_stream(groups=2, tool_calls=1, tokens=20)
+
+    report = run_benchmark(mutations, "test")
+
+    assert report["mutation_frames"] == len(mutations)
+    assert 0 < report["mutation_deflated_bytes"] < report["mutation_bytes"]
+    assert 0 < report["chat_opened_deflated_bytes"] < report["chat_opened_bytes"]
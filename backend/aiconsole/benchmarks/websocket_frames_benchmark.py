@@ -0,0 +1,143 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reports the bytes and CPU time it takes to send a streamed answer over the websocket.
+
+    python -m aiconsole.benchmarks.websocket_frames_benchmark --groups 10 --tool-calls 2 --tokens 500
+    python -m aiconsole.benchmarks.websocket_frames_benchmark --fixture stream.ndjson --output report.json
+
+The answer is sent as one chat mutation notification per mutation, followed by a ChatOpenedServerMessage
+of the resulting chat, like a client reopening it would get. Compression is measured like permessage-deflate
+with context takeover, which uvicorn and browsers negotiate by default.
+"""
+import argparse
+import json
+import platform
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from aiconsole.api.websockets.base_server_message import encode_frame
+from aiconsole.api.websockets.server_messages import (
+    ChatOpenedServerMessage,
+    NotifyAboutChatMutationServerMessage,
+)
+from aiconsole.benchmarks.mutation_streams import (
+    generate_mutation_stream,
+    load_mutation_stream,
+)
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_mutations import ChatMutation
+from aiconsole.core.chat.types import Chat
+
+# Every compressed message ends with an empty deflate block, permessage-deflate does not send it
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+def _answer_frames(mutations: list[ChatMutation]) -> tuple[list[dict], dict]:
+    """Frame data of the mutation notifications and of the chat they create."""
+    chat = Chat(id="benchmark", name="", last_modified=datetime.now(), message_groups=[])
+    frames = []
+
+    for mutation in mutations:
+        frames.append(
+            NotifyAboutChatMutationServerMessage(
+                request_id="benchmark", chat_id=chat.id, mutation=mutation
+            ).to_frame_data()
+        )
+        apply_mutation(chat, mutation)
+
+    return frames, ChatOpenedServerMessage(chat=chat).to_frame_data()
+
+
+def _encode_frames(frames: list[dict]) -> tuple[list[bytes], int]:
+    """Encoded frames and the CPU time it took in nanoseconds."""
+    start = time.process_time_ns()
+    payloads = [encode_frame(data).encode() for data in frames]
+    cpu_ns = time.process_time_ns() - start
+
+    return payloads, cpu_ns
+
+
+def _deflate_frames(payloads: list[bytes]) -> tuple[int, int]:
+    """Bytes of the payloads compressed one message at a time with a shared window, and the CPU time it took."""
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    size = 0
+
+    start = time.process_time_ns()
+    for payload in payloads:
+        compressed = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        size += len(compressed) - len(_DEFLATE_TAIL)
+    cpu_ns = time.process_time_ns() - start
+
+    return size, cpu_ns
+
+
+def run_benchmark(mutations: list[ChatMutation], source: str) -> dict:
+    frames, chat_opened = _answer_frames(mutations)
+
+    payloads, encode_ns = _encode_frames(frames)
+    (chat_opened_payload,), chat_opened_encode_ns = _encode_frames([chat_opened])
+    deflated_bytes, deflate_ns = _deflate_frames(payloads)
+    chat_opened_deflated_bytes, chat_opened_deflate_ns = _deflate_frames([chat_opened_payload])
+
+    mutation_bytes = sum(len(payload) for payload in payloads)
+
+    return {
+        "source": source,
+        "mutations": len(mutations),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(),
+        "mutation_frames": len(payloads),
+        "mutation_bytes": mutation_bytes,
+        "mutation_bytes_per_frame": mutation_bytes / len(payloads) if payloads else 0.0,
+        "mutation_encode_cpu_ms": encode_ns / 1e6,
+        "mutation_deflated_bytes": deflated_bytes,
+        "mutation_deflate_cpu_ms": deflate_ns / 1e6,
+        "chat_opened_bytes": len(chat_opened_payload),
+        "chat_opened_encode_cpu_ms": chat_opened_encode_ns / 1e6,
+        "chat_opened_deflated_bytes": chat_opened_deflated_bytes,
+        "chat_opened_deflate_cpu_ms": chat_opened_deflate_ns / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Websocket frames benchmark")
+    parser.add_argument("--groups", type=int, default=10, help="Message groups in a synthetic stream")
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per message group")
+    parser.add_argument("--tokens", type=int, default=500, help="Tokens in every streamed text")
+    parser.add_argument("--fixture", type=Path, help="Recorded stream, or a chat journal, instead of a synthetic one")
+    parser.add_argument("--output", type=Path, help="Write the report here instead of printing it")
+    args = parser.parse_args()
+
+    if args.fixture:
+        mutations = load_mutation_stream(args.fixture)
+        source = str(args.fixture)
+    else:
+        mutations = generate_mutation_stream(args.groups, args.tool_calls, args.tokens)
+        source = f"synthetic groups={args.groups} tool_calls={args.tool_calls} tokens={args.tokens}"
+
+    report = json.dumps(run_benchmark(mutations, source), indent=2)
+
+    if args.output:
+        args.output.write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
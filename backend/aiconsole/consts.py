@@ -47,12 +47,56 @@ def AICONSOLE_USER_CONFIG_DIR() -> Path:
 
 HISTORY_LIMIT: int = 1000
 COMMANDS_HISTORY_JSON: str = "command_history.json"
+COMMANDS_HISTORY_LOG: str = "command_history.jsonl"
+# The log is compacted once it has this many times more lines than HISTORY_LIMIT
+COMMANDS_HISTORY_LOG_COMPACTION_FACTOR: int = 2
+CHAT_HEADLINES_JSON: str = "chat_headlines.json"
+CHAT_SEARCH_DB: str = "chat_search.db"
+CHAT_STORE_DB: str = "chats.db"
 
 DIRECTOR_MIN_TOKENS: int = 250
 DIRECTOR_PREFERRED_TOKENS: int = 1000
 
 MAX_RECENT_PROJECTS = 8
 
+# Append* chat mutations to the same target are merged until either limit is reached
+CHAT_MUTATION_COALESCE_MAX_DELAY: float = 0.05  # seconds
+CHAT_MUTATION_COALESCE_MAX_BYTES: int = 4096
+
+# Operations waiting for a chat worker, submitters wait when the queue is full
+CHAT_MUTATION_QUEUE_SIZE: int = 1000
+CHAT_MUTATION_ACTOR_IDLE_TIMEOUT: float = 60  # seconds
+
+# Journal size after which it is folded into the chat snapshot while the chat is still locked
+CHAT_JOURNAL_COMPACTION_BYTES: int = 4 * 1024 * 1024
+
+# Approximate amount of chat text kept parsed in memory across opened chats
+CHAT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+# Backend of chat history, "json" (a file per chat) or "sqlite" (.aic/chats.db)
+CHAT_STORE: str = os.environ.get("AICONSOLE_CHAT_STORE", "json")
+
+# Chats of the JSON store not modified for this long are compressed by a background task
+CHAT_ARCHIVE_AFTER: float = float(os.environ.get("AICONSOLE_CHAT_ARCHIVE_AFTER_DAYS", "30")) * 24 * 60 * 60  # seconds
+CHAT_ARCHIVE_INTERVAL: float = 6 * 60 * 60  # seconds
+
+# Messages waiting to be written to a websocket, a connection with a full queue is a slow consumer
+WEBSOCKET_SEND_QUEUE_SIZE: int = 1000
+# What happens to a slow consumer, "resync" drops its queued chat mutations and asks it to reopen the chats,
+# "disconnect" closes its websocket
+WEBSOCKET_SLOW_CONSUMER_POLICY: str = os.environ.get("AICONSOLE_WEBSOCKET_SLOW_CONSUMER_POLICY", "resync")
+
+# Published mutations kept per chat, so reconnecting clients get only the ones they missed
+CHAT_MUTATION_LOG_SIZE: int = 1000
+CHAT_MUTATION_LOG_MAX_CHATS: int = 100
+
+# Conversations of a ChatGPT export converted and written together
+CHATGPT_IMPORT_BATCH_SIZE: int = 100
+
+# Tool outputs longer than this are moved to the blob store, chats keep only their beginning
+TOOL_OUTPUT_BLOB_THRESHOLD: int = 64 * 1024  # characters
+TOOL_OUTPUT_PREVIEW_LENGTH: int = 4096  # characters
+
 
 LOG_FORMAT: str = "{name} {funcName} {message}"
 LOG_STYLE: str = "{"
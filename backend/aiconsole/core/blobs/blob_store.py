@@ -0,0 +1,98 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Content-addressed store of large tool outputs and binary payloads (.aic/blobs).
+
+A blob is named after the sha256 of its content, so identical payloads are stored once and never change.
+Chats keep only references to blobs, markdown images pointing at /api/blobs/<name>.
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from aiconsole.consts import TOOL_OUTPUT_BLOB_THRESHOLD, TOOL_OUTPUT_PREVIEW_LENGTH
+from aiconsole.core.project.paths import get_aic_directory
+
+BLOB_NAME_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})(?P<extension>\.[a-z0-9]+)?$")
+BLOB_REFERENCE_RE = re.compile(
+    r"!\[(?P<media_type>[\w.+-]+/[\w.+-]+)\]\(/api/blobs/(?P<name>[0-9a-f]{64}(\.[a-z0-9]+)?)\)"
+)
+
+
+class BlobStore:
+    def __init__(self, project_path: Path | None = None):
+        self.directory = get_aic_directory(project_path) / "blobs"
+
+    def put(self, data: bytes, media_type: str) -> str:
+        """Stores the data if it is not stored yet, returns the name of the blob."""
+        digest = hashlib.sha256(data).hexdigest()
+        name = digest + (_extension(media_type) or "")
+        path = self.get_path(name)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Written to a temporary file first, a blob that exists is always complete
+            tmp_path = path.with_name(f".{name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        return name
+
+    def get_path(self, name: str) -> Path:
+        if not BLOB_NAME_RE.match(name):
+            raise ValueError(f"Invalid blob name {name}")
+
+        return self.directory / name[:2] / name
+
+    def reference(self, data: bytes, media_type: str) -> str:
+        return f"![{media_type}](/api/blobs/{self.put(data, media_type)})"
+
+
+def spill_image_output(store: BlobStore, content: str, media_type: str) -> str:
+    """The reference to a base64 encoded image output, the output itself if it is not valid base64."""
+    try:
+        data = base64.b64decode(content, validate=True)
+    except (binascii.Error, ValueError):
+        return content
+
+    return store.reference(data, media_type)
+
+
+def spill_large_output(store: BlobStore, output: str) -> str:
+    """Outputs over the threshold are replaced with their beginning and a reference to the whole output."""
+    if len(output) <= TOOL_OUTPUT_BLOB_THRESHOLD:
+        return output
+
+    reference = store.reference(output.encode("utf8", errors="replace"), "text/plain")
+    return f"{output[:TOOL_OUTPUT_PREVIEW_LENGTH]}\n... ({len(output)} characters in total)\n{reference}"
+
+
+def describe_blob_references(text: str) -> str:
+    """Replaces blob references with short placeholders, for texts sent to the model."""
+    return BLOB_REFERENCE_RE.sub(lambda match: f"[{match['media_type']} output]", text)
+
+
+def _extension(media_type: str) -> str | None:
+    if media_type == "text/plain":
+        return ".txt"
+
+    return mimetypes.guess_extension(media_type)
@@ -0,0 +1,52 @@
+import base64
+from pathlib import Path
+
+import pytest
+
+from aiconsole.consts import TOOL_OUTPUT_BLOB_THRESHOLD
+from aiconsole.core.blobs.blob_store import (
+    BLOB_REFERENCE_RE,
+    BlobStore,
+    describe_blob_references,
+    spill_image_output,
+    spill_large_output,
+)
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> BlobStore:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("aiconsole.core.project.paths.is_project_initialized", lambda: True)
+    return BlobStore()
+
+
+def test_should_store_identical_images_once(store: BlobStore):
+    image = base64.b64encode(b"\x89PNG fake image").decode()
+
+    first = spill_image_output(store, image, "image/png")
+    second = spill_image_output(store, image, "image/png")
+
+    assert first == second
+    match = BLOB_REFERENCE_RE.fullmatch(first)
+    assert match is not None and match["name"].endswith(".png")
+    assert store.get_path(match["name"]).read_bytes() == b"\x89PNG fake image"
+    assert len(list(store.directory.rglob("*.png"))) == 1
+
+    assert describe_blob_references(f"Plot:\n{first}") == "Plot:\n[image/png output]"
+
+
+def test_should_spill_only_large_outputs(store: BlobStore):
+    assert spill_large_output(store, "short") == "short"
+
+    output = "x" * (TOOL_OUTPUT_BLOB_THRESHOLD + 1)
+    spilled = spill_large_output(store, output)
+
+    assert len(spilled) < len(output)
+    match = BLOB_REFERENCE_RE.search(spilled)
+    assert match is not None
+    assert store.get_path(match["name"]).read_text() == output
+
+
+def test_should_reject_blob_names_outside_of_the_store(store: BlobStore):
+    with pytest.raises(ValueError):
+        store.get_path("../settings.toml")
@@ -58,12 +58,12 @@ def _handle_CreateMessageGroupMutation(chat: Chat, mutation: CreateMessageGroupM
         messages=[],
     )
 
-    chat.message_groups.append(message_group)
+    chat.add_message_group(message_group)
 
 
-def _handle_DeleteMessageGroupMutation(chat, mutation: DeleteMessageGroupMutation) -> None:
+def _handle_DeleteMessageGroupMutation(chat: Chat, mutation: DeleteMessageGroupMutation) -> None:
     message_group = _get_message_group(chat, mutation.message_group_id)
-    chat.message_groups = [group for group in chat.message_groups if group.id != message_group.id]
+    chat.remove_message_group(message_group)
 
 
 def _handle_SetIsAnalysisInProgressMutation(chat, mutation: SetIsAnalysisInProgressMutation) -> None:
@@ -115,28 +115,26 @@ def _handle_AppendToMessageGroupAnalysisMutation(chat, mutation: AppendToAnalysi
     message_group.analysis += mutation.analysis_delta
 
 
-def _handle_CreateMessageMutation(chat, mutation: CreateMessageMutation) -> None:
+def _handle_CreateMessageMutation(chat: Chat, mutation: CreateMessageMutation) -> None:
     message_group = _get_message_group(chat, mutation.message_group_id)
     message = AICMessage(
         id=mutation.message_id,
         content=mutation.content,
-        timestamp=datetime.now().isoformat(),
+        timestamp=mutation.timestamp or datetime.now().isoformat(),
         requested_format=None,
         tool_calls=[],
         is_streaming=False,
     )
-    message_group.messages.append(message)
+    chat.add_message(message_group, message)
 
 
-def _handle_DeleteMessageMutation(chat, mutation: DeleteMessageMutation) -> None:
+def _handle_DeleteMessageMutation(chat: Chat, mutation: DeleteMessageMutation) -> None:
     message_location = _get_message_location(chat, mutation.message_id)
-    message_location.message_group.messages = [
-        m for m in message_location.message_group.messages if m.id != mutation.message_id
-    ]
+    chat.remove_message(message_location.message_group, message_location.message)
 
     # Remove message group if it's empty
     if not message_location.message_group.messages:
-        chat.message_groups = [group for group in chat.message_groups if group.id != message_location.message_group.id]
+        chat.remove_message_group(message_location.message_group)
 
 
 def _handle_SetContentMessageMutation(chat, mutation: SetContentMessageMutation) -> None:
@@ -144,16 +142,17 @@ def _handle_SetContentMessageMutation(chat, mutation: SetContentMessageMutation)
 
 
 def _handle_AppendToContentMessageMutation(chat, mutation: AppendToContentMessageMutation) -> None:
-    _get_message_location(chat, mutation.message_id).message.content += mutation.content_delta
-    _get_message_location(chat, mutation.message_id).message.is_streaming = True
+    message = _get_message_location(chat, mutation.message_id).message
+    message.append_text("content", mutation.content_delta)
+    message.is_streaming = True
 
 
 def _handle_SetMessageIsStreamingMutation(chat, mutation: SetIsStreamingMessageMutation) -> None:
     _get_message_location(chat, mutation.message_id).message.is_streaming = mutation.is_streaming
 
 
-def _handle_CreateToolCallMutation(chat, mutation: CreateToolCallMutation) -> None:
-    message = _get_message_location(chat, mutation.message_id).message
+def _handle_CreateToolCallMutation(chat: Chat, mutation: CreateToolCallMutation) -> None:
+    message_location = _get_message_location(chat, mutation.message_id)
     tool_call = AICToolCall(
         id=mutation.tool_call_id,
         language=mutation.language,
@@ -161,22 +160,20 @@ def _handle_CreateToolCallMutation(chat, mutation: CreateToolCallMutation) -> No
         headline=mutation.headline,
         output=mutation.output,
     )
-    message.tool_calls.append(tool_call)
+    chat.add_tool_call(message_location.message_group, message_location.message, tool_call)
 
 
-def _handle_DeleteToolCallMutation(chat, mutation: DeleteToolCallMutation) -> None:
+def _handle_DeleteToolCallMutation(chat: Chat, mutation: DeleteToolCallMutation) -> None:
     tool_call = _get_tool_call_location(chat, mutation.tool_call_id)
-    tool_call.message.tool_calls = [tc for tc in tool_call.message.tool_calls if tc.id != mutation.tool_call_id]
+    chat.remove_tool_call(tool_call.message, tool_call.tool_call)
 
     # Remove message if it's empty
     if not tool_call.message.tool_calls and not tool_call.message.content:
-        tool_call.message_group.messages = [
-            m for m in tool_call.message_group.messages if m.id != tool_call.message.id
-        ]
+        chat.remove_message(tool_call.message_group, tool_call.message)
 
     # Remove message group if it's empty
     if not tool_call.message_group.messages:
-        chat.message_groups = [group for group in chat.message_groups if group.id != tool_call.message_group.id]
+        chat.remove_message_group(tool_call.message_group)
 
 
 def _handle_SetToolCallHeadlineMutation(chat, mutation: SetHeadlineToolCallMutation) -> None:
@@ -192,7 +189,7 @@ def _handle_SetToolCallCodeMutation(chat, mutation: SetCodeToolCallMutation) ->
 
 
 def _handle_AppendToToolCallCodeMutation(chat, mutation: AppendToCodeToolCallMutation) -> None:
-    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.code += mutation.code_delta
+    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.append_text("code", mutation.code_delta)
 
 
 def _handle_SetToolCallLanguageMutation(chat, mutation: SetLanguageToolCallMutation) -> None:
@@ -204,10 +201,7 @@ def _handle_SetToolCallOutputMutation(chat, mutation: SetOutputToolCallMutation)
 
 
 def _handle_AppendToToolCallOutputMutation(chat, mutation: AppendToOutputToolCallMutation) -> None:
-    tool_call = _get_tool_call_location(chat, mutation.tool_call_id).tool_call
-    if tool_call.output is None:
-        tool_call.output = ""
-    tool_call.output += mutation.output_delta
+    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.append_text("output", mutation.output_delta)
 
 
 def _handle_SetToolCallIsStreamingMutation(chat, mutation: SetIsStreamingToolCallMutation) -> None:
@@ -227,6 +221,7 @@ def _get_message_group(chat: Chat, message_group_id: str) -> AICMessageGroup:
     if not message_group:
         raise ValueError(f"Message group with id {message_group_id} not found")
 
+    chat.mark_message_group_changed(message_group.id)
     return message_group
 
 
@@ -236,6 +231,7 @@ def _get_message_location(chat: Chat, message_id: str) -> AICMessageLocation:
     if not message_location:
         raise ValueError(f"Message with id {message_id} not found")
 
+    chat.mark_message_group_changed(message_location.message_group.id)
     return message_location
 
 
@@ -245,6 +241,7 @@ def _get_tool_call_location(chat: Chat, tool_call_id: str) -> AICToolCallLocatio
     if not tool_call_location:
         raise ValueError(f"Tool call with id {tool_call_id} not found")
 
+    chat.mark_message_group_changed(tool_call_location.message_group.id)
     return tool_call_location
 
 
@@ -290,3 +287,4 @@ def apply_mutation(chat: Chat, mutation: ChatMutation) -> None:
     """
 
     MUTATION_HANDLERS[mutation.__class__.__name__](chat, mutation)
+    chat.mark_dirty("message_groups")
@@ -0,0 +1,118 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Background archiving of chats that were not modified for CHAT_ARCHIVE_AFTER, see JsonChatStore.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from aiconsole.consts import CHAT_ARCHIVE_AFTER, CHAT_ARCHIVE_INTERVAL
+from aiconsole.core.chat.chat_journal import get_chat_journal_path
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.json_chat_store import JsonChatStore
+from aiconsole.core.chat.save_chat_history import chat_save_lock
+from aiconsole.core.project.paths import get_project_directory_safe
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatArchiveReport:
+    archived: list[str] = field(default_factory=list)
+    saved_bytes: int = 0
+
+
+async def archive_cold_chats(
+    project_path: Path | None = None, older_than: float = CHAT_ARCHIVE_AFTER
+) -> ChatArchiveReport:
+    report = ChatArchiveReport()
+
+    store = get_chat_store(project_path)
+    if not isinstance(store, JsonChatStore):
+        return report  # other stores manage their own storage
+
+    threshold_ns = time.time_ns() - int(older_than * 1e9)
+
+    for chat_id in _list_uncompressed_chat_ids(store):
+        file_path = store.get_path(chat_id)
+
+        # Never competes with a save of the chat, which would write the uncompressed file again
+        async with chat_save_lock(file_path):
+            try:
+                if os.stat(file_path).st_mtime_ns > threshold_ns:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            # Chats with a journal are in use or were not compacted after a crash
+            if get_chat_journal_path(chat_id, project_path).exists():
+                continue
+
+            try:
+                report.saved_bytes += await asyncio.to_thread(_compress, file_path, store.get_archive_path(chat_id))
+                report.archived.append(chat_id)
+            except OSError as e:
+                _log.error(f"Failed to archive chat {chat_id}: {e}")
+
+    return report
+
+
+async def run_chat_archiver() -> None:
+    """Archives cold chats of the current project every CHAT_ARCHIVE_INTERVAL, until cancelled."""
+    while True:
+        await asyncio.sleep(CHAT_ARCHIVE_INTERVAL)
+
+        project_path = get_project_directory_safe()
+        if project_path is None:
+            continue
+
+        try:
+            report = await archive_cold_chats(project_path)
+            if report.archived:
+                _log.info(f"Archived {len(report.archived)} chats, saved {report.saved_bytes} bytes")
+        except Exception as e:
+            _log.exception(f"Failed to archive chats: {e}")
+
+
+def _list_uncompressed_chat_ids(store: JsonChatStore) -> list[str]:
+    if not store.history_directory.is_dir():
+        return []
+
+    return [
+        path.name[: -len(".json")] for path in store.history_directory.glob("*.json") if not path.name.startswith(".")
+    ]
+
+
+def _compress(file_path: Path, archive_path: Path) -> int:
+    """Returns the number of bytes saved."""
+    stat = os.stat(file_path)
+
+    tmp_path = archive_path.with_name(f".{archive_path.name}.tmp")
+    with open(file_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    # The version of a chat in the JSON store is the mtime of its file
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, archive_path)
+    os.remove(file_path)
+
+    return stat.st_size - os.stat(archive_path).st_size
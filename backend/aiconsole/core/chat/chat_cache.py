@@ -0,0 +1,136 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Memory-budgeted LRU cache of parsed chats, so reopening a chat does not re-read and migrate its file.
+"""
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from aiconsole.consts import CHAT_CACHE_MAX_BYTES
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.save_chat_history import is_chat_file_being_saved
+from aiconsole.core.chat.types import Chat
+from aiconsole.core.project.paths import get_history_directory
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    chat: Chat
+    size: int
+
+
+class ChatCache:
+    def __init__(self, max_bytes: int = CHAT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[Path, _CacheEntry] = OrderedDict()
+
+    async def get(self, chat_id: str, project_path: Path | None = None) -> Chat:
+        file_path = get_history_directory(project_path) / f"{chat_id}.json"
+        entry = self._entries.get(file_path)
+
+        if entry is not None and not self._is_stale(file_path, entry.chat, project_path):
+            self._entries.move_to_end(file_path)
+            return entry.chat
+
+        chat = await load_chat_history(chat_id, project_path)
+        self._put(file_path, chat)
+        return chat
+
+    def is_cached(self, chat_id: str, project_path: Path | None = None) -> bool:
+        return get_history_directory(project_path) / f"{chat_id}.json" in self._entries
+
+    def invalidate(self, chat_id: str, project_path: Path | None = None) -> None:
+        self._remove(get_history_directory(project_path) / f"{chat_id}.json")
+
+    def update_size(self, chat: Chat, project_path: Path | None = None) -> None:
+        """Re-accounts a chat that grew or shrank, e.g. after a lock on it was released."""
+        file_path = get_history_directory(project_path) / f"{chat.id}.json"
+        entry = self._entries.get(file_path)
+
+        if entry is not None and entry.chat is chat:
+            new_size = _estimate_chat_size(chat)
+            self.size += new_size - entry.size
+            entry.size = new_size
+            self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _put(self, file_path: Path, chat: Chat) -> None:
+        self._remove(file_path)
+
+        entry = _CacheEntry(chat=chat, size=_estimate_chat_size(chat))
+        self._entries[file_path] = entry
+        self.size += entry.size
+
+        self._evict()
+
+    def _remove(self, file_path: Path) -> None:
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self) -> None:
+        for file_path, entry in list(self._entries.items()):
+            if self.size <= self.max_bytes:
+                break
+
+            # Locked chats are owned by their lock holder and must stay the only instance
+            if entry.chat.lock_id is not None or is_chat_file_being_saved(file_path):
+                continue
+
+            del self._entries[file_path]
+            self.size -= entry.size
+
+    def _is_stale(self, file_path: Path, chat: Chat, project_path: Path | None) -> bool:
+        # Never replace an instance that is in use or has changes that are not on disk yet
+        if chat.lock_id is not None or chat.dirty_scopes or is_chat_file_being_saved(file_path):
+            return False
+
+        if get_chat_store(project_path).get_version(chat.id) != chat.file_mtime_ns:
+            _log.debug(f"Chat {chat.id} changed in the chat store, reloading")
+            return True
+
+        return False
+
+
+def _estimate_chat_size(chat: Chat) -> int:
+    size = len(chat.name)
+
+    for message_group in chat.message_groups:
+        size += len(message_group.task) + len(message_group.analysis)
+        for message in message_group.messages:
+            # Streamed text is measured by its chunks, reading it would join them
+            size += message.text_length("content")
+            for tool_call in message.tool_calls:
+                size += (
+                    tool_call.text_length("code") + tool_call.text_length("headline") + tool_call.text_length("output")
+                )
+
+    return size
+
+
+@lru_cache
+def chat_cache() -> ChatCache:
+    return ChatCache()
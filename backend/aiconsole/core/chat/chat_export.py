@@ -0,0 +1,156 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Export of chats as NDJSON or Markdown, produced message group by message group from the chat store,
+so memory use does not depend on the size of the exported history.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, Literal
+
+from aiconsole.core.chat.chat_journal import (
+    flush_chat_journal,
+    get_chat_journal_path,
+    list_journaled_chat_ids,
+)
+from aiconsole.core.chat.chat_migrations import (
+    CHAT_SCHEMA_VERSION,
+    migrate_chat_document,
+)
+from aiconsole.core.chat.chat_store import ChatStore, get_chat_store
+from aiconsole.core.chat.load_chat_history import chat_from_document
+
+_log = logging.getLogger(__name__)
+
+ChatExportFormat = Literal["ndjson", "markdown"]
+
+# Keys of stored documents that only matter to the running application
+_INTERNAL_KEYS = ("lock_id", "journal_seq", "schema_version", "is_analysis_in_progress")
+
+
+def export_chat(
+    chat_id: str, format: ChatExportFormat, project_path: Path | None = None, document: dict | None = None
+) -> Iterator[str] | None:
+    """
+    Chunks of the export of the stored chat, None if it is not stored.
+    document, if given, is exported instead of the stored chat, e.g. for chats with unsaved changes.
+    """
+    if document is not None:
+        stream = _split_document(document)
+    else:
+        stream = _read_stream(get_chat_store(project_path), chat_id, project_path)
+        if stream is None:
+            return None
+
+    header, message_groups = stream
+    return _EXPORTERS[format](chat_id, header, message_groups)
+
+
+def export_project_chats(format: ChatExportFormat, project_path: Path | None = None) -> Iterator[str]:
+    """Chunks of the export of all chats of the project, most recently modified first."""
+    store = get_chat_store(project_path)
+    stored_chat_ids = store.list_chat_ids()
+
+    # Chats not written yet, e.g. after a crash, exist only in their journals and not every store lists them
+    known_chat_ids = set(stored_chat_ids)
+    journal_only_chat_ids = [
+        chat_id for chat_id in list_journaled_chat_ids(project_path) if chat_id not in known_chat_ids
+    ]
+
+    is_first = True
+    for chat_id in journal_only_chat_ids + stored_chat_ids:
+        try:
+            stream = _read_stream(store, chat_id, project_path)
+        except (OSError, ValueError) as e:
+            _log.error(f"Skipping chat {chat_id} in the export: {e}")
+            continue
+
+        if stream is None:
+            continue
+
+        if format == "markdown" and not is_first:
+            yield "\n---\n\n"
+        is_first = False
+
+        yield from _EXPORTERS[format](chat_id, *stream)
+
+
+def _read_stream(store: ChatStore, chat_id: str, project_path: Path | None) -> tuple[dict, Iterator[dict]] | None:
+    # Mutations journaled since the chat was written are only in the journal, the chat is loaded to replay them
+    flush_chat_journal(chat_id)
+    if get_chat_journal_path(chat_id, project_path).exists():
+        stored = store.read(chat_id)
+        if stored is not None:
+            migrate_chat_document(stored[0])
+
+        chat = chat_from_document(chat_id, stored, project_path)
+        return _split_document(chat.model_dump(mode="json", exclude={"id", "last_modified"}))
+
+    stream = store.read_stream(chat_id)
+
+    # Documents of older schemas are migrated as a whole
+    if stream is not None and stream[0].get("schema_version") != CHAT_SCHEMA_VERSION:
+        # Releases the file or connection held by the unread message groups
+        close = getattr(stream[1], "close", None)
+        if close is not None:
+            close()
+
+        stored = store.read(chat_id)
+        if stored is None:
+            return None
+
+        migrate_chat_document(stored[0])
+        return _split_document(stored[0])
+
+    return stream
+
+
+def _split_document(document: dict) -> tuple[dict, Iterator[dict]]:
+    header = {key: value for key, value in document.items() if key != "message_groups"}
+    return header, iter(document.get("message_groups", []))
+
+
+def _export_ndjson(chat_id: str, header: dict, message_groups: Iterator[dict]) -> Iterator[str]:
+    chat = {key: value for key, value in header.items() if key not in _INTERNAL_KEYS and key != "id"}
+    yield json.dumps({"type": "chat", "id": chat_id, **chat}) + "\n"
+
+    for message_group in message_groups:
+        yield json.dumps({"type": "message_group", "chat_id": chat_id, **message_group}) + "\n"
+
+
+def _export_markdown(chat_id: str, header: dict, message_groups: Iterator[dict]) -> Iterator[str]:
+    yield f"# {header.get('name') or chat_id}\n\n"
+
+    for message_group in message_groups:
+        actor_id = message_group.get("actor_id", {})
+        yield f"## {actor_id.get('id') or actor_id.get('type', '')} ({message_group.get('role', '')})\n\n"
+
+        for message in message_group.get("messages", []):
+            if message.get("content"):
+                yield message["content"].rstrip() + "\n\n"
+
+            for tool_call in message.get("tool_calls", []):
+                yield f"```{tool_call.get('language') or ''}\n{tool_call.get('code', '').rstrip()}\n```\n\n"
+
+                if tool_call.get("output"):
+                    yield f"Output:\n\n```\n{tool_call['output'].rstrip()}\n```\n\n"
+
+
+_EXPORTERS = {
+    "ndjson": _export_ndjson,
+    "markdown": _export_markdown,
+}
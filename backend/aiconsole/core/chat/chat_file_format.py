@@ -0,0 +1,156 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Line oriented layout of chat files.
+
+Chat files are plain JSON, written with everything but the message groups on the first line
+and every message group on its own line after it:
+
+    {"name": "...", ..., "message_groups": [
+    {"id": "first group", ...},
+    {"id": "last group", ...}
+    ]}
+
+so the last message groups can be read from the end of the file without parsing the whole history.
+"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
+
+_MESSAGE_GROUPS_START = b'"message_groups": [\n'
+_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class ChatDocumentWindow:
+    header: dict  # the document without message_groups
+    message_groups: list[dict]
+    cursor: str | None  # id of the oldest group in the window if there are older ones
+
+
+def dump_chat_document(content: dict, f: IO[str]) -> None:
+    header = {key: value for key, value in content.items() if key != "message_groups"}
+    message_groups = content.get("message_groups", [])
+
+    header_json = json.dumps(header)
+    f.write(header_json[:-1] + (", " if header else "") + _MESSAGE_GROUPS_START.decode())
+
+    for i, message_group in enumerate(message_groups):
+        # json.dumps escapes newlines in strings, so a group never spans lines
+        f.write(json.dumps(message_group) + (",\n" if i < len(message_groups) - 1 else "\n"))
+
+    f.write("]}\n")
+
+
+def read_chat_document_window(file_path: Path, limit: int, before: str | None = None) -> ChatDocumentWindow | None:
+    """
+    Reads at most limit message groups preceding the one with id before, or the last ones if before is None.
+    Returns None if the file is not in the line layout, e.g. written by an older version.
+    """
+    with open(file_path, "rb") as f:
+        header = read_chat_document_header(f)
+        if header is None:
+            return None
+        header_end = f.tell()
+
+        before_prefix = ('{"id": ' + json.dumps(before)).encode() if before is not None else None
+        lines: list[bytes] = []
+        has_more = False
+
+        for line in _read_lines_backwards(f, stop=header_end):
+            if line == b"]}":
+                continue
+
+            if before_prefix is not None:
+                if line.startswith(before_prefix):
+                    before_prefix = None
+                continue
+
+            if len(lines) == limit:
+                has_more = True
+                break
+
+            lines.append(line.rstrip(b","))
+
+    message_groups = [json.loads(line) for line in reversed(lines)]
+
+    return ChatDocumentWindow(
+        header=header,
+        message_groups=message_groups,
+        cursor=message_groups[0]["id"] if has_more and message_groups else None,
+    )
+
+
+def read_chat_document_header(f: IO[bytes]) -> dict | None:
+    """
+    Reads the first line of a chat file, after it f can be passed to iter_message_groups.
+    Returns None if the file is not in the line layout.
+    """
+    first_line = f.readline()
+    if not first_line.endswith(_MESSAGE_GROUPS_START):
+        return None
+
+    return json.loads(first_line[: -len(_MESSAGE_GROUPS_START)].rstrip(b", ") + b"}")
+
+
+def iter_message_groups(f: IO[bytes]) -> Iterator[dict]:
+    """Message groups of a chat file one by one, f must be positioned after the header."""
+    for line in f:
+        line = line.rstrip(b"\n")
+        if line == b"]}":
+            return
+
+        if line:
+            yield json.loads(line.rstrip(b","))
+
+
+def window_of_document(content: dict, limit: int, before: str | None = None) -> ChatDocumentWindow:
+    """Like read_chat_document_window, for a document that is already parsed."""
+    message_groups = content.get("message_groups", [])
+
+    if before is not None:
+        ids = [message_group["id"] for message_group in message_groups]
+        message_groups = message_groups[: ids.index(before)] if before in ids else []
+
+    window = message_groups[max(len(message_groups) - limit, 0) :]
+
+    return ChatDocumentWindow(
+        header={key: value for key, value in content.items() if key != "message_groups"},
+        message_groups=window,
+        cursor=window[0]["id"] if len(message_groups) > limit and window else None,
+    )
+
+
+def _read_lines_backwards(f: IO[bytes], stop: int) -> Iterator[bytes]:
+    """Lines after offset stop, last first, without line endings."""
+    position = f.seek(0, 2)
+    remainder = b""
+
+    while position > stop:
+        size = min(_BLOCK_SIZE, position - stop)
+        position -= size
+        f.seek(position)
+
+        lines = (f.read(size) + remainder).split(b"\n")
+        remainder = lines.pop(0)
+
+        for line in reversed(lines):
+            if line:
+                yield line
+
+    if remainder:
+        yield remainder
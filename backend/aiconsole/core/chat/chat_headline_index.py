@@ -0,0 +1,257 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persisted index of chat headlines (.aic/chat_headlines.json), so listing chats does not parse every chat file.
+
+Entries are updated when a chat is saved or deleted, and trusted when chats are listed. The index is reconciled
+with the chat files when it is first listed and whenever the modification time of the history directory changes:
+chats whose file changed behind its back are loaded again, from the snapshot only, journals are not replayed.
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from aiconsole.consts import CHAT_HEADLINES_JSON
+from aiconsole.core.chat.types import Chat, ChatHeadline
+from aiconsole.core.project.paths import get_aic_directory, get_history_directory
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class _ChatFiles:
+    json_mtime_ns: int | None = None
+    journal_mtime_ns: int | None = None
+
+    @property
+    def newest_mtime_ns(self) -> int:
+        return max(self.json_mtime_ns or 0, self.journal_mtime_ns or 0)
+
+
+@dataclass
+class _IndexEntry:
+    name: str
+    last_modified: datetime
+    mtime_ns: int
+
+
+def get_headline_name(chat: Chat) -> str:
+    """The name the chat list shows, untitled chats are named after their first message."""
+    if chat.title_edited and chat.name:
+        return chat.name
+
+    for message_group in chat.message_groups:
+        for message in message_group.messages:
+            return message.content or "New Chat"
+
+    return "New Chat"
+
+
+class ChatHeadlineIndex:
+    def __init__(self, project_path: Path | None = None):
+        self.project_path = project_path
+        self.history_directory = get_history_directory(project_path)
+        self.path = get_aic_directory(project_path) / CHAT_HEADLINES_JSON
+
+        self._entries: dict[str, _IndexEntry] | None = None
+        # Modification time of the history directory when the entries were last reconciled with it
+        self._reconciled_mtime_ns: int | None = None
+        self._lock = asyncio.Lock()
+
+    def list_chat_ids(self) -> list[str]:
+        """Ids of all chats, most recently modified first. Only lists the directory."""
+        files = self._scan()
+        return sorted(files, key=lambda chat_id: files[chat_id].newest_mtime_ns, reverse=True)
+
+    async def headlines(self, offset: int = 0, limit: int | None = None) -> list[ChatHeadline]:
+        """Headlines of the chats, most recently modified first."""
+        async with self._lock:
+            entries = self._get_entries()
+
+            directory_mtime_ns = self._get_directory_mtime_ns()
+            if directory_mtime_ns != self._reconciled_mtime_ns:
+                if await self._reconcile(entries):
+                    await self._persist()
+                self._reconciled_mtime_ns = directory_mtime_ns
+
+            chat_ids = sorted(entries, key=lambda chat_id: entries[chat_id].last_modified, reverse=True)
+            page = chat_ids[offset : offset + limit if limit is not None else None]
+
+            return [
+                ChatHeadline(id=chat_id, name=entries[chat_id].name, last_modified=entries[chat_id].last_modified)
+                for chat_id in page
+            ]
+
+    async def update(self, chat: Chat) -> None:
+        """Called after the chat file was written, chat.file_mtime_ns is None if there is no file anymore."""
+        async with self._lock:
+            entries = self._get_entries()
+
+            if chat.file_mtime_ns is None:
+                if entries.pop(chat.id, None) is None:
+                    return
+            else:
+                entries[chat.id] = _IndexEntry(
+                    name=get_headline_name(chat),
+                    last_modified=datetime.fromtimestamp(chat.file_mtime_ns / 1e9),
+                    mtime_ns=chat.file_mtime_ns,
+                )
+
+            await self._persist()
+
+    async def remove(self, chat_id: str) -> None:
+        async with self._lock:
+            if self._get_entries().pop(chat_id, None) is not None:
+                await self._persist()
+
+    async def _reconcile(self, entries: dict[str, _IndexEntry]) -> bool:
+        """Brings the entries in line with the chat files, returns whether any of them changed."""
+        files = self._scan()
+        changed = False
+
+        for chat_id in list(entries):
+            if chat_id not in files:
+                del entries[chat_id]
+                changed = True
+
+        for chat_id, chat_files in files.items():
+            entry = entries.get(chat_id)
+            if entry is not None and entry.mtime_ns == (chat_files.json_mtime_ns or 0):
+                continue
+
+            if chat_files.json_mtime_ns is None:
+                # Only journaled so far, the entry is updated when the journal is compacted into a snapshot
+                entry = _IndexEntry(
+                    name="New Chat",
+                    last_modified=datetime.fromtimestamp(chat_files.newest_mtime_ns / 1e9),
+                    mtime_ns=0,
+                )
+            else:
+                entry = await self._load_entry(chat_id, chat_files.json_mtime_ns)
+                if entry is None:
+                    continue
+
+            entries[chat_id] = entry
+            changed = True
+
+        return changed
+
+    async def _load_entry(self, chat_id: str, mtime_ns: int) -> _IndexEntry | None:
+        # Imported here, loading chats depends on saving them, which updates this index
+        from aiconsole.core.chat.load_chat_history import load_chat_history
+
+        try:
+            chat = await load_chat_history(chat_id, self.project_path, replay_journal=False)
+        except Exception as e:
+            _log.exception(f"Failed to load headline of chat {chat_id}: {e}")
+            return None
+
+        return _IndexEntry(name=get_headline_name(chat), last_modified=chat.last_modified, mtime_ns=mtime_ns)
+
+    def _get_directory_mtime_ns(self) -> int:
+        try:
+            return self.history_directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _scan(self) -> dict[str, _ChatFiles]:
+        # Imported here, the journal and the chat store save chats, which updates this index
+        from aiconsole.core.chat.chat_journal import JOURNAL_SUFFIX
+        from aiconsole.core.chat.json_chat_store import ARCHIVE_SUFFIX
+
+        files: dict[str, _ChatFiles] = {}
+
+        if not self.history_directory.is_dir():
+            return files
+
+        with os.scandir(self.history_directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+
+                if entry.name.endswith(".json"):
+                    files.setdefault(
+                        entry.name[: -len(".json")], _ChatFiles()
+                    ).json_mtime_ns = entry.stat().st_mtime_ns
+                elif entry.name.endswith(ARCHIVE_SUFFIX):
+                    chat_files = files.setdefault(entry.name[: -len(ARCHIVE_SUFFIX)], _ChatFiles())
+                    chat_files.json_mtime_ns = chat_files.json_mtime_ns or entry.stat().st_mtime_ns
+                elif entry.name.endswith(JOURNAL_SUFFIX):
+                    chat_files = files.setdefault(entry.name[: -len(JOURNAL_SUFFIX)], _ChatFiles())
+                    chat_files.journal_mtime_ns = entry.stat().st_mtime_ns
+
+        return files
+
+    def _get_entries(self) -> dict[str, _IndexEntry]:
+        if self._entries is None:
+            self._entries = {}
+
+            try:
+                with open(self.path, "r", encoding="utf8", errors="replace") as f:
+                    data = json.load(f)
+
+                for chat_id, entry in data["headlines"].items():
+                    self._entries[chat_id] = _IndexEntry(
+                        name=entry["name"],
+                        last_modified=datetime.fromisoformat(entry["last_modified"]),
+                        mtime_ns=entry["mtime_ns"],
+                    )
+            except FileNotFoundError:
+                pass
+            except (ValueError, KeyError, TypeError) as e:
+                _log.warning(f"Rebuilding corrupted chat headline index {self.path}: {e}")
+                self._entries = {}
+
+        return self._entries
+
+    async def _persist(self) -> None:
+        content = {
+            "headlines": {
+                chat_id: {
+                    "name": entry.name,
+                    "last_modified": entry.last_modified.isoformat(),
+                    "mtime_ns": entry.mtime_ns,
+                }
+                for chat_id, entry in self._get_entries().items()
+            }
+        }
+
+        await asyncio.to_thread(_write_index_file, self.path, content)
+
+
+def _write_index_file(path: Path, content: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf8", errors="replace") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+_indexes: dict[Path, ChatHeadlineIndex] = {}
+
+
+def get_chat_headline_index(project_path: Path | None = None) -> ChatHeadlineIndex:
+    history_directory = get_history_directory(project_path).absolute()
+
+    if history_directory not in _indexes:
+        _indexes[history_directory] = ChatHeadlineIndex(project_path or history_directory.parent)
+
+    return _indexes[history_directory]
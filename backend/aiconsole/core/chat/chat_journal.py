@@ -0,0 +1,183 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Append-only journal of chat mutations.
+
+Every applied mutation is written to chats/<id>.journal with an increasing sequence number.
+The chat snapshot (chats/<id>.json) stores the last sequence number folded into it,
+loading replays only newer records, and compaction folds the journal into a new snapshot.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import IO, Annotated, Iterator
+
+from pydantic import Field, TypeAdapter, ValidationError
+
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_mutations import ChatMutation
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import Chat
+from aiconsole.core.project.paths import get_history_directory
+
+_log = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+
+_mutation_adapter: TypeAdapter[ChatMutation] = TypeAdapter(
+    Annotated[ChatMutation, Field(discriminator="type")]  # type: ignore[arg-type]
+)
+
+
+def get_chat_journal_path(chat_id: str, project_path: Path | None = None) -> Path:
+    return get_history_directory(project_path) / f"{chat_id}{JOURNAL_SUFFIX}"
+
+
+class ChatJournal:
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.path = get_chat_journal_path(chat_id)
+        self._file: IO[str] | None = None
+        self.size = 0
+
+    def append(self, seq: int, mutation: ChatMutation) -> None:
+        """Buffered, call flush to hand the records over to the OS."""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf8", errors="replace")
+            self.size = self.path.stat().st_size
+
+        line = json.dumps({"seq": seq, "mutation": mutation.model_dump(mode="json")}) + "\n"
+        self._file.write(line)
+        self.size += len(line)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def truncate(self, up_to_seq: int) -> None:
+        """Drops records already folded into the snapshot."""
+        self.close()
+
+        remaining = [line for seq, _, line in _read_journal(self.path) if seq > up_to_seq]
+
+        self.size = sum(len(line) for line in remaining)
+
+        if not remaining:
+            self.path.unlink(missing_ok=True)
+            return
+
+        tmp_path = self.path.with_suffix(JOURNAL_SUFFIX + ".tmp")
+        with open(tmp_path, "w", encoding="utf8", errors="replace") as f:
+            f.writelines(remaining)
+        os.replace(tmp_path, self.path)
+
+
+_journals: dict[str, ChatJournal] = {}
+
+
+def get_chat_journal(chat_id: str) -> ChatJournal:
+    if chat_id not in _journals:
+        _journals[chat_id] = ChatJournal(chat_id)
+
+    return _journals[chat_id]
+
+
+def close_chat_journal(chat_id: str) -> None:
+    journal = _journals.pop(chat_id, None)
+    if journal is not None:
+        journal.close()
+
+
+def flush_chat_journal(chat_id: str) -> None:
+    """Hands the buffered records of an open journal over to the OS, so readers of the file see them."""
+    journal = _journals.get(chat_id)
+    if journal is not None:
+        journal.flush()
+
+
+def list_journaled_chat_ids(project_path: Path | None = None) -> list[str]:
+    """Ids of the chats with a journal, most recently written first."""
+    versions: dict[str, int] = {}
+
+    for path in get_history_directory(project_path).glob(f"*{JOURNAL_SUFFIX}"):
+        try:
+            versions[path.name.removesuffix(JOURNAL_SUFFIX)] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            # Compacted in the meantime
+            continue
+
+    return sorted(versions, key=versions.__getitem__, reverse=True)
+
+
+def journal_mutation(chat: Chat, mutation: ChatMutation) -> None:
+    chat.journal_seq += 1
+    get_chat_journal(chat.id).append(chat.journal_seq, mutation)
+
+
+def replay_chat_journal(chat: Chat, project_path: Path | None = None) -> None:
+    """Applies journal records newer than the snapshot the chat was loaded from."""
+    path = get_chat_journal_path(chat.id, project_path)
+
+    for seq, record, _ in _read_journal(path):
+        if seq <= chat.journal_seq:
+            continue
+
+        try:
+            apply_mutation(chat, _mutation_adapter.validate_python(record["mutation"]))
+        except (KeyError, ValueError, ValidationError) as e:
+            _log.error(f"Stopping replay of {path} at seq={seq}: {e}")
+            break
+
+        chat.journal_seq = seq
+
+
+async def compact_chat_journal(chat: Chat) -> None:
+    """Folds the journal into a new snapshot of the chat."""
+    folded_seq = chat.journal_seq
+    journal = get_chat_journal(chat.id)
+    journal.flush()
+
+    await save_chat_history(chat, scope="message_groups")
+
+    journal.truncate(up_to_seq=folded_seq)
+
+
+def _read_journal(path: Path) -> Iterator[tuple[int, dict, str]]:
+    if not path.exists():
+        return
+
+    with open(path, "r", encoding="utf8", errors="replace") as f:
+        for line in f:
+            # A crash in the middle of a write can leave the last line incomplete
+            if not line.endswith("\n"):
+                _log.warning(f"Ignoring incomplete record at the end of {path}")
+                return
+
+            try:
+                record = json.loads(line)
+                seq = record["seq"]
+            except (ValueError, KeyError):
+                _log.warning(f"Ignoring malformed record in {path}")
+                continue
+
+            yield seq, record, line
@@ -0,0 +1,172 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Fair per chat locks: waiters are queued in arrival order and the lock is handed directly to the next one on release.
+A lock exists only while it is held or waited for, get_chat_lock creates it again when it is needed.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class _LockWaiter:
+    request_id: str
+    granted: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class ChatLockStats:
+    acquired_count: int = 0
+    released_count: int = 0
+    timed_out_count: int = 0
+    cancelled_count: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+    total_hold_time: float = 0.0
+    max_hold_time: float = 0.0
+    max_queue_length: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "acquired_count": self.acquired_count,
+            "released_count": self.released_count,
+            "timed_out_count": self.timed_out_count,
+            "cancelled_count": self.cancelled_count,
+            "avg_wait_time": self.total_wait_time / self.acquired_count if self.acquired_count else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "avg_hold_time": self.total_hold_time / self.released_count if self.released_count else 0.0,
+            "max_hold_time": self.max_hold_time,
+            "max_queue_length": self.max_queue_length,
+        }
+
+
+class ChatLock:
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.holder: str | None = None
+        self.stats = ChatLockStats()
+
+        self._acquired_at = 0.0
+        self._waiters: deque[_LockWaiter] = deque()
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, request_id: str, timeout: float | None = None) -> None:
+        """
+        Waits until request_id holds the lock. Acquiring a lock that request_id already holds is a no-op.
+
+        Raises asyncio.TimeoutError if the lock was not handed over within timeout seconds,
+        the waiter leaves the queue in that case and also when the waiting task is cancelled.
+        """
+        if self.holder == request_id:
+            return
+
+        now = time.monotonic()
+
+        if self.holder is None and not self._waiters:
+            self._grant(request_id, now)
+            return
+
+        waiter = _LockWaiter(
+            request_id=request_id, granted=asyncio.get_running_loop().create_future(), enqueued_at=now
+        )
+        self._waiters.append(waiter)
+        self.stats.max_queue_length = max(self.stats.max_queue_length, len(self._waiters))
+
+        _log.debug(f"Waiting for lock {self.chat_id} {request_id}, {len(self._waiters)} in queue")
+
+        try:
+            await asyncio.wait_for(waiter.granted, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if self.holder == request_id:
+                # Handed over at the same moment, pass it on so the queue does not stall
+                self.release(request_id)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._discard_if_idle()
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats.timed_out_count += 1
+            else:
+                self.stats.cancelled_count += 1
+            raise
+
+    def release(self, request_id: str) -> bool:
+        """Hands the lock over to the next waiter. Returns False if request_id did not hold it."""
+        if self.holder != request_id:
+            self._discard_if_idle()
+            return False
+
+        hold_time = time.monotonic() - self._acquired_at
+        self.stats.released_count += 1
+        self.stats.total_hold_time += hold_time
+        self.stats.max_hold_time = max(self.stats.max_hold_time, hold_time)
+
+        self.holder = None
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.granted.done():
+                self._grant(waiter.request_id, waiter.enqueued_at)
+                waiter.granted.set_result(None)
+                break
+
+        self._discard_if_idle()
+        return True
+
+    def as_dict(self) -> dict:
+        return {
+            "chat_id": self.chat_id,
+            "holder": self.holder,
+            "held_for": time.monotonic() - self._acquired_at if self.holder else 0.0,
+            "queue_length": self.queue_length,
+            **self.stats.as_dict(),
+        }
+
+    def _discard_if_idle(self) -> None:
+        if self.holder is None and not self._waiters and _locks.get(self.chat_id) is self:
+            del _locks[self.chat_id]
+
+    def _grant(self, request_id: str, enqueued_at: float) -> None:
+        self._acquired_at = time.monotonic()
+        self.holder = request_id
+
+        wait_time = self._acquired_at - enqueued_at
+        self.stats.acquired_count += 1
+        self.stats.total_wait_time += wait_time
+        self.stats.max_wait_time = max(self.stats.max_wait_time, wait_time)
+
+
+_locks: dict[str, ChatLock] = {}
+
+
+def get_chat_lock(chat_id: str) -> ChatLock:
+    if chat_id not in _locks:
+        _locks[chat_id] = ChatLock(chat_id)
+
+    return _locks[chat_id]
+
+
+def chat_locks_stats() -> list[dict]:
+    return [lock.as_dict() for lock in _locks.values()]
@@ -0,0 +1,233 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Ordered migrations of the chat document.
+
+Every chat file stores the schema_version it was written with (files without one are at version 0),
+so loading runs only the migrations added after the file was written. Migrated files are written back once.
+
+All chats of a project, archived ones included, can be migrated up front in a process pool:
+
+    python -m aiconsole.core.chat.chat_migrations <project directory>
+"""
+import argparse
+import asyncio
+import json
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.project.paths import get_project_directory
+
+_log = logging.getLogger(__name__)
+
+
+def _convert_messages_to_message_groups(data: dict) -> None:
+    if "message_groups" not in data or not data["message_groups"]:
+        data["message_groups"] = []
+
+        if "messages" in data and data["messages"]:
+            for message in data["messages"]:
+                data["message_groups"].append(
+                    {
+                        "id": message["id"] if "id" in message else uuid.uuid4().hex,
+                        "role": message["role"] if "role" in message else "",
+                        "task": message["task"] if "task" in message and message["task"] else "",
+                        "agent_id": message["agent_id"] if "agent_id" in message else "",
+                        "materials_ids": (
+                            message["materials_ids"] if "materials_ids" in message and message["materials_ids"] else []
+                        ),
+                        "messages": [
+                            {
+                                "id": message["id"] if "id" in message else uuid.uuid4().hex,
+                                "timestamp": message["timestamp"] if "timestamp" in message else "",
+                                "content": message["content"] if "content" in message else "",
+                            }
+                        ],
+                    }
+                )
+            del data["messages"]
+
+
+def _iterate_messages(data: dict):
+    for group in data["message_groups"]:
+        if "messages" in group and group["messages"]:
+            yield from group["messages"]
+
+
+def _iterate_tool_calls(data: dict):
+    for msg in _iterate_messages(data):
+        if "tool_calls" in msg and msg["tool_calls"]:
+            yield from msg["tool_calls"]
+
+
+def _add_tool_calls(data: dict) -> None:
+    for msg in _iterate_messages(data):
+        if "tool_calls" not in msg:
+            msg["tool_calls"] = []
+
+
+def _add_tool_call_headlines(data: dict) -> None:
+    for tool_call in _iterate_tool_calls(data):
+        if "headline" not in tool_call:
+            tool_call["headline"] = ""
+
+
+def _convert_shell_tool_calls_to_python(data: dict) -> None:
+    for tool_call in _iterate_tool_calls(data):
+        if "language" in tool_call and tool_call["language"] == "shell":
+            tool_call["language"] = "python"
+
+
+def _add_tool_call_types(data: dict) -> None:
+    for tool_call in _iterate_tool_calls(data):
+        if "type" not in tool_call:
+            tool_call["type"] = "function"
+
+
+def _convert_agent_ids_to_actor_ids(data: dict) -> None:
+    for group in data["message_groups"]:
+        if "agent_id" in group:
+            group["actor_id"] = {
+                "type": "user" if group["agent_id"] == "user" else "agent",
+                "id": group["agent_id"],
+            }
+            del group["agent_id"]
+
+
+def _add_analysis(data: dict) -> None:
+    for group in data["message_groups"]:
+        if "analysis" not in group:
+            group["analysis"] = ""
+
+
+def _convert_headline_and_title_to_name(data: dict) -> None:
+    if "name" not in data or not data["name"]:
+        if "headline" in data and data["headline"]:
+            data["name"] = data["headline"]
+        elif "title" in data and data["title"]:
+            data["name"] = data["title"]
+
+
+# Append only, the position of a migration is the schema version it upgrades from
+_MIGRATIONS: list[Callable[[dict], None]] = [
+    _convert_messages_to_message_groups,
+    _add_tool_calls,
+    _add_tool_call_headlines,
+    _convert_shell_tool_calls_to_python,
+    _add_tool_call_types,
+    _convert_agent_ids_to_actor_ids,
+    _add_analysis,
+    _convert_headline_and_title_to_name,
+]
+
+CHAT_SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def migrate_chat_document(data: dict) -> bool:
+    """Upgrades the document in place to CHAT_SCHEMA_VERSION, returns False if it already was up to date."""
+    version = data.get("schema_version", 0)
+
+    if version >= CHAT_SCHEMA_VERSION:
+        return False
+
+    for migration in _MIGRATIONS[version:]:
+        migration(data)
+
+    data["schema_version"] = CHAT_SCHEMA_VERSION
+    return True
+
+
+@dataclass
+class ChatMigrationReport:
+    migrated: int = 0
+    up_to_date: int = 0
+    failed: int = 0
+
+
+async def migrate_project_chats(
+    project_path: Path | None = None, max_workers: int | None = None
+) -> ChatMigrationReport:
+    """
+    Migrates all stored chats of the project, archived ones included. Documents are read and migrated
+    in a process pool and written back like on load, so chats saved in the meantime are left alone.
+    """
+    # Imported here, saving chats depends on the schema version of this module
+    from aiconsole.core.chat.save_chat_history import write_migrated_chat
+
+    report = ChatMigrationReport()
+
+    # Worker processes have no current project
+    project_path = get_project_directory(project_path).absolute()
+    store = get_chat_store(project_path)
+
+    chat_ids = store.list_chat_ids()
+    if not chat_ids:
+        return report
+
+    loop = asyncio.get_running_loop()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        migrations = [
+            (chat_id, loop.run_in_executor(executor, _read_migrated_chat, project_path, chat_id))
+            for chat_id in chat_ids
+        ]
+
+        for chat_id, migration in migrations:
+            try:
+                migrated = await migration
+            except Exception as e:
+                _log.exception(f"Failed to migrate chat {chat_id}: {e}")
+                report.failed += 1
+                continue
+
+            if migrated is None:
+                report.up_to_date += 1
+            elif await write_migrated_chat(chat_id, *migrated, project_path) is not None:
+                report.migrated += 1
+            elif store.get_version(chat_id) != migrated[1]:
+                report.up_to_date += 1  # saved by the app meanwhile, which writes the current schema
+            else:
+                report.failed += 1
+
+    return report
+
+
+def _read_migrated_chat(project_path: Path, chat_id: str) -> tuple[dict, int] | None:
+    """Runs in a worker process, the migrated document and the version it was read at, None if up to date."""
+    stored = get_chat_store(project_path).read(chat_id)
+    if stored is None or not migrate_chat_document(stored[0]):
+        return None
+
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate all chats of a project to the current chat schema")
+    parser.add_argument("project", type=Path, help="Project directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, CPU count by default")
+    args = parser.parse_args()
+
+    report = asyncio.run(migrate_project_chats(args.project, max_workers=args.workers))
+    print(json.dumps(asdict(report)))
+
+
+if __name__ == "__main__":
+    main()
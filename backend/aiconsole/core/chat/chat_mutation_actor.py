@@ -0,0 +1,146 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Per chat worker that runs mutations and other chat operations one by one, in FIFO order
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from aiconsole.consts import (
+    CHAT_MUTATION_ACTOR_IDLE_TIMEOUT,
+    CHAT_MUTATION_QUEUE_SIZE,
+)
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class _ChatOperation:
+    run: Callable[[], Awaitable[None]]
+    done: asyncio.Future
+    enqueued_at: float
+
+
+class ChatMutationActor:
+    def __init__(self, chat_id: str, max_queue_size: int = CHAT_MUTATION_QUEUE_SIZE):
+        self.chat_id = chat_id
+        self._queue: asyncio.Queue[_ChatOperation] = asyncio.Queue(maxsize=max_queue_size)
+        self._worker: asyncio.Task | None = None
+        self._is_running_operation = False
+
+        self.processed_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + (1 if self._is_running_operation else 0)
+
+    async def submit(self, run: Callable[[], Awaitable[None]]) -> asyncio.Future:
+        """
+        Enqueues the operation, waiting for a free slot if the queue is full.
+        Returns a future that is resolved once the operation has finished.
+        """
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(_ChatOperation(run=run, done=done, enqueued_at=time.monotonic()))
+        self._ensure_worker()
+        return done
+
+    async def run(self, run: Callable[[], Awaitable[None]]) -> None:
+        await (await self.submit(run))
+
+    async def wait_until_idle(self) -> None:
+        """Waits for all operations enqueued so far."""
+
+        async def noop():
+            pass
+
+        await self.run(noop)
+
+    def stats(self) -> dict:
+        return {
+            "chat_id": self.chat_id,
+            "queue_depth": self.queue_depth,
+            "processed_count": self.processed_count,
+            "avg_latency": self.total_latency / self.processed_count if self.processed_count else 0.0,
+            "max_latency": self.max_latency,
+            "last_latency": self.last_latency,
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                operation = await asyncio.wait_for(self._queue.get(), timeout=CHAT_MUTATION_ACTOR_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if self._queue.empty():
+                    _remove_idle_actor(self)
+                    return
+                continue
+
+            self._is_running_operation = True
+            try:
+                await operation.run()
+            except asyncio.CancelledError:
+                if not operation.done.done():
+                    operation.done.cancel()
+
+                # Only the cancellation of the worker itself stops it, not one raised inside the operation
+                worker = asyncio.current_task()
+                if worker is not None and worker.cancelling():
+                    raise
+            except Exception as e:
+                _log.exception(f"Chat operation failed for chat {self.chat_id}: {e}")
+                if not operation.done.done():
+                    operation.done.set_exception(e)
+            else:
+                if not operation.done.done():
+                    operation.done.set_result(None)
+            finally:
+                self._is_running_operation = False
+                self._queue.task_done()
+
+                latency = time.monotonic() - operation.enqueued_at
+                self.processed_count += 1
+                self.total_latency += latency
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+
+
+_actors: dict[str, ChatMutationActor] = {}
+
+
+def get_chat_mutation_actor(chat_id: str) -> ChatMutationActor:
+    if chat_id not in _actors:
+        _actors[chat_id] = ChatMutationActor(chat_id)
+
+    return _actors[chat_id]
+
+
+def chat_mutation_actors_stats() -> list[dict]:
+    return [actor.stats() for actor in _actors.values()]
+
+
+def _remove_idle_actor(actor: ChatMutationActor) -> None:
+    if _actors.get(actor.chat_id) is actor:
+        del _actors[actor.chat_id]
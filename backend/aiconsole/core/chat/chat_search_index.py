@@ -0,0 +1,265 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Full-text index of chat history (.aic/chat_search.db), an SQLite FTS5 table over chat names,
+message contents, tool call code and tool call outputs.
+
+Saving a chat re-indexes only the entries whose text changed. Chat files changed outside of the process
+are picked up by the first search, which compares the versions of the stored chats with the indexed ones.
+"""
+import asyncio
+import logging
+import re
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Literal
+
+from aiconsole.consts import CHAT_SEARCH_DB
+from aiconsole.core.chat.chat_migrations import migrate_chat_document
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.project.paths import get_aic_directory, get_history_directory
+
+_log = logging.getLogger(__name__)
+
+ChatSearchEntryKind = Literal["name", "message", "code", "output"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    message_group_id TEXT,
+    message_id TEXT,
+    tool_call_id TEXT,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_chat_id ON entries (chat_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    content, content='entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+@dataclass
+class ChatSearchHit:
+    chat_id: str
+    kind: ChatSearchEntryKind
+    message_group_id: str | None
+    message_id: str | None
+    tool_call_id: str | None
+    snippet: str
+    score: float
+
+
+@dataclass(frozen=True)
+class _Entry:
+    kind: ChatSearchEntryKind
+    message_group_id: str | None
+    message_id: str | None
+    tool_call_id: str | None
+    content: str
+
+    @property
+    def key(self) -> tuple:
+        return self.kind, self.message_group_id, self.message_id, self.tool_call_id
+
+
+class ChatSearchIndex:
+    def __init__(self, project_path: Path | None = None):
+        self.project_path = project_path
+        self.path = get_aic_directory(project_path) / CHAT_SEARCH_DB
+
+        self._is_synced = False
+        self._lock = asyncio.Lock()
+
+    async def search(self, query: str, limit: int = 20) -> list[ChatSearchHit]:
+        """Best matching entries first. Every word of the query must match, the last one as a prefix."""
+        match = _to_match_expression(query)
+        if match is None:
+            return []
+
+        async with self._lock:
+            if not self._is_synced:
+                await asyncio.to_thread(self._sync)
+                self._is_synced = True
+
+        return await asyncio.to_thread(self._search, match, limit)
+
+    async def update(self, chat_id: str, content: dict | None, version: int | None) -> None:
+        """
+        Called after the chat file was written, with the document written to it.
+        content is None if there is no file anymore.
+        """
+        async with self._lock:
+            await asyncio.to_thread(self._update, chat_id, content, version)
+
+    async def remove(self, chat_id: str) -> None:
+        await self.update(chat_id, None, None)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _search(self, match: str, limit: int) -> list[ChatSearchHit]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                """
+                SELECT entries.chat_id, entries.kind, entries.message_group_id, entries.message_id,
+                       entries.tool_call_id, snippet(entries_fts, 0, '<mark>', '</mark>', '…', 16), entries_fts.rank
+                FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid
+                WHERE entries_fts MATCH ?
+                ORDER BY entries_fts.rank
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+
+        return [
+            ChatSearchHit(
+                chat_id=chat_id,
+                kind=kind,
+                message_group_id=message_group_id,
+                message_id=message_id,
+                tool_call_id=tool_call_id,
+                snippet=snippet,
+                score=-rank,  # bm25 ranks better matches lower
+            )
+            for chat_id, kind, message_group_id, message_id, tool_call_id, snippet, rank in rows
+        ]
+
+    def _update(self, chat_id: str, content: dict | None, version: int | None) -> None:
+        with closing(self._connect()) as connection, connection:
+            self._index_chat(connection, chat_id, content, version)
+
+    def _index_chat(
+        self, connection: sqlite3.Connection, chat_id: str, content: dict | None, version: int | None
+    ) -> None:
+        indexed: dict[tuple, tuple[int, str]] = {
+            (kind, message_group_id, message_id, tool_call_id): (rowid, text)
+            for rowid, kind, message_group_id, message_id, tool_call_id, text in connection.execute(
+                "SELECT id, kind, message_group_id, message_id, tool_call_id, content FROM entries WHERE chat_id = ?",
+                (chat_id,),
+            )
+        }
+
+        entries = {entry.key: entry for entry in _entries_of_document(content)} if content is not None else {}
+
+        stale_rowids = [
+            (rowid,) for key, (rowid, text) in indexed.items() if key not in entries or entries[key].content != text
+        ]
+        new_entries = [
+            (chat_id, entry.kind, entry.message_group_id, entry.message_id, entry.tool_call_id, entry.content)
+            for key, entry in entries.items()
+            if key not in indexed or indexed[key][1] != entry.content
+        ]
+
+        connection.executemany("DELETE FROM entries WHERE id = ?", stale_rowids)
+        connection.executemany(
+            "INSERT INTO entries (chat_id, kind, message_group_id, message_id, tool_call_id, content) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            new_entries,
+        )
+
+        if content is None:
+            connection.execute("DELETE FROM chats WHERE chat_id = ?", (chat_id,))
+        else:
+            connection.execute(
+                "INSERT OR REPLACE INTO chats (chat_id, version) VALUES (?, ?)", (chat_id, version or 0)
+            )
+
+    def _sync(self) -> None:
+        """Re-indexes chats changed since they were indexed and drops chats that are not stored anymore."""
+        store = get_chat_store(self.project_path)
+        versions = store.list_versions()
+
+        with closing(self._connect()) as connection:
+            indexed = dict(connection.execute("SELECT chat_id, version FROM chats").fetchall())
+
+            for chat_id in indexed.keys() - versions.keys():
+                with connection:
+                    self._index_chat(connection, chat_id, None, None)
+
+            for chat_id, version in versions.items():
+                if indexed.get(chat_id) == version:
+                    continue
+
+                try:
+                    stored = store.read(chat_id)
+                    if stored is None:
+                        continue
+
+                    content = stored[0]
+                    migrate_chat_document(content)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    _log.warning(f"Not indexing chat {chat_id}: {e}")
+                    continue
+
+                with connection:
+                    self._index_chat(connection, chat_id, content, version)
+
+
+def _entries_of_document(content: dict) -> Iterator[_Entry]:
+    if content.get("name"):
+        yield _Entry("name", None, None, None, content["name"])
+
+    for message_group in content.get("message_groups", []):
+        for message in message_group.get("messages", []):
+            if message.get("content"):
+                yield _Entry("message", message_group["id"], message["id"], None, message["content"])
+
+            for tool_call in message.get("tool_calls", []):
+                if tool_call.get("code"):
+                    yield _Entry("code", message_group["id"], message["id"], tool_call["id"], tool_call["code"])
+                if tool_call.get("output"):
+                    yield _Entry("output", message_group["id"], message["id"], tool_call["id"], tool_call["output"])
+
+
+def _to_match_expression(query: str) -> str | None:
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+
+    # Quoted, so words are never interpreted as FTS5 operators
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+_indexes: dict[Path, ChatSearchIndex] = {}
+
+
+def get_chat_search_index(project_path: Path | None = None) -> ChatSearchIndex:
+    history_directory = get_history_directory(project_path).absolute()
+
+    if history_directory not in _indexes:
+        _indexes[history_directory] = ChatSearchIndex(project_path or history_directory.parent)
+
+    return _indexes[history_directory]
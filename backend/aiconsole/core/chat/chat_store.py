@@ -0,0 +1,103 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persistence of chat documents, the dicts save_chat_history builds from chats and load_chat_history builds chats from.
+
+Every stored chat has a version, an int that changes whenever the chat is written,
+so the cache and the indexes can tell whether what they hold is still current.
+"""
+from pathlib import Path
+from typing import Iterator, Protocol
+
+from aiconsole.consts import CHAT_STORE
+from aiconsole.core.chat.chat_file_format import ChatDocumentWindow
+from aiconsole.core.chat.json_chat_store import JsonChatStore
+from aiconsole.core.chat.sqlite_chat_store import SqliteChatStore
+from aiconsole.core.chat.types import Chat, ChatHeadline
+from aiconsole.core.project.paths import get_history_directory
+
+
+class ChatStore(Protocol):
+    project_path: Path
+
+    def read(self, chat_id: str) -> tuple[dict, int] | None:
+        """The stored document and its version, None if the chat is not stored."""
+        ...
+
+    def write(self, chat_id: str, content: dict | None, scopes: set[str] | None = None) -> int | None:
+        """
+        Replaces the stored document, None content deletes it. Returns the new version.
+        Stores may skip the parts of the document outside scopes, the scopes modified since the last write.
+        """
+        ...
+
+    def get_version(self, chat_id: str) -> int | None:
+        ...
+
+    def read_window(
+        self, chat_id: str, limit: int, before: str | None = None
+    ) -> tuple[ChatDocumentWindow, int] | None:
+        """At most limit message groups preceding the one with id before, or the last ones if before is None."""
+        ...
+
+    def read_stream(self, chat_id: str) -> tuple[dict, Iterator[dict]] | None:
+        """
+        The stored document without message_groups and an iterator over its message groups,
+        reading them one by one where the backend allows it. None if the chat is not stored.
+        """
+        ...
+
+    def list_versions(self) -> dict[str, int]:
+        ...
+
+    def list_chat_ids(self) -> list[str]:
+        """Ids of all chats, most recently modified first."""
+        ...
+
+    async def headlines(self, offset: int = 0, limit: int | None = None) -> list[ChatHeadline]:
+        """Headlines of the chats, most recently modified first."""
+        ...
+
+    async def update_headline(self, chat: Chat) -> None:
+        """Called after the chat was written."""
+        ...
+
+    async def delete(self, chat_id: str) -> bool:
+        ...
+
+    def close(self) -> None:
+        """Releases what the store holds open, it is reopened when used again."""
+        ...
+
+
+_stores: dict[Path, ChatStore] = {}
+
+
+def get_chat_store(project_path: Path | None = None) -> ChatStore:
+    history_directory = get_history_directory(project_path).absolute()
+
+    if history_directory not in _stores:
+        project_path = project_path or history_directory.parent
+        _stores[history_directory] = (
+            SqliteChatStore(project_path) if CHAT_STORE == "sqlite" else JsonChatStore(project_path)
+        )
+
+    return _stores[history_directory]
+
+
+def close_chat_stores() -> None:
+    for store in _stores.values():
+        store.close()
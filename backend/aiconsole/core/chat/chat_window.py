@@ -0,0 +1,128 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Windows of the last message groups of a chat, so opening a long chat does not transfer its whole history.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_journal import get_chat_journal_path
+from aiconsole.core.chat.chat_migrations import CHAT_SCHEMA_VERSION
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.locking import (
+    chats,
+    get_chat_snapshot,
+    read_chat_outside_of_lock,
+)
+from aiconsole.core.chat.types import AICMessageGroup, Chat
+
+
+@dataclass
+class ChatWindow:
+    chat: Chat  # contains only the message groups of the window
+    cursor: str | None  # pass as before to get the preceding window, None if there are no older message groups
+
+
+def window_of_chat(chat: Chat, limit: int | None, before: str | None = None) -> ChatWindow:
+    message_groups = chat.message_groups
+
+    if before is not None:
+        ids = [message_group.id for message_group in message_groups]
+        message_groups = message_groups[: ids.index(before)] if before in ids else []
+
+    if limit is None or len(message_groups) <= limit:
+        window, cursor = message_groups, None
+    else:
+        window = message_groups[len(message_groups) - limit :]
+        cursor = window[0].id if window else None
+
+    window_chat = chat.model_copy(update={"message_groups": window})
+    # The shallow copy shares the id indexes of the whole chat
+    window_chat.rebuild_indexes()
+
+    return ChatWindow(chat=window_chat, cursor=cursor)
+
+
+async def open_chat_window(chat_id: str, limit: int | None, subscribe: Callable[[], None]) -> ChatWindow:
+    """
+    The last limit message groups of the last committed version of the chat, all of them if limit is None.
+
+    subscribe is called at the exact point the window was taken, afterwards the subscriber must be sent
+    every mutation published to the chat. Send the window before awaiting anything else.
+    """
+    if limit is not None and not _is_in_memory(chat_id):
+        stored_window = await _read_stored_window(chat_id, limit)
+
+        # Valid only if nobody started writing to the chat while it was read
+        if stored_window is not None and _is_stored_version_unchanged(chat_id, stored_window[1]):
+            subscribe()
+            return stored_window[0]
+
+    chat = await read_chat_outside_of_lock(chat_id)
+    subscribe()
+    return window_of_chat(get_chat_snapshot(chat), limit)
+
+
+async def read_older_message_groups(chat_id: str, before: str, limit: int) -> ChatWindow:
+    if not _is_in_memory(chat_id):
+        stored_window = await _read_stored_window(chat_id, limit, before)
+        if stored_window is not None:
+            return stored_window[0]
+
+    chat = await read_chat_outside_of_lock(chat_id)
+    return window_of_chat(get_chat_snapshot(chat), limit, before)
+
+
+def _is_in_memory(chat_id: str) -> bool:
+    return chat_id in chats or chat_cache().is_cached(chat_id)
+
+
+def _is_stored_version_unchanged(chat_id: str, version: int) -> bool:
+    if _is_in_memory(chat_id) or get_chat_journal_path(chat_id).exists():
+        return False
+
+    return get_chat_store().get_version(chat_id) == version
+
+
+async def _read_stored_window(chat_id: str, limit: int, before: str | None = None) -> tuple[ChatWindow, int] | None:
+    """The window read from the chat store alone and the version it was read at, None if the chat must be loaded."""
+    # Journaled mutations are only applied by a full load
+    if get_chat_journal_path(chat_id).exists():
+        return None
+
+    stored = await asyncio.to_thread(get_chat_store().read_window, chat_id, limit, before)
+
+    # Older layouts and schemas are converted by a full load
+    if stored is None or stored[0].header.get("schema_version") != CHAT_SCHEMA_VERSION:
+        return None
+
+    document_window, version = stored
+
+    header = document_window.header
+    for key in ("id", "last_modified", "schema_version", "journal_seq"):
+        header.pop(key, None)
+
+    chat = Chat(
+        id=chat_id,
+        last_modified=datetime.fromtimestamp(version / 1e9),
+        message_groups=[AICMessageGroup(**message_group) for message_group in document_window.message_groups],
+        **header,
+    )
+
+    return ChatWindow(chat=chat, cursor=document_window.cursor), version
@@ -0,0 +1,317 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Import of the conversations.json file of a ChatGPT data export.
+
+The file is parsed one conversation at a time, conversations are converted to chats in a process pool
+and written to the chat store in batches. Conversations that were imported before keep their chat.
+"""
+import asyncio
+import codecs
+import json
+import logging
+import multiprocessing
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Iterator
+
+from pydantic import ValidationError
+
+from aiconsole.consts import CHATGPT_IMPORT_BATCH_SIZE
+from aiconsole.core.chat.chat_store import ChatStore, get_chat_store
+from aiconsole.core.chat.save_chat_history import (
+    build_chat_document,
+    update_chat_indexes,
+)
+from aiconsole.core.chat.types import Chat
+
+_log = logging.getLogger(__name__)
+
+_READ_SIZE = 1024 * 1024
+
+_STRUCTURAL_CHARS = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL_CHARS = re.compile(r'["\\]')
+
+
+@dataclass
+class ChatImportProgress:
+    imported: int = 0
+    skipped: int = 0  # already imported or empty
+    failed: int = 0
+    bytes_read: int = 0
+    total_bytes: int = 0
+
+
+def iter_json_array(f: IO[bytes], read_size: int = _READ_SIZE) -> Iterator[tuple[Any, int]]:
+    """
+    Items of the JSON array in f one by one, with the number of bytes read from f so far.
+    Only the item being parsed and one read are held in memory.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf8")(errors="replace")
+    buffer = ""
+    position = 0
+    bytes_read = 0
+
+    def read_more() -> bool:
+        nonlocal buffer, position, bytes_read
+        chunk = f.read(read_size)
+        bytes_read += len(chunk)
+        buffer = text_decoder.decode(chunk, final=not chunk)
+        position = 0
+        return bool(chunk)
+
+    def next_char() -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                raise ValueError("Unexpected end of the JSON array")
+
+    def read_item() -> str:
+        """Text of the item starting at position, found by tracking brackets and strings, every char is seen once."""
+        nonlocal position
+        parts = []
+        start = position
+        depth = 0
+        is_in_string = False
+        is_escaped = False
+
+        while True:
+            if position >= len(buffer):
+                parts.append(buffer[start:])
+                if not read_more():
+                    if depth == 0 and not is_in_string:
+                        return "".join(parts)  # a number at the end, json.loads reports the missing ]
+                    raise ValueError("Unexpected end of the JSON array")
+                start = 0
+                continue
+
+            if is_escaped:
+                position += 1
+                is_escaped = False
+                continue
+
+            match = (_STRING_SPECIAL_CHARS if is_in_string else _STRUCTURAL_CHARS).search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                continue
+
+            char = match.group()
+            position = match.end()
+
+            if char == "\\":
+                is_escaped = True
+            elif char == '"':
+                is_in_string = not is_in_string
+                if not is_in_string and depth == 0:
+                    break
+            elif char in "[{":
+                depth += 1
+            elif depth > 0:
+                if char in "]}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+            else:
+                # A comma or the end of the array after a number or a literal
+                position = match.start()
+                break
+
+        parts.append(buffer[start:position])
+        return "".join(parts)
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array")
+    position += 1
+
+    if next_char() == "]":
+        return
+
+    while True:
+        next_char()
+        yield json.loads(read_item()), bytes_read
+
+        char = next_char()
+        position += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"Expected , or ] after an item of the JSON array, got {char!r}")
+
+
+def convert_conversation(conversation: dict) -> tuple[str, dict | None]:
+    """Id of the chat for the conversation and its chat document, None if the conversation has no messages."""
+    conversation_id = conversation.get("conversation_id") or conversation.get("id")
+    chat_id = (
+        str(uuid.uuid5(uuid.NAMESPACE_URL, f"chatgpt:{conversation_id}")) if conversation_id else str(uuid.uuid4())
+    )
+
+    message_groups = []
+    for node in _current_branch(conversation):
+        message = node.get("message") or {}
+        role = (message.get("author") or {}).get("role")
+        if role not in ("user", "assistant"):
+            continue
+
+        content = message.get("content") or {}
+        text = "\n".join(part for part in content.get("parts") or [] if isinstance(part, str)) or content.get("text")
+        if not text or not text.strip():
+            continue
+
+        message_groups.append(
+            {
+                "id": str(uuid.uuid4()),
+                "actor_id": {"type": "agent", "id": "chatgpt"}
+                if role == "assistant"
+                else {"type": "user", "id": "user"},
+                "role": role,
+                "analysis": "",
+                "task": "",
+                "materials_ids": [],
+                "messages": [
+                    {
+                        "id": message.get("id") or str(uuid.uuid4()),
+                        "timestamp": datetime.fromtimestamp(
+                            message.get("create_time") or 0, tz=timezone.utc
+                        ).isoformat(),
+                        "content": text,
+                    }
+                ],
+            }
+        )
+
+    title = conversation.get("title")
+    chat = Chat(
+        id=chat_id,
+        name=title or "",
+        title_edited=bool(title),
+        last_modified=datetime.fromtimestamp(conversation.get("update_time") or 0, tz=timezone.utc),
+        message_groups=message_groups,
+    )
+
+    return chat_id, build_chat_document(chat)
+
+
+def _current_branch(conversation: dict) -> list[dict]:
+    """Nodes from the root of the conversation tree to its current node, edits create other branches."""
+    mapping: dict[str, dict] = conversation.get("mapping") or {}
+
+    node_id = conversation.get("current_node")
+    if node_id not in mapping:
+        node_id = next((id for id, node in mapping.items() if not node.get("children")), None)
+
+    branch = []
+    while node_id in mapping and len(branch) < len(mapping):
+        node = mapping[node_id]
+        branch.append(node)
+        node_id = node.get("parent")
+
+    return list(reversed(branch))
+
+
+async def import_chatgpt_conversations(
+    file_path: Path,
+    project_path: Path | None = None,
+    on_progress: Callable[[ChatImportProgress], Awaitable[None]] | None = None,
+    max_workers: int | None = None,
+    batch_size: int = CHATGPT_IMPORT_BATCH_SIZE,
+) -> ChatImportProgress:
+    progress = ChatImportProgress(total_bytes=file_path.stat().st_size)
+    store = get_chat_store(project_path)
+    loop = asyncio.get_running_loop()
+
+    # Spawned, forking would copy the threads and the event loop of the server into the workers
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    with open(file_path, "rb") as f, executor:
+        conversations = iter_json_array(f)
+
+        while True:
+            batch, bytes_read = await asyncio.to_thread(_read_batch, conversations, batch_size)
+            if not batch:
+                break
+
+            progress.bytes_read = bytes_read
+
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, convert_conversation, conversation) for conversation in batch),
+                return_exceptions=True,
+            )
+
+            documents = []
+            for result in results:
+                if isinstance(result, (ValidationError, ValueError, TypeError, KeyError, AttributeError)):
+                    _log.error(f"Failed to convert a conversation: {result}")
+                    progress.failed += 1
+                elif isinstance(result, BaseException):
+                    raise result
+                elif result[1] is None:
+                    progress.skipped += 1
+                else:
+                    documents.append(result)
+
+            written = await asyncio.to_thread(_write_batch, store, documents)
+            progress.imported += len(written)
+            progress.skipped += len(documents) - len(written)
+
+            for chat_id, content, version in written:
+                await update_chat_indexes(_headline_chat(chat_id, content, version), content, project_path)
+
+            if on_progress is not None:
+                await on_progress(progress)
+
+    progress.bytes_read = progress.total_bytes
+    return progress
+
+
+def _read_batch(conversations: Iterator[tuple[Any, int]], batch_size: int) -> tuple[list[dict], int]:
+    batch = []
+    bytes_read = 0
+
+    for conversation, bytes_read in conversations:
+        if isinstance(conversation, dict):
+            batch.append(conversation)
+        if len(batch) == batch_size:
+            break
+
+    return batch, bytes_read
+
+
+def _headline_chat(chat_id: str, content: dict, version: int | None) -> Chat:
+    """The written chat as the indexes see it, without validating the message groups again."""
+    # build_chat_document stores the headline as the name
+    chat = Chat(id=chat_id, name=content["name"], title_edited=True, last_modified=datetime.now(), message_groups=[])
+    chat.file_mtime_ns = version
+    return chat
+
+
+def _write_batch(store: ChatStore, documents: list[tuple[str, dict]]) -> list[tuple[str, dict, int | None]]:
+    written = []
+
+    for chat_id, content in documents:
+        if store.get_version(chat_id) is not None:
+            continue  # imported before
+
+        written.append((chat_id, content, store.write(chat_id, content)))
+
+    return written
@@ -0,0 +1,193 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from aiconsole.consts import (
+    CHAT_MUTATION_COALESCE_MAX_BYTES,
+    CHAT_MUTATION_COALESCE_MAX_DELAY,
+)
+from aiconsole.core.chat.chat_mutations import (
+    AppendToAnalysisMessageGroupMutation,
+    AppendToCodeToolCallMutation,
+    AppendToContentMessageMutation,
+    AppendToHeadlineToolCallMutation,
+    AppendToOutputToolCallMutation,
+    AppendToTaskMessageGroupMutation,
+    ChatMutation,
+)
+from aiconsole.core.chat.chat_mutator import ChatMutator
+from aiconsole.core.chat.types import Chat
+
+if TYPE_CHECKING:
+    from aiconsole.core.chat.locking import DefaultChatMutator
+
+_log = logging.getLogger(__name__)
+
+# mutation class name -> (target id field, delta field)
+_COALESCABLE_MUTATIONS: dict[str, tuple[str, str]] = {
+    AppendToContentMessageMutation.__name__: ("message_id", "content_delta"),
+    AppendToCodeToolCallMutation.__name__: ("tool_call_id", "code_delta"),
+    AppendToOutputToolCallMutation.__name__: ("tool_call_id", "output_delta"),
+    AppendToHeadlineToolCallMutation.__name__: ("tool_call_id", "headline_delta"),
+    AppendToTaskMessageGroupMutation.__name__: ("message_group_id", "task_delta"),
+    AppendToAnalysisMessageGroupMutation.__name__: ("message_group_id", "analysis_delta"),
+}
+
+# Coalescing mutators that have unpublished appends, per chat
+_pending_mutators: dict[str, set["CoalescingChatMutator"]] = defaultdict(set)
+
+# Flushes started by the max_delay timer, per chat, kept until they finish
+_flush_tasks: dict[str, set[asyncio.Task]] = defaultdict(set)
+
+
+async def flush_coalesced_mutations(chat_id: str) -> None:
+    # Timer flushes may still be publishing, their failures are logged when they finish
+    tasks = _flush_tasks.get(chat_id)
+    if tasks:
+        await asyncio.wait(list(tasks))
+
+    for mutator in list(_pending_mutators.get(chat_id, ())):
+        await mutator.flush()
+
+
+class CoalescingChatMutator(ChatMutator):
+    """
+    Merges consecutive Append* mutations targeting the same field into one published mutation.
+
+    Appends are applied to the chat immediately, so the writer always sees the current state,
+    only publishing them to the clients is deferred, snapshot readers see them once published.
+    Pending appends are published when they exceed max_bytes, after max_delay seconds,
+    before any other mutation and on lock release.
+    """
+
+    def __init__(
+        self,
+        mutator: "DefaultChatMutator",
+        max_delay: float = CHAT_MUTATION_COALESCE_MAX_DELAY,
+        max_bytes: int = CHAT_MUTATION_COALESCE_MAX_BYTES,
+    ):
+        self.mutator = mutator
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+
+        self._pending: ChatMutation | None = None
+        self._pending_key: tuple[str, str] | None = None
+        self._pending_deltas: list[str] = []
+        self._pending_bytes = 0
+        self._pending_since = 0.0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._publish_lock = asyncio.Lock()
+
+    @property
+    def chat_id(self) -> str:
+        return self.mutator.chat_id
+
+    @property
+    def request_id(self) -> str:
+        return self.mutator.request_id
+
+    @property
+    def chat(self) -> Chat:
+        return self.mutator.chat
+
+    async def mutate(self, mutation: ChatMutation) -> None:
+        mutation_type = mutation.__class__.__name__
+
+        if mutation_type not in _COALESCABLE_MUTATIONS:
+            async with self._publish_lock:
+                await self._flush_pending()
+                await self.mutator.mutate(mutation)
+            return
+
+        target_field, delta_field = _COALESCABLE_MUTATIONS[mutation_type]
+        key = (mutation_type, getattr(mutation, target_field))
+
+        async with self._publish_lock:
+            if self._pending_key != key:
+                await self._flush_pending()
+
+            self.mutator.apply(mutation)
+
+            delta = getattr(mutation, delta_field)
+
+            # Snapshot readers do not get the text until the merged mutation is published
+            self.chat.add_unpublished_text(key[1], _text_field(delta_field), len(delta))
+
+            if self._pending is None:
+                self._pending = mutation
+                self._pending_key = key
+                self._pending_since = time.monotonic()
+                _pending_mutators[self.chat_id].add(self)
+                self._flush_timer = asyncio.get_running_loop().call_later(self.max_delay, self._on_flush_timer)
+
+            self._pending_deltas.append(delta)
+            self._pending_bytes += len(delta)
+
+            if self._pending_bytes >= self.max_bytes or time.monotonic() - self._pending_since >= self.max_delay:
+                await self._flush_pending()
+
+    async def flush(self) -> None:
+        async with self._publish_lock:
+            await self._flush_pending()
+
+    def _on_flush_timer(self) -> None:
+        self._flush_timer = None
+        if self._pending is not None:
+            task = asyncio.create_task(self.flush())
+            _flush_tasks[self.chat_id].add(task)
+            task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task) -> None:
+        tasks = _flush_tasks[self.chat_id]
+        tasks.discard(task)
+        if not tasks:
+            del _flush_tasks[self.chat_id]
+
+        if not task.cancelled() and task.exception() is not None:
+            _log.error(f"Failed to publish coalesced mutations of chat {self.chat_id}", exc_info=task.exception())
+
+    async def _flush_pending(self) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+
+        target_field, delta_field = _COALESCABLE_MUTATIONS[pending.__class__.__name__]
+        merged = pending.model_copy(update={delta_field: "".join(self._pending_deltas)})
+
+        self._pending = None
+        self._pending_key = None
+        self._pending_deltas = []
+        self._pending_bytes = 0
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        _pending_mutators[self.chat_id].discard(self)
+        if not _pending_mutators[self.chat_id]:
+            del _pending_mutators[self.chat_id]
+
+        self.chat.mark_text_published(getattr(pending, target_field), _text_field(delta_field))
+
+        await self.mutator.publish(merged)
+
+
+def _text_field(delta_field: str) -> str:
+    return delta_field.removesuffix("_delta")
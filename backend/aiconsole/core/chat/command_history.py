@@ -0,0 +1,196 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+History of commands sent by the user, for recalling and autocompleting prompts.
+
+Commands are appended to a log (.aic/command_history.jsonl), a JSON string per line. The log is replayed into
+an ordered in-memory index on first use, and rewritten with only the live entries once it grows too long.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO
+
+from aiconsole.consts import (
+    COMMANDS_HISTORY_JSON,
+    COMMANDS_HISTORY_LOG,
+    COMMANDS_HISTORY_LOG_COMPACTION_FACTOR,
+    HISTORY_LIMIT,
+)
+from aiconsole.core.project.paths import get_aic_directory
+
+_log = logging.getLogger(__name__)
+
+
+class CommandHistory:
+    def __init__(self, project_path: Path | None = None, limit: int = HISTORY_LIMIT):
+        aic_directory = get_aic_directory(project_path)
+        self.path = aic_directory / COMMANDS_HISTORY_LOG
+        self.legacy_path = aic_directory / COMMANDS_HISTORY_JSON
+        self.limit = limit
+
+        # Lowercased command -> command, oldest first. Commands differing only in case are the same entry.
+        self._commands: OrderedDict[str, str] | None = None
+        self._log_lines = 0
+        self._file: IO[str] | None = None
+        self._lock = threading.Lock()
+
+    def commands(self) -> list[str]:
+        """Oldest first."""
+        with self._lock:
+            return list(self._get_commands().values())
+
+    def add(self, command: str) -> None:
+        with self._lock:
+            commands = self._get_commands()
+
+            key = command.lower()
+            commands.pop(key, None)
+            commands[key] = command
+
+            if len(commands) > self.limit:
+                commands.popitem(last=False)
+
+            if self._log_lines >= self.limit * COMMANDS_HISTORY_LOG_COMPACTION_FACTOR:
+                self._compact()
+            else:
+                self._append(command)
+
+    def search(self, query: str, limit: int = 10) -> list[str]:
+        """
+        Commands starting with the query, most recent first, followed by commands containing
+        the characters of the query in order, closest matches first. Case-insensitive.
+        """
+        query = query.lower()
+
+        with self._lock:
+            entries = list(reversed(self._get_commands().items()))
+
+        prefix_matches = [command for key, command in entries if key.startswith(query)]
+        if len(prefix_matches) >= limit:
+            return prefix_matches[:limit]
+
+        fuzzy_matches = []
+        for recency, (key, command) in enumerate(entries):
+            if key.startswith(query):
+                continue
+
+            span = _subsequence_span(query, key)
+            if span is not None:
+                fuzzy_matches.append((span, recency, command))
+
+        fuzzy_matches.sort()
+        return (prefix_matches + [command for _, _, command in fuzzy_matches])[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _get_commands(self) -> OrderedDict[str, str]:
+        if self._commands is None:
+            self._commands = OrderedDict()
+
+            if self.path.exists():
+                for command in self._read_log():
+                    self._commands.pop(command.lower(), None)
+                    self._commands[command.lower()] = command
+            elif self.legacy_path.exists():
+                with open(self.legacy_path, "r", encoding="utf8", errors="replace") as f:
+                    for command in json.load(f):
+                        self._commands.pop(command.lower(), None)
+                        self._commands[command.lower()] = command
+
+            while len(self._commands) > self.limit:
+                self._commands.popitem(last=False)
+
+            # History of older versions is moved to the log once
+            if not self.path.exists() and self._commands:
+                self._compact()
+
+        return self._commands
+
+    def _read_log(self) -> list[str]:
+        commands = []
+
+        with open(self.path, "r", encoding="utf8", errors="replace") as f:
+            for line in f:
+                self._log_lines += 1
+
+                # A crash in the middle of a write can leave the last line incomplete
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    _log.warning(f"Ignoring malformed line in {self.path}")
+                    continue
+
+                if isinstance(command, str):
+                    commands.append(command)
+
+        return commands
+
+    def _append(self, command: str) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf8", errors="replace")
+
+        self._file.write(json.dumps(command) + "\n")
+        self._file.flush()
+        self._log_lines += 1
+
+    def _compact(self) -> None:
+        """Rewrites the log with only the live commands."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        commands = list(self._get_commands().values())
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf8", errors="replace") as f:
+            f.writelines(json.dumps(command) + "\n" for command in commands)
+        os.replace(tmp_path, self.path)
+
+        self._log_lines = len(commands)
+
+
+def _subsequence_span(query: str, text: str) -> int | None:
+    """Length of the shortest prefix of text containing the characters of query in order, None if it does not."""
+    position = -1
+
+    for char in query:
+        position = text.find(char, position + 1)
+        if position == -1:
+            return None
+
+    return position + 1
+
+
+_histories: dict[Path, CommandHistory] = {}
+
+
+def get_command_history(project_path: Path | None = None) -> CommandHistory:
+    aic_directory = get_aic_directory(project_path).absolute()
+
+    if aic_directory not in _histories:
+        _histories[aic_directory] = CommandHistory(project_path)
+
+    return _histories[aic_directory]
@@ -16,6 +16,7 @@
 
 import json
 
+from aiconsole.core.blobs.blob_store import describe_blob_references
 from aiconsole.core.chat.types import AICMessage, AICMessageGroup, Chat
 from aiconsole.core.gpt.types import (
     GPTFunctionCall,
@@ -66,6 +67,8 @@ def convert_message(group: AICMessageGroup, message: AICMessage) -> list[GPTRequ
         else:
             if content == "":
                 content = "No output"
+            else:
+                content = describe_blob_references(content)
 
             result.append(GPTRequestToolMessage(tool_call_id=tool_call_id, content=content))
 
@@ -78,7 +81,7 @@ def convert_messages(chat: Chat) -> list[GPTRequestMessage]:
     messages: list[GPTRequestMessage] = []
 
     for message_group in chat.message_groups:
-        is_last_group = message_group == chat.message_groups[-1]
+        is_last_group = message_group is chat.message_groups[-1]
         if message_group.task:
             # Augment the messages with system messages with meta data about which agent is speaking and what materials were available
             system_message = f"""
@@ -1,8 +1,10 @@
+import asyncio
 import traceback
 
 from aiconsole.api.websockets.connection_manager import connection_manager
 from aiconsole.api.websockets.server_messages import ErrorServerMessage
 from aiconsole.core.assets.materials.material import Material
+from aiconsole.core.blobs.blob_store import BlobStore, spill_large_output
 from aiconsole.core.chat.chat_mutations import (
     AppendToOutputToolCallMutation,
     SetIsExecutingToolCallMutation,
@@ -62,6 +64,16 @@ async def run_code(
                 )
             )
     finally:
+        if tool_call.output:
+            output = await asyncio.to_thread(spill_large_output, BlobStore(), tool_call.output)
+            if output != tool_call.output:
+                await chat_mutator.mutate(
+                    SetOutputToolCallMutation(
+                        tool_call_id=tool_call_id,
+                        output=output,
+                    )
+                )
+
         await chat_mutator.mutate(
             SetIsExecutingToolCallMutation(
                 tool_call_id=tool_call_id,
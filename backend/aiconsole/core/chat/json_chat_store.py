@@ -0,0 +1,200 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Chat store with a JSON file per chat (chats/<id>.json), versioned by the modification time of the file.
+
+Chats not modified for a while are archived as gzip compressed files (chats/<id>.json.gz, see chat_archive).
+Archiving keeps the modification time, so it does not change the version of the chat.
+Archived chats are read transparently and written back uncompressed.
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import IO, Iterator
+
+from send2trash import send2trash
+
+from aiconsole.core.chat.chat_file_format import (
+    ChatDocumentWindow,
+    dump_chat_document,
+    iter_message_groups,
+    read_chat_document_header,
+    read_chat_document_window,
+    window_of_document,
+)
+from aiconsole.core.chat.chat_headline_index import get_chat_headline_index
+from aiconsole.core.chat.types import Chat, ChatHeadline
+from aiconsole.core.project.paths import get_history_directory
+
+ARCHIVE_SUFFIX = ".json.gz"
+
+
+class JsonChatStore:
+    def __init__(self, project_path: Path):
+        self.project_path = project_path
+        self.history_directory = get_history_directory(project_path)
+
+    def get_path(self, chat_id: str) -> Path:
+        return self.history_directory / f"{chat_id}.json"
+
+    def get_archive_path(self, chat_id: str) -> Path:
+        return self.history_directory / f"{chat_id}{ARCHIVE_SUFFIX}"
+
+    def read(self, chat_id: str) -> tuple[dict, int] | None:
+        file_path = self.get_path(chat_id)
+
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+            with open(file_path, "r", encoding="utf8", errors="replace") as f:
+                return json.load(f), mtime_ns
+        except FileNotFoundError:
+            pass
+
+        archive_path = self.get_archive_path(chat_id)
+
+        try:
+            mtime_ns = os.stat(archive_path).st_mtime_ns
+            with gzip.open(archive_path, "rt", encoding="utf8", errors="replace") as f:
+                return json.load(f), mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def write(self, chat_id: str, content: dict | None, scopes: set[str] | None = None) -> int | None:
+        # The whole file is written whatever the modified scopes are
+        file_path = self.get_path(chat_id)
+
+        archive_path = self.get_archive_path(chat_id)
+
+        if content is None:
+            for path in (file_path, archive_path):
+                if path.exists():
+                    os.remove(path)
+            return None
+
+        os.makedirs(file_path.parent, exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a partially written chat
+        tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf8", errors="replace") as f:
+            dump_chat_document(content, f)
+        os.replace(tmp_path, file_path)
+
+        # A chat written again is not archived anymore
+        if archive_path.exists():
+            os.remove(archive_path)
+
+        return os.stat(file_path).st_mtime_ns
+
+    def get_version(self, chat_id: str) -> int | None:
+        for path in (self.get_path(chat_id), self.get_archive_path(chat_id)):
+            try:
+                return os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                pass
+
+        return None
+
+    def read_window(
+        self, chat_id: str, limit: int, before: str | None = None
+    ) -> tuple[ChatDocumentWindow, int] | None:
+        file_path = self.get_path(chat_id)
+
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+            document_window = read_chat_document_window(file_path, limit, before)
+        except FileNotFoundError:
+            # Archived chats can not be read from the end, the whole document is decompressed
+            stored = self.read(chat_id)
+            if stored is None:
+                return None
+
+            return window_of_document(stored[0], limit, before), stored[1]
+
+        return (document_window, mtime_ns) if document_window is not None else None
+
+    def read_stream(self, chat_id: str) -> tuple[dict, Iterator[dict]] | None:
+        f: IO[bytes]
+        try:
+            f = open(self.get_path(chat_id), "rb")
+        except FileNotFoundError:
+            try:
+                f = gzip.open(self.get_archive_path(chat_id), "rb")
+            except FileNotFoundError:
+                return None
+
+        try:
+            header = read_chat_document_header(f)
+        except Exception:
+            f.close()
+            raise
+
+        if header is None:
+            # Files of older versions are read whole
+            f.close()
+            stored = self.read(chat_id)
+            if stored is None:
+                return None
+
+            content = stored[0]
+            return {key: value for key, value in content.items() if key != "message_groups"}, iter(
+                content.get("message_groups", [])
+            )
+
+        return header, _iter_and_close(f)
+
+    def list_versions(self) -> dict[str, int]:
+        versions: dict[str, int] = {}
+
+        if self.history_directory.is_dir():
+            with os.scandir(self.history_directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or entry.name.startswith("."):
+                        continue
+
+                    if entry.name.endswith(".json"):
+                        versions[entry.name[: -len(".json")]] = entry.stat().st_mtime_ns
+                    elif entry.name.endswith(ARCHIVE_SUFFIX):
+                        versions.setdefault(entry.name[: -len(ARCHIVE_SUFFIX)], entry.stat().st_mtime_ns)
+
+        return versions
+
+    def list_chat_ids(self) -> list[str]:
+        return get_chat_headline_index(self.project_path).list_chat_ids()
+
+    async def headlines(self, offset: int = 0, limit: int | None = None) -> list[ChatHeadline]:
+        return await get_chat_headline_index(self.project_path).headlines(offset=offset, limit=limit)
+
+    async def update_headline(self, chat: Chat) -> None:
+        await get_chat_headline_index(self.project_path).update(chat)
+
+    async def delete(self, chat_id: str) -> bool:
+        paths = [path for path in (self.get_path(chat_id), self.get_archive_path(chat_id)) if path.exists()]
+        if not paths:
+            return False
+
+        for path in paths:
+            send2trash(path)
+        await get_chat_headline_index(self.project_path).remove(chat_id)
+        return True
+
+    def close(self) -> None:
+        pass  # files are not kept open
+
+
+def _iter_and_close(f: IO[bytes]) -> Iterator[dict]:
+    with f:
+        yield from iter_message_groups(f)
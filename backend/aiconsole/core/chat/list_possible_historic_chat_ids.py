@@ -14,21 +14,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os
 from pathlib import Path
 
-from aiconsole.core.project.paths import get_history_directory
+from aiconsole.core.chat.chat_store import get_chat_store
 
 
 def list_possible_historic_chat_ids(project_path: Path | None = None):
-    history_directory = get_history_directory(project_path)
-    if history_directory.exists() and history_directory.is_dir():
-        entries = os.scandir(history_directory)
-
-        files = [entry for entry in entries if entry.is_file() and entry.name.endswith(".json")]
-        # Sort the files based on modification time (descending order)
-        files = sorted(files, key=lambda entry: os.path.getmtime(entry.path), reverse=True)
-
-        return [file.name.split(".")[0] for file in files]
-    else:
-        return []
+    # Chats that were never compacted (e.g. after a crash) only have a journal
+    return get_chat_store(project_path).list_chat_ids()
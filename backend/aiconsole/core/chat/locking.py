@@ -1,6 +1,5 @@
 import asyncio
 import logging
-from collections import defaultdict
 from typing import Callable, Coroutine
 
 from fastapi import HTTPException
@@ -12,45 +11,55 @@ from aiconsole.api.websockets.connection_manager import (
 from aiconsole.api.websockets.server_messages import (
     NotifyAboutChatMutationServerMessage,
 )
+from aiconsole.consts import CHAT_JOURNAL_COMPACTION_BYTES
 from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_journal import (
+    close_chat_journal,
+    compact_chat_journal,
+    get_chat_journal,
+    journal_mutation,
+)
+from aiconsole.core.chat.chat_lock_manager import get_chat_lock
+from aiconsole.core.chat.chat_mutation_actor import get_chat_mutation_actor
 from aiconsole.core.chat.chat_mutations import (
     ChatMutation,
     LockAcquiredMutation,
     LockReleasedMutation,
 )
 from aiconsole.core.chat.chat_mutator import ChatMutator
-from aiconsole.core.chat.load_chat_history import load_chat_history
-from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.coalescing_chat_mutator import (
+    CoalescingChatMutator,
+    flush_coalesced_mutations,
+)
 from aiconsole.core.chat.types import Chat
 
 chats: dict[str, Chat] = {}
-lock_events: dict[str, asyncio.Event] = defaultdict(asyncio.Event)
 
 lock_timeout = 30  # Time in seconds to wait for the lock
 
 _log = logging.getLogger(__name__)
 
 
-async def wait_for_lock(chat_id: str) -> None:
+async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: bool = False):
+    _log.debug(f"Acquiring lock {chat_id} {request_id}")
+    lock = get_chat_lock(chat_id)
+
     try:
-        _log.debug(f"Waiting for lock {chat_id}")
-        await asyncio.wait_for(lock_events[chat_id].wait(), timeout=lock_timeout)
+        await lock.acquire(request_id, timeout=lock_timeout)
     except asyncio.TimeoutError:
         raise HTTPException(status_code=408, detail="Lock acquisition timed out")
 
-
-async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: bool = False):
-    _log.debug(f"Acquiring lock {chat_id} {request_id}")
-    if chat_id in chats and chats[chat_id].lock_id:
-        await wait_for_lock(chat_id)
-
-    if chat_id not in chats:
-        chat_history = await load_chat_history(chat_id)
-        chat_history.lock_id = None
-        chats[chat_id] = chat_history
+    try:
+        if chat_id not in chats:
+            chat_history = await chat_cache().get(chat_id)
+            chat_history.lock_id = None
+            chats[chat_id] = chat_history
+    except BaseException:
+        lock.release(request_id)
+        raise
 
     chats[chat_id].lock_id = request_id
-    lock_events[chat_id].clear()
 
     if not skip_mutating_clients:
         await connection_manager().send_to_chat(
@@ -62,27 +71,51 @@ async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: boo
     return chats[chat_id]
 
 
-async def _read_chat_outside_of_lock(chat_id: str):
+async def read_chat_outside_of_lock(chat_id: str):
     _log.debug(f"Reading chat{chat_id}")
     if chat_id not in chats:
-        return await load_chat_history(chat_id)
+        return await chat_cache().get(chat_id)
 
     return chats[chat_id]
 
 
+def get_chat_snapshot(chat: Chat) -> Chat:
+    """Last committed version of a loaded chat, never waits for writers."""
+    # The chat could have been locked by a writer since it was read
+    return chats.get(chat.id, chat).snapshot()
+
+
 async def release_lock(chat_id: str, request_id: str) -> None:
     if chat_id in chats and chats[chat_id].lock_id == request_id:
-        chats[chat_id].lock_id = None
-        save_chat_history(chats[chat_id], scope="message_groups")
-        del chats[chat_id]
-        lock_events[chat_id].set()
-
-        await connection_manager().send_to_chat(
-            NotifyAboutChatMutationServerMessage(
-                request_id=request_id, chat_id=chat_id, mutation=LockReleasedMutation(lock_id=request_id)
-            ),
-            chat_id,
-        )
+        try:
+            await flush_coalesced_mutations(chat_id)
+
+            # Would race with the compaction below
+            compaction = _compactions.get(chat_id)
+            if compaction is not None:
+                await asyncio.wait([compaction])
+
+            chat = chats[chat_id]
+            chat.lock_id = None
+            try:
+                await compact_chat_journal(chat)
+            except Exception as e:
+                # The journal still holds the mutations, the next compaction or load picks them up
+                _log.exception(f"Failed to compact the journal of chat {chat_id}: {e}")
+            finally:
+                close_chat_journal(chat_id)
+                # The chat stays cached, so the next lock or read does not need to load it again
+                chat_cache().update_size(chats.pop(chat_id))
+
+            await connection_manager().send_to_chat(
+                NotifyAboutChatMutationServerMessage(
+                    request_id=request_id, chat_id=chat_id, mutation=LockReleasedMutation(lock_id=request_id)
+                ),
+                chat_id,
+            )
+        finally:
+            # Only now, so clients see the release before the next holder acquires
+            get_chat_lock(chat_id).release(request_id)
 
 
 class DefaultChatMutator(ChatMutator):
@@ -96,12 +129,23 @@ class DefaultChatMutator(ChatMutator):
         return chats[self.chat_id]
 
     async def mutate(self, mutation: ChatMutation) -> None:
+        self.apply(mutation)
+        await self.publish(mutation)
+
+    def apply(self, mutation: ChatMutation) -> None:
         if self.chat_id not in chats or chats[self.chat_id].lock_id != self.request_id:
             raise Exception(
                 f"Lock not acquired for chat {self.chat_id} request_id={self.request_id}",
             )
 
         apply_mutation(self.chat, mutation)
+        journal_mutation(self.chat, mutation)
+
+        if get_chat_journal(self.chat_id).size > CHAT_JOURNAL_COMPACTION_BYTES:
+            _schedule_compaction(self.chat_id)
+
+    async def publish(self, mutation: ChatMutation) -> None:
+        get_chat_journal(self.chat_id).flush()
 
         await connection_manager().send_to_chat(
             NotifyAboutChatMutationServerMessage(
@@ -114,34 +158,29 @@ class DefaultChatMutator(ChatMutator):
         )
 
 
-# This lock is responsible for sequencing the mutations and reads on a given chat
-_waiting_mutations: dict[str, list[Coroutine]] = defaultdict(lambda: [])
-_running_mutations: dict[str, asyncio.Task | None] = defaultdict(lambda: None)
+# Background compactions of journals that outgrew CHAT_JOURNAL_COMPACTION_BYTES, per chat, kept until they finish
+_compactions: dict[str, asyncio.Task] = {}
 
 
-def _check_mutation_queue(chat_id: str):
-    if _running_mutations[chat_id] is not None:
+def _schedule_compaction(chat_id: str) -> None:
+    if chat_id in _compactions:
         return
 
-    if not _waiting_mutations[chat_id]:
-        return
+    task = asyncio.create_task(compact_chat_journal(chats[chat_id]))
+    _compactions[chat_id] = task
+    task.add_done_callback(lambda task: _on_compaction_done(chat_id, task))
 
-    h = _waiting_mutations[chat_id].pop()
-    task = asyncio.create_task(h)
-    _running_mutations[chat_id] = task
 
-    def clear_task(future):
-        if _running_mutations[chat_id] == future:
-            _running_mutations[chat_id] = None
-            _check_mutation_queue(chat_id)
-        else:
-            _log.error(f"Task {chat_id} already cleared")
+def _on_compaction_done(chat_id: str, task: asyncio.Task) -> None:
+    if _compactions.get(chat_id) is task:
+        del _compactions[chat_id]
 
-    task.add_done_callback(clear_task)
+    if not task.cancelled() and task.exception() is not None:
+        _log.error(f"Failed to compact the journal of chat {chat_id}", exc_info=task.exception())
 
 
 class SequentialChatMutator(ChatMutator):
-    def __init__(self, mutator: DefaultChatMutator):
+    def __init__(self, mutator: DefaultChatMutator | CoalescingChatMutator):
         self.mutator = mutator
         self._chat = None
 
@@ -153,36 +192,16 @@ class SequentialChatMutator(ChatMutator):
         async def h():
             await self.mutator.mutate(mutation)
 
-        _waiting_mutations[self.mutator.chat_id].append(h())
-        _check_mutation_queue(self.mutator.chat_id)
-
-        await self.wait_for_all_mutations()
+        await get_chat_mutation_actor(self.mutator.chat_id).run(h)
 
     async def wait_for_all_mutations(self):
-        chat_id = self.mutator.chat_id
-        while _waiting_mutations[chat_id] or _running_mutations[chat_id] is not None:
-            running_mutation = _running_mutations[chat_id]
-            if running_mutation:
-                await running_mutation
-            else:
-                await asyncio.sleep(0)
+        await get_chat_mutation_actor(self.mutator.chat_id).wait_until_idle()
 
     async def in_sequence(self, f: Callable[[], Coroutine]):
-        _waiting_mutations[self.mutator.chat_id].append(f())
-        _check_mutation_queue(self.mutator.chat_id)
+        done = await get_chat_mutation_actor(self.mutator.chat_id).submit(f)
+        # Failures are logged by the actor, nobody awaits the result here
+        done.add_done_callback(lambda future: future.cancelled() or future.exception())
 
     async def read(self) -> Chat:
-        while True:
-            running_mutation = _running_mutations[self.mutator.chat_id]
-
-            if running_mutation is None:
-                break
-
-            await running_mutation
-
-            if running_mutation.exception():
-                _log.exception(running_mutation.exception())
-
-            await asyncio.sleep(0)
-
-        return await _read_chat_outside_of_lock(chat_id=self.mutator.chat_id)
+        """Last committed version of the chat, does not wait for queued or running mutations."""
+        return get_chat_snapshot(await read_chat_outside_of_lock(chat_id=self.mutator.chat_id))
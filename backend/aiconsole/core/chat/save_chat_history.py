@@ -14,44 +14,117 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
 
-from aiconsole.core.chat.types import Chat
+from aiconsole.core.chat.chat_headline_index import get_headline_name
+from aiconsole.core.chat.chat_migrations import CHAT_SCHEMA_VERSION
+from aiconsole.core.chat.chat_search_index import get_chat_search_index
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.types import Chat, ChatScope
 from aiconsole.core.project.paths import get_history_directory
 
+_log = logging.getLogger(__name__)
 
-def save_chat_history(chat: Chat, scope: str = "default"):
-    history_directory = get_history_directory()
-    file_path = history_directory / f"{chat.id}.json"
+# Writes of the same chat never overlap and happen in the order they were requested.
+# A lock exists only while it is held or waited for, counted in _save_lock_users
+_save_locks: dict[Path, asyncio.Lock] = {}
+_save_lock_users: dict[Path, int] = {}
 
-    new_content = chat.model_dump(exclude={"id", "last_modified"})
 
+async def save_chat_history(chat: Chat, scope: ChatScope | None = None):
+    """
+    Saves the chat if the given scope (any scope when None) was modified since it was loaded or last saved.
+
+    The document is captured on the event loop, encoding and writing happen on a worker thread.
+    """
+    store = get_chat_store()
+
+    async with chat_save_lock(get_history_directory() / f"{chat.id}.json"):
+        dirty_scopes = set(chat.dirty_scopes)
+        is_dirty = scope in dirty_scopes if scope else bool(dirty_scopes)
+
+        if not is_dirty and store.get_version(chat.id) is not None:
+            return  # nothing changed since the chat was written
+
+        content = build_chat_document(chat)
+
+        chat.dirty_scopes.clear()
+
+        try:
+            chat.file_mtime_ns = await asyncio.to_thread(store.write, chat.id, content, dirty_scopes)
+        except Exception:
+            chat.dirty_scopes.update(dirty_scopes)
+            raise
+
+        await update_chat_indexes(chat, content)
+
+
+async def update_chat_indexes(chat: Chat, content: dict | None, project_path: Path | None = None) -> None:
+    """Brings the headline and search indexes up to date with the chat, after it was written with content."""
+    try:
+        await get_chat_store(project_path).update_headline(chat)
+    except Exception as e:
+        _log.exception(f"Failed to update the headline of chat {chat.id}: {e}")
+
+    try:
+        await get_chat_search_index(project_path).update(chat.id, content, chat.file_mtime_ns)
+    except Exception as e:
+        _log.exception(f"Failed to update the search index of chat {chat.id}: {e}")
+
+
+def build_chat_document(chat: Chat) -> dict | None:
+    """The document stored for the chat, None if the chat is empty and should not be stored."""
     if len(chat.message_groups) == 0 and chat.chat_options.is_default():
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    else:
-        os.makedirs(history_directory, exist_ok=True)
-
-        # check if file exists and contents are the same
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf8", errors="replace") as f:
-                old_content = json.load(f)
-                if scope == "chat_options" and (
-                    "chat_options" not in old_content or old_content["chat_options"] != new_content["chat_options"]
-                ):
-                    old_content["chat_options"] = new_content["chat_options"]
-                    new_content = old_content
-                elif scope == "message_groups" and old_content["message_groups"] != new_content["message_groups"]:
-                    old_content["message_groups"] = new_content["message_groups"]
-                    new_content = old_content
-                elif scope == "name" and ("name" not in old_content or old_content["name"] != new_content["name"]):
-                    old_content["name"] = new_content["name"]
-                    old_content["title_edited"] = True
-                    new_content = old_content
-                else:
-                    return  # contents are the same, no need to write to file
-
-        # write new content to file
-        with open(file_path, "w", encoding="utf8", errors="replace") as f:
-            json.dump(new_content, f)
+        return None
+
+    content = chat.model_dump(exclude={"id", "last_modified"})
+    content["lock_id"] = None  # locks do not outlive the process
+    content["name"] = get_headline_name(chat)  # windowed reads do not see the first message
+    content["journal_seq"] = chat.journal_seq
+    content["schema_version"] = CHAT_SCHEMA_VERSION
+    return content
+
+
+async def write_migrated_chat(
+    chat_id: str, content: dict, read_version: int, project_path: Path | None = None
+) -> int | None:
+    """
+    Writes back a document migrated on load, unless the chat was changed since it was read.
+    Returns the new version of the chat, None if it was not written.
+    """
+    store = get_chat_store(project_path)
+
+    async with chat_save_lock(get_history_directory(project_path) / f"{chat_id}.json"):
+        try:
+            if store.get_version(chat_id) != read_version:
+                return None
+
+            return await asyncio.to_thread(store.write, chat_id, content)
+        except Exception as e:
+            _log.exception(f"Failed to write back migrated chat {chat_id}: {e}")
+            return None
+
+
+@asynccontextmanager
+async def chat_save_lock(file_path: Path) -> AsyncIterator[None]:
+    """Held while the chat is written, for other writers of the chat file."""
+    lock = _save_locks.setdefault(file_path, asyncio.Lock())
+    _save_lock_users[file_path] = _save_lock_users.get(file_path, 0) + 1
+
+    try:
+        async with lock:
+            yield
+    finally:
+        _save_lock_users[file_path] -= 1
+        if not _save_lock_users[file_path]:
+            del _save_lock_users[file_path]
+            del _save_locks[file_path]
+
+
+def is_chat_file_being_saved(file_path: Path) -> bool:
+    lock = _save_locks.get(file_path)
+    return lock is not None and lock.locked()
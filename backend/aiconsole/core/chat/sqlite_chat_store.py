@@ -0,0 +1,423 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Chat store in an SQLite database (.aic/chats.db) with a row per chat, message group, message and tool call.
+
+Writing a chat updates only the rows whose content changed, and only the rows of its modified scopes.
+Reading a window of message groups and listing chats are indexed queries. Chats are versioned by the time they were last written.
+
+Existing JSON history is copied into the database with:
+
+    python -m aiconsole.core.chat.sqlite_chat_store <project>
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from aiconsole.consts import CHAT_STORE_DB
+from aiconsole.core.chat.chat_file_format import ChatDocumentWindow
+from aiconsole.core.chat.types import Chat, ChatHeadline
+from aiconsole.core.project.paths import get_aic_directory
+
+_log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    header TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chats_version ON chats (version);
+CREATE TABLE IF NOT EXISTS message_groups (
+    chat_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (chat_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS message_groups_position ON message_groups (chat_id, position);
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (chat_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_parent ON messages (chat_id, parent_id, position);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    chat_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (chat_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tool_calls_parent ON tool_calls (chat_id, parent_id, position);
+"""
+
+# Rows of a chat per table, id -> (parent id, position, data)
+_Rows = dict[str, tuple[str | None, int, str]]
+
+# Parent ids bound per query, below the smallest limit of bound variables of SQLite builds (999)
+_PARENT_IDS_PER_QUERY = 500
+
+
+class SqliteChatStore:
+    def __init__(self, project_path: Path):
+        self.project_path = project_path
+        self.path = get_aic_directory(project_path) / CHAT_STORE_DB
+
+        # The database is created by the first write, reads of a project without one find nothing.
+        # sqlite3 connections can not be shared between threads, writes happen on worker threads.
+        # Every thread gets its own, they are all kept in _connections so close can reach them
+        self._local = threading.local()
+        self._connections: set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def read(self, chat_id: str) -> tuple[dict, int] | None:
+        if not self.path.exists():
+            return None
+
+        connection = self._connect()
+
+        row = connection.execute("SELECT header, version FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        if row is None:
+            return None
+
+        content = json.loads(row[0])
+        content["message_groups"] = self._read_message_groups(
+            connection,
+            chat_id,
+            connection.execute(
+                "SELECT id, data FROM message_groups WHERE chat_id = ? ORDER BY position", (chat_id,)
+            ).fetchall(),
+        )
+
+        return content, row[1]
+
+    def write(self, chat_id: str, content: dict | None, scopes: set[str] | None = None) -> int | None:
+        with self._write_lock, self._connect() as connection:
+            previous_version = self._get_version(connection, chat_id)
+
+            if content is None:
+                for table in ("chats", "message_groups", "messages", "tool_calls"):
+                    column = "id" if table == "chats" else "chat_id"
+                    connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (chat_id,))
+                return None
+
+            header = {key: value for key, value in content.items() if key != "message_groups"}
+
+            # The other scopes are stored in the header, which is always written
+            if previous_version is None or scopes is None or "message_groups" in scopes:
+                message_groups, messages, tool_calls = _split_document(content)
+
+                self._write_rows(connection, "message_groups", chat_id, message_groups)
+                self._write_rows(connection, "messages", chat_id, messages)
+                self._write_rows(connection, "tool_calls", chat_id, tool_calls)
+
+            # Versions of a chat always grow, even if the clock does not
+            version = max(time.time_ns(), (previous_version or 0) + 1)
+            connection.execute(
+                "INSERT OR REPLACE INTO chats (id, name, header, version) VALUES (?, ?, ?, ?)",
+                (chat_id, header.get("name") or "", json.dumps(header), version),
+            )
+
+        return version
+
+    def get_version(self, chat_id: str) -> int | None:
+        if not self.path.exists():
+            return None
+
+        return self._get_version(self._connect(), chat_id)
+
+    def read_window(
+        self, chat_id: str, limit: int, before: str | None = None
+    ) -> tuple[ChatDocumentWindow, int] | None:
+        if not self.path.exists():
+            return None
+
+        connection = self._connect()
+
+        row = connection.execute("SELECT header, version FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        if row is None:
+            return None
+
+        if before is None:
+            group_rows = connection.execute(
+                "SELECT id, data FROM message_groups WHERE chat_id = ? ORDER BY position DESC LIMIT ?",
+                (chat_id, limit + 1),
+            ).fetchall()
+        else:
+            group_rows = connection.execute(
+                """
+                SELECT id, data FROM message_groups
+                WHERE chat_id = ? AND position < (SELECT position FROM message_groups WHERE chat_id = ? AND id = ?)
+                ORDER BY position DESC LIMIT ?
+                """,
+                (chat_id, chat_id, before, limit + 1),
+            ).fetchall()
+
+        has_more = len(group_rows) > limit
+        group_rows = list(reversed(group_rows[:limit]))
+        message_groups = self._read_message_groups(connection, chat_id, group_rows)
+
+        cursor = message_groups[0]["id"] if has_more and message_groups else None
+        return ChatDocumentWindow(header=json.loads(row[0]), message_groups=message_groups, cursor=cursor), row[1]
+
+    def read_stream(self, chat_id: str) -> tuple[dict, Iterator[dict]] | None:
+        if not self.path.exists():
+            return None
+
+        connection = self._connect()
+
+        row = connection.execute("SELECT header FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        if row is None:
+            return None
+
+        group_ids = [
+            group_id
+            for group_id, in connection.execute(
+                "SELECT id FROM message_groups WHERE chat_id = ? ORDER BY position", (chat_id,)
+            )
+        ]
+
+        return json.loads(row[0]), self._iter_message_groups(chat_id, group_ids)
+
+    def list_versions(self) -> dict[str, int]:
+        if not self.path.exists():
+            return {}
+
+        return dict(self._connect().execute("SELECT id, version FROM chats").fetchall())
+
+    def list_chat_ids(self) -> list[str]:
+        if not self.path.exists():
+            return []
+
+        return [row[0] for row in self._connect().execute("SELECT id FROM chats ORDER BY version DESC")]
+
+    async def headlines(self, offset: int = 0, limit: int | None = None) -> list[ChatHeadline]:
+        if not self.path.exists():
+            return []
+
+        rows = self._connect().execute(
+            "SELECT id, name, version FROM chats ORDER BY version DESC LIMIT ? OFFSET ?",
+            (limit if limit is not None else -1, offset),
+        )
+
+        return [
+            ChatHeadline(id=chat_id, name=name, last_modified=datetime.fromtimestamp(version / 1e9))
+            for chat_id, name, version in rows
+        ]
+
+    async def update_headline(self, chat: Chat) -> None:
+        pass  # names are stored with the chats
+
+    async def delete(self, chat_id: str) -> bool:
+        if self.get_version(chat_id) is None:
+            return False
+
+        await asyncio.to_thread(self.write, chat_id, None)
+        return True
+
+    def close(self) -> None:
+        """Closes the connections of all threads, a later use of the store opens new ones."""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def _iter_message_groups(self, chat_id: str, group_ids: list[str]) -> Iterator[dict]:
+        for group_id in group_ids:
+            # Connected on every step, consumers like StreamingResponse may advance the iterator on any thread
+            connection = self._connect()
+            group_rows = connection.execute(
+                "SELECT id, data FROM message_groups WHERE chat_id = ? AND id = ?", (chat_id, group_id)
+            ).fetchall()
+            yield from self._read_message_groups(connection, chat_id, group_rows)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None or connection not in self._connections:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Used only by the thread that opened it, but closed by whichever thread calls close
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+
+            with self._connections_lock:
+                self._connections.add(connection)
+
+        return connection
+
+    def _get_version(self, connection: sqlite3.Connection, chat_id: str) -> int | None:
+        row = connection.execute("SELECT version FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _write_rows(self, connection: sqlite3.Connection, table: str, chat_id: str, rows: _Rows) -> None:
+        stored: _Rows = {
+            id: (parent_id, position, data)
+            for id, parent_id, position, data in connection.execute(
+                f"SELECT id, {'NULL' if table == 'message_groups' else 'parent_id'}, position, data "
+                f"FROM {table} WHERE chat_id = ?",
+                (chat_id,),
+            )
+        }
+
+        connection.executemany(
+            f"DELETE FROM {table} WHERE chat_id = ? AND id = ?",
+            [(chat_id, id) for id in stored.keys() - rows.keys()],
+        )
+
+        changed = [(id, *row) for id, row in rows.items() if stored.get(id) != row]
+
+        if table == "message_groups":
+            connection.executemany(
+                "INSERT OR REPLACE INTO message_groups (chat_id, id, position, data) VALUES (?, ?, ?, ?)",
+                [(chat_id, id, position, data) for id, _, position, data in changed],
+            )
+        else:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {table} (chat_id, id, parent_id, position, data) VALUES (?, ?, ?, ?, ?)",
+                [(chat_id, *row) for row in changed],
+            )
+
+    def _read_message_groups(
+        self, connection: sqlite3.Connection, chat_id: str, group_rows: list[tuple[str, str]]
+    ) -> list[dict]:
+        group_ids = [group_id for group_id, _ in group_rows]
+
+        messages: dict[str, list[dict]] = {group_id: [] for group_id in group_ids}
+        message_ids = []
+        for message_id, parent_id, data in _select_children(connection, "messages", chat_id, group_ids):
+            message = json.loads(data)
+            message["tool_calls"] = []
+            messages[parent_id].append(message)
+            message_ids.append(message_id)
+
+        messages_by_id = {message["id"]: message for group in messages.values() for message in group}
+        for _, parent_id, data in _select_children(connection, "tool_calls", chat_id, message_ids):
+            messages_by_id[parent_id]["tool_calls"].append(json.loads(data))
+
+        message_groups = []
+        for group_id, data in group_rows:
+            message_group = json.loads(data)
+            message_group["messages"] = messages[group_id]
+            message_groups.append(message_group)
+
+        return message_groups
+
+
+def _select_children(
+    connection: sqlite3.Connection, table: str, chat_id: str, parent_ids: list[str]
+) -> Iterator[tuple[str, str, str]]:
+    """(id, parent id, data) of the rows with one of the parents, in position order per parent."""
+    for i in range(0, len(parent_ids), _PARENT_IDS_PER_QUERY):
+        batch = parent_ids[i : i + _PARENT_IDS_PER_QUERY]
+        placeholders = ", ".join("?" * len(batch))
+        yield from connection.execute(
+            f"SELECT id, parent_id, data FROM {table} WHERE chat_id = ? AND parent_id IN ({placeholders}) "
+            "ORDER BY position",
+            (chat_id, *batch),
+        )
+
+
+def _split_document(content: dict) -> tuple[_Rows, _Rows, _Rows]:
+    message_groups: _Rows = {}
+    messages: _Rows = {}
+    tool_calls: _Rows = {}
+
+    for group_position, message_group in enumerate(content.get("message_groups", [])):
+        group_data = {key: value for key, value in message_group.items() if key != "messages"}
+        message_groups[message_group["id"]] = (None, group_position, json.dumps(group_data))
+
+        for message_position, message in enumerate(message_group.get("messages", [])):
+            message_data = {key: value for key, value in message.items() if key != "tool_calls"}
+            messages[message["id"]] = (message_group["id"], message_position, json.dumps(message_data))
+
+            for tool_call_position, tool_call in enumerate(message.get("tool_calls", [])):
+                tool_calls[tool_call["id"]] = (message["id"], tool_call_position, json.dumps(tool_call))
+
+    return message_groups, messages, tool_calls
+
+
+def migrate_json_chats_to_sqlite(project_path: Path) -> int:
+    """Copies the chats of the JSON store of the project into its SQLite store, returns the number of copied chats."""
+    # Imported here, the JSON store is not needed otherwise
+    from aiconsole.core.chat.chat_migrations import migrate_chat_document
+    from aiconsole.core.chat.json_chat_store import JsonChatStore
+
+    json_store = JsonChatStore(project_path)
+    sqlite_store = SqliteChatStore(project_path)
+    copied = 0
+
+    for chat_id in json_store.list_versions():
+        try:
+            stored = json_store.read(chat_id)
+            if stored is None:
+                continue
+
+            content = stored[0]
+            migrate_chat_document(content)
+            content.pop("id", None)
+            content.pop("last_modified", None)
+
+            # Files written by older versions do not store the names of untitled chats
+            if not content.get("title_edited") or not content.get("name"):
+                content["name"] = (
+                    next(
+                        (
+                            message.get("content")
+                            for message_group in content["message_groups"]
+                            for message in message_group.get("messages", [])
+                        ),
+                        None,
+                    )
+                    or "New Chat"
+                )
+
+            sqlite_store.write(chat_id, content)
+            copied += 1
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            _log.error(f"Failed to copy chat {chat_id}: {e}")
+
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Copy the JSON chat history of a project into .aic/chats.db")
+    parser.add_argument("project", type=Path)
+    args = parser.parse_args()
+
+    copied = migrate_json_chats_to_sqlite(args.project)
+    print(f"Copied {copied} chats, start AIConsole with AICONSOLE_CHAT_STORE=sqlite to use them")
+
+
+if __name__ == "__main__":
+    main()
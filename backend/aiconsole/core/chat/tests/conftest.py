@@ -0,0 +1,14 @@
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_cache import chat_cache
+
+
+@pytest.fixture
+def project_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """An initialized project in tmp_path, the working directory, with no chats cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("aiconsole.core.project.paths.is_project_initialized", lambda: True)
+    chat_cache().clear()
+    return tmp_path
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+import pytest
+
+from aiconsole.core.chat.actor_id import ActorId
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    AppendToOutputToolCallMutation,
+    CreateMessageGroupMutation,
+    CreateMessageMutation,
+    CreateToolCallMutation,
+    DeleteMessageGroupMutation,
+    DeleteToolCallMutation,
+)
+from aiconsole.core.chat.types import AICMessage, Chat
+
+
+@pytest.fixture
+def chat() -> Chat:
+    chat = Chat(id="chat", name="", last_modified=datetime.now(), message_groups=[])
+
+    apply_mutation(
+        chat,
+        CreateMessageGroupMutation(
+            message_group_id="group",
+            actor_id=ActorId(type="agent", id="agent"),
+            role="assistant",
+            task="",
+            materials_ids=[],
+            analysis="",
+        ),
+    )
+    apply_mutation(
+        chat, CreateMessageMutation(message_group_id="group", message_id="message", timestamp="", content="")
+    )
+    apply_mutation(chat, CreateToolCallMutation(message_id="message", tool_call_id="tool_call", code="", headline=""))
+
+    return chat
+
+
+def test_should_find_created_nodes_by_id(chat: Chat):
+    apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta="Hello"))
+    apply_mutation(chat, AppendToOutputToolCallMutation(tool_call_id="tool_call", output_delta="42"))
+
+    message_location = chat.get_message_location("message")
+    tool_call_location = chat.get_tool_call_location("tool_call")
+
+    assert chat.get_message_group("group") is chat.message_groups[0]
+    assert message_location and message_location.message.content == "Hello"
+    assert tool_call_location and tool_call_location.tool_call.output == "42"
+    assert tool_call_location.message is message_location.message
+
+
+def test_should_forget_deleted_nodes(chat: Chat):
+    apply_mutation(chat, DeleteToolCallMutation(tool_call_id="tool_call"))
+
+    # Deleting the only tool call of an empty message removes the message and its group
+    assert chat.get_tool_call_location("tool_call") is None
+    assert chat.get_message_location("message") is None
+    assert chat.get_message_group("group") is None
+    assert chat.message_groups == []
+
+
+def test_should_index_chats_loaded_from_json(chat: Chat):
+    loaded = Chat(**chat.model_dump())
+
+    assert loaded.model_dump() == chat.model_dump()
+    assert loaded.get_tool_call_location("tool_call") is not None
+
+    apply_mutation(loaded, DeleteMessageGroupMutation(message_group_id="group"))
+
+    assert loaded.get_message_location("message") is None
+
+
+def test_should_serialize_streamed_text_like_plain_strings(chat: Chat):
+    for delta in ["line 1\n", "line 2\n"]:
+        apply_mutation(chat, AppendToOutputToolCallMutation(tool_call_id="tool_call", output_delta=delta))
+        apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta=delta))
+
+    dumped = chat.model_dump()
+    message = dumped["message_groups"][0]["messages"][0]
+
+    assert list(message) == list(AICMessage.model_fields)
+    assert message["content"] == "line 1\nline 2\n"
+    assert message["tool_calls"][0]["output"] == "line 1\nline 2\n"
+    assert Chat(**dumped).model_dump() == dumped
+
+
+def test_should_measure_streamed_text_without_joining_it(chat: Chat):
+    for delta in ["Hello", " world"]:
+        apply_mutation(chat, AppendToOutputToolCallMutation(tool_call_id="tool_call", output_delta=delta))
+        apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta=delta))
+
+    message = chat.message_groups[0].messages[0]
+    tool_call = message.tool_calls[0]
+
+    assert message.text_length("content") == tool_call.text_length("output") == len("Hello world")
+    assert tool_call.text_length("headline") == 0
+    assert "content" not in message.__dict__ and "output" not in tool_call.__dict__
+
+    assert message.content == "Hello world"
+    assert message.text_length("content") == len("Hello world")
+
+
+def test_snapshot_should_share_unchanged_message_groups(chat: Chat):
+    apply_mutation(
+        chat,
+        CreateMessageGroupMutation(
+            message_group_id="other_group",
+            actor_id=ActorId(type="user", id="user"),
+            role="user",
+            task="",
+            materials_ids=[],
+            analysis="",
+        ),
+    )
+    first = chat.snapshot()
+
+    apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta="Hello"))
+    second = chat.snapshot()
+
+    assert first.message_groups[0].messages[0].content == ""
+    assert second.message_groups[0].messages[0].content == "Hello"
+    assert second.message_groups[1] is first.message_groups[1]
+    assert second.message_groups[0] is not chat.message_groups[0]
+
+
+def test_snapshot_should_not_contain_unpublished_changes(chat: Chat):
+    apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta="Hello"))
+    chat.add_unpublished_text("message", "content", len(" world"))
+    apply_mutation(chat, AppendToContentMessageMutation(message_id="message", content_delta=" world"))
+
+    assert chat.snapshot().message_groups[0].messages[0].content == "Hello"
+    assert chat.message_groups[0].messages[0].content == "Hello world"
+
+    chat.mark_text_published("message", "content")
+
+    assert chat.snapshot().message_groups[0].messages[0].content == "Hello world"
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_archive import archive_cold_chats
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.chat_window import open_chat_window
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.save_chat_history import (
+    _save_locks,
+    chat_save_lock,
+    is_chat_file_being_saved,
+    save_chat_history,
+)
+from aiconsole.core.chat.types import AICMessage, AICMessageGroup, Chat, ChatOptions
+
+
+def _chat(chat_id: str) -> Chat:
+    chat = Chat(
+        id=chat_id,
+        name=chat_id.capitalize(),
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[
+            AICMessageGroup(
+                id=f"group-{i}",
+                actor_id={"type": "user", "id": "user"},
+                role="user",
+                analysis="",
+                task="",
+                materials_ids=[],
+                messages=[AICMessage(id=f"message-{i}", timestamp="", content="output " * 1000)],
+            )
+            for i in range(3)
+        ],
+    )
+    chat.mark_dirty("message_groups")
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_should_archive_cold_chats_and_read_them_transparently(project_path: Path):
+    await save_chat_history(_chat("chat"))
+    version = get_chat_store().get_version("chat")
+
+    assert (await archive_cold_chats(older_than=3600)).archived == []
+
+    report = await archive_cold_chats(older_than=0)
+    assert report.archived == ["chat"]
+    assert report.saved_bytes > 0
+    assert not (project_path / "chats" / "chat.json").exists()
+    assert (project_path / "chats" / "chat.json.gz").exists()
+
+    # Archiving does not change the chat
+    assert get_chat_store().get_version("chat") == version
+    assert [headline.name for headline in await get_chat_store().headlines()] == ["Chat"]
+
+    window = await open_chat_window("chat", 2, subscribe=lambda: None)
+    assert [group.id for group in window.chat.message_groups] == ["group-1", "group-2"]
+
+    loaded = await load_chat_history("chat")
+    assert len(loaded.message_groups) == 3
+
+    # Written back uncompressed
+    loaded.message_groups[0].messages[0].content = "edited"
+    loaded.mark_dirty("message_groups")
+    await save_chat_history(loaded)
+    assert (project_path / "chats" / "chat.json").exists()
+    assert not (project_path / "chats" / "chat.json.gz").exists()
+
+
+@pytest.mark.asyncio
+async def test_should_drop_save_locks_nobody_uses(project_path: Path):
+    file_path = project_path / "chats" / "chat.json"
+
+    async with chat_save_lock(file_path):
+        # Waits for the lock, which is kept until the save is done
+        save = asyncio.create_task(save_chat_history(_chat("chat")))
+        await asyncio.sleep(0)
+        assert is_chat_file_being_saved(file_path)
+
+    await save
+    await archive_cold_chats(older_than=0)
+
+    assert (project_path / "chats" / "chat.json.gz").exists()
+    assert not is_chat_file_being_saved(file_path)
+    assert _save_locks == {}
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_cache import ChatCache
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import Chat, ChatOptions
+
+
+async def _save_named_chat(chat_id: str, name: str) -> Chat:
+    chat = Chat(
+        id=chat_id,
+        name=name,
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[],
+    )
+    chat.mark_dirty("name")
+    await save_chat_history(chat)
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_should_reload_chat_only_when_file_changed(project_path: Path):
+    await _save_named_chat("chat", "first")
+    cache = ChatCache()
+
+    cached = await cache.get("chat")
+    assert await cache.get("chat") is cached
+
+    file_path = project_path / "chats" / "chat.json"
+    await _save_named_chat("chat", "second")
+    os.utime(file_path, ns=(cached.file_mtime_ns or 0, (cached.file_mtime_ns or 0) + 1))
+
+    reloaded = await cache.get("chat")
+    assert reloaded is not cached
+    assert reloaded.name == "second"
+
+
+@pytest.mark.asyncio
+async def test_should_evict_least_recently_used_unlocked_chats(project_path: Path):
+    for chat_id in ("a", "b", "c"):
+        await _save_named_chat(chat_id, "x" * 10)
+    cache = ChatCache(max_bytes=25)
+
+    locked = await cache.get("a")
+    locked.lock_id = "request"
+    await cache.get("b")
+    await cache.get("c")
+
+    assert await cache.get("a") is locked
+    assert cache.size <= 25
+    assert [path.stem for path in cache._entries] == ["c", "a"]
@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.actor_id import ActorId
+from aiconsole.core.chat.chat_export import export_chat, export_project_chats
+from aiconsole.core.chat.chat_journal import close_chat_journal, journal_mutation
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    CreateMessageGroupMutation,
+)
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import (
+    AICMessage,
+    AICMessageGroup,
+    AICToolCall,
+    Chat,
+    ChatOptions,
+)
+
+
+async def _save_chat(chat_id: str, groups: int) -> None:
+    chat = Chat(
+        id=chat_id,
+        name=chat_id.capitalize(),
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[
+            AICMessageGroup(
+                id=f"{chat_id}-group-{i}",
+                actor_id={"type": "agent", "id": "assistant"},
+                role="assistant",
+                analysis="",
+                task="",
+                materials_ids=[],
+                messages=[
+                    AICMessage(
+                        id=f"{chat_id}-message-{i}",
+                        timestamp="",
+                        content=f"Message {i}",
+                        tool_calls=[
+                            AICToolCall(
+                                id=f"{chat_id}-tool-call-{i}",
+                                language="python",
+                                code="print(1)",
+                                headline="",
+                                output="1",
+                            )
+                        ],
+                    )
+                ],
+            )
+            for i in range(groups)
+        ],
+    )
+    chat.mark_dirty("message_groups")
+    await save_chat_history(chat)
+
+
+@pytest.mark.asyncio
+async def test_should_export_chat_as_ndjson_and_markdown(project_path: Path):
+    await _save_chat("chat", 2)
+
+    chunks = export_chat("chat", "ndjson")
+    assert chunks is not None
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+
+    assert records[0] == {"type": "chat", "id": "chat", "name": "Chat", "title_edited": True, **records[0]}
+    assert "schema_version" not in records[0]
+    assert [record["id"] for record in records[1:]] == ["chat-group-0", "chat-group-1"]
+
+    chunks = export_chat("chat", "markdown")
+    assert chunks is not None
+    markdown = "".join(chunks)
+    assert markdown.startswith("# Chat\n\n## assistant (assistant)\n\nMessage 0\n\n```python\nprint(1)\n```")
+    assert "Output:\n\n```\n1\n```" in markdown
+
+    assert export_chat("missing", "ndjson") is None
+
+
+@pytest.mark.asyncio
+async def test_should_export_all_chats_of_the_project(project_path: Path):
+    await _save_chat("first", 1)
+    await _save_chat("second", 3)
+
+    # Written by an older version, on one line and without a schema version
+    (project_path / "chats" / "old.json").write_text(
+        json.dumps({"name": "Old", "title_edited": True, "message_groups": []})
+    )
+
+    records = [json.loads(line) for line in "".join(export_project_chats("ndjson")).splitlines()]
+
+    assert sorted(record["id"] for record in records if record["type"] == "chat") == ["first", "old", "second"]
+    assert len([record for record in records if record["type"] == "message_group"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_should_export_journaled_mutations(project_path: Path):
+    await _save_chat("first", 1)
+    stored = Chat(id="first", name="", last_modified=datetime.now(), message_groups=[])
+    journal_mutation(stored, AppendToContentMessageMutation(message_id="first-message-0", content_delta=" more"))
+
+    # Never written, only in its journal
+    fresh = Chat(id="fresh", name="", last_modified=datetime.now(), message_groups=[])
+    journal_mutation(
+        fresh,
+        CreateMessageGroupMutation(
+            message_group_id="fresh-group",
+            actor_id=ActorId(type="user", id="user"),
+            role="user",
+            task="",
+            materials_ids=[],
+            analysis="",
+        ),
+    )
+
+    try:
+        records = [json.loads(line) for line in "".join(export_project_chats("ndjson")).splitlines()]
+    finally:
+        close_chat_journal("first")
+        close_chat_journal("fresh")
+
+    assert sorted(record["id"] for record in records if record["type"] == "chat") == ["first", "fresh"]
+    groups = {record["id"]: record for record in records if record["type"] == "message_group"}
+    assert groups["first-group-0"]["messages"][0]["content"] == "Message 0 more"
+    assert groups["fresh-group"]["chat_id"] == "fresh"
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_headline_index import ChatHeadlineIndex
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import Chat, ChatOptions
+
+
+async def _save_named_chat(chat_id: str, name: str) -> None:
+    chat = Chat(
+        id=chat_id,
+        name=name,
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[],
+    )
+    chat.mark_dirty("name")
+    await save_chat_history(chat)
+
+
+@pytest.mark.asyncio
+async def test_should_list_headlines_from_index_and_reload_changed_chats(project_path: Path):
+    await _save_named_chat("first", "First")
+    await _save_named_chat("second", "Second")
+
+    index_path = project_path / ".aic" / "chat_headlines.json"
+    assert set(json.loads(index_path.read_text())["headlines"]) == {"first", "second"}
+
+    # Changed behind the index back, e.g. by another process
+    chat_path = project_path / "chats" / "first.json"
+    chat_path.write_text(chat_path.read_text().replace('"First"', '"Renamed"'))
+
+    index = ChatHeadlineIndex(project_path)
+    headlines = await index.headlines()
+
+    assert {headline.id: headline.name for headline in headlines} == {"first": "Renamed", "second": "Second"}
+    assert len(await index.headlines(offset=1, limit=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_should_trust_index_until_history_directory_changes(project_path: Path, monkeypatch: pytest.MonkeyPatch):
+    await _save_named_chat("first", "First")
+
+    index = ChatHeadlineIndex(project_path)
+    assert [headline.name for headline in await index.headlines()] == ["First"]
+
+    loaded: list[tuple[str, bool]] = []
+
+    async def load_chat_history(chat_id: str, project_path: Path | None = None, replay_journal: bool = True):
+        loaded.append((chat_id, replay_journal))
+        raise RuntimeError("Unexpected load")
+
+    monkeypatch.setattr("aiconsole.core.chat.load_chat_history.load_chat_history", load_chat_history)
+
+    # Nothing changed in the directory, the index is not reconciled
+    assert [headline.name for headline in await index.headlines()] == ["First"]
+    assert loaded == []
+
+    # A chat that is only journaled so far is listed without replaying the journal
+    (project_path / "chats" / "second.journal").write_text("")
+
+    assert {headline.id: headline.name for headline in await index.headlines()} == {
+        "first": "First",
+        "second": "New Chat",
+    }
+    assert loaded == []
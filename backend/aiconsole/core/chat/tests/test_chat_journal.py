@@ -0,0 +1,79 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.actor_id import ActorId
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_journal import (
+    close_chat_journal,
+    compact_chat_journal,
+    get_chat_journal,
+    get_chat_journal_path,
+    journal_mutation,
+)
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    ChatMutation,
+    CreateMessageGroupMutation,
+    CreateMessageMutation,
+)
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.types import Chat
+
+
+def _mutate(chat: Chat, mutation: ChatMutation) -> None:
+    apply_mutation(chat, mutation)
+    journal_mutation(chat, mutation)
+
+
+def _stream_message(chat: Chat, deltas: list[str]) -> None:
+    _mutate(
+        chat,
+        CreateMessageGroupMutation(
+            message_group_id="group",
+            actor_id=ActorId(type="user", id="user"),
+            role="user",
+            task="",
+            materials_ids=[],
+            analysis="",
+        ),
+    )
+    _mutate(
+        chat,
+        CreateMessageMutation(
+            message_group_id="group", message_id="message", timestamp=datetime.now().isoformat(), content=""
+        ),
+    )
+    for delta in deltas:
+        _mutate(chat, AppendToContentMessageMutation(message_id="message", content_delta=delta))
+
+
+@pytest.mark.asyncio
+async def test_should_recover_journaled_mutations_without_snapshot(project_path: Path):
+    chat = Chat(id="chat", name="", last_modified=datetime.now(), message_groups=[])
+    _stream_message(chat, ["Hello", " world"])
+    get_chat_journal(chat.id).flush()
+    close_chat_journal(chat.id)
+
+    loaded = await load_chat_history("chat", project_path)
+
+    assert loaded.message_groups == chat.message_groups
+    assert loaded.journal_seq == 4
+
+
+@pytest.mark.asyncio
+async def test_should_not_replay_mutations_folded_into_snapshot(project_path: Path):
+    chat = Chat(id="chat", name="", last_modified=datetime.now(), message_groups=[])
+    _stream_message(chat, ["Hello"])
+    await compact_chat_journal(chat)
+
+    assert not get_chat_journal_path(chat.id).exists()
+
+    _mutate(chat, AppendToContentMessageMutation(message_id="message", content_delta="!"))
+    get_chat_journal(chat.id).flush()
+    close_chat_journal(chat.id)
+
+    loaded = await load_chat_history("chat", project_path)
+
+    assert loaded.message_groups[0].messages[0].content == "Hello!"
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from aiconsole.core.chat.chat_lock_manager import ChatLock, _locks, get_chat_lock
+
+
+@pytest.mark.asyncio
+async def test_should_hand_lock_over_to_waiters_in_arrival_order():
+    lock = ChatLock("chat")
+    await lock.acquire("first")
+
+    order: list[str] = []
+
+    async def acquire_and_release(request_id: str):
+        await lock.acquire(request_id)
+        order.append(request_id)
+        await asyncio.sleep(0)
+        lock.release(request_id)
+
+    waiters = [asyncio.create_task(acquire_and_release(request_id)) for request_id in ("second", "third", "fourth")]
+    await asyncio.sleep(0)
+    assert lock.queue_length == 3
+
+    lock.release("first")
+    await asyncio.gather(*waiters)
+
+    assert order == ["second", "third", "fourth"]
+    assert lock.holder is None
+    assert lock.stats.acquired_count == 4
+
+
+@pytest.mark.asyncio
+async def test_timed_out_and_cancelled_waiters_should_leave_the_queue():
+    lock = ChatLock("chat")
+    await lock.acquire("holder")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await lock.acquire("impatient", timeout=0.01)
+
+    cancelled = asyncio.create_task(lock.acquire("cancelled"))
+    waiting = asyncio.create_task(lock.acquire("waiting"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+
+    lock.release("holder")
+    await waiting
+
+    assert lock.holder == "waiting"
+    assert lock.queue_length == 0
+    assert lock.stats.timed_out_count == 1
+    assert lock.stats.cancelled_count == 1
+
+
+@pytest.mark.asyncio
+async def test_should_drop_locks_nobody_holds_or_waits_for():
+    lock = get_chat_lock("idle")
+    await lock.acquire("holder")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await lock.acquire("impatient", timeout=0.01)
+    waiting = asyncio.create_task(lock.acquire("waiting"))
+    await asyncio.sleep(0)
+
+    lock.release("holder")
+    await waiting
+    assert _locks["idle"] is lock
+
+    lock.release("waiting")
+    assert "idle" not in _locks
+
+    assert not get_chat_lock("idle").release("waiting")
+    assert "idle" not in _locks
@@ -0,0 +1,61 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_migrations import (
+    CHAT_SCHEMA_VERSION,
+    migrate_chat_document,
+    migrate_project_chats,
+)
+from aiconsole.core.chat.load_chat_history import load_chat_history
+
+_LEGACY_CHAT = {
+    "headline": "Legacy",
+    "title_edited": True,
+    "messages": [{"id": "message", "role": "assistant", "agent_id": "agent", "content": "Hello"}],
+}
+
+
+def test_should_run_only_migrations_newer_than_the_document():
+    document = {"schema_version": CHAT_SCHEMA_VERSION, "message_groups": [{"agent_id": "agent"}]}
+
+    assert not migrate_chat_document(document)
+    assert "actor_id" not in document["message_groups"][0]
+
+
+@pytest.mark.asyncio
+async def test_should_write_migrated_chat_back_once(project_path: Path):
+    chat_path = project_path / "chats" / "chat.json"
+    chat_path.parent.mkdir()
+    chat_path.write_text(json.dumps(_LEGACY_CHAT))
+
+    chat = await load_chat_history("chat")
+
+    assert chat.name == "Legacy"
+    assert chat.message_groups[0].actor_id.id == "agent"
+
+    written = json.loads(chat_path.read_text())
+    assert written["schema_version"] == CHAT_SCHEMA_VERSION
+    assert written["message_groups"][0]["actor_id"] == {"type": "agent", "id": "agent"}
+    assert chat.file_mtime_ns == chat_path.stat().st_mtime_ns
+
+
+@pytest.mark.asyncio
+async def test_should_migrate_all_chats_including_archived_ones(project_path: Path):
+    history_directory = project_path / "chats"
+    history_directory.mkdir()
+    (history_directory / "plain.json").write_text(json.dumps(_LEGACY_CHAT))
+    with gzip.open(history_directory / "archived.json.gz", "wt") as f:
+        json.dump(_LEGACY_CHAT, f)
+
+    report = await migrate_project_chats(project_path, max_workers=1)
+
+    assert (report.migrated, report.up_to_date, report.failed) == (2, 0, 0)
+    for chat_id in ("plain", "archived"):
+        assert json.loads((history_directory / f"{chat_id}.json").read_text())["schema_version"] == CHAT_SCHEMA_VERSION
+
+    report = await migrate_project_chats(project_path, max_workers=1)
+
+    assert (report.migrated, report.up_to_date, report.failed) == (0, 2, 0)
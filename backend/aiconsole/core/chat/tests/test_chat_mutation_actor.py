@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from aiconsole.core.chat.chat_mutation_actor import ChatMutationActor
+
+
+@pytest.mark.asyncio
+async def test_should_run_operations_in_fifo_order():
+    actor = ChatMutationActor("chat")
+    executed: list[int] = []
+
+    def operation(i: int):
+        async def run():
+            await asyncio.sleep(0)
+            executed.append(i)
+
+        return run
+
+    done = [await actor.submit(operation(i)) for i in range(10)]
+    await asyncio.gather(*done)
+
+    assert executed == list(range(10))
+    assert actor.stats()["processed_count"] == 10
+    assert actor.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_should_propagate_failures_to_submitter_and_continue():
+    actor = ChatMutationActor("chat")
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await actor.run(fail)
+
+    await actor.wait_until_idle()
+
+
+@pytest.mark.asyncio
+async def test_should_cancel_only_the_operation_that_raised_cancelled_error():
+    actor = ChatMutationActor("chat")
+    executed: list[str] = []
+
+    async def cancelled():
+        # e.g. an inner await that was cancelled
+        raise asyncio.CancelledError()
+
+    async def next_operation():
+        executed.append("next")
+
+    cancelled_done = await actor.submit(cancelled)
+    next_done = await actor.submit(next_operation)
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(cancelled_done, timeout=1)
+    await asyncio.wait_for(next_done, timeout=1)
+
+    assert executed == ["next"]
+
+
+@pytest.mark.asyncio
+async def test_should_apply_backpressure_when_queue_is_full():
+    actor = ChatMutationActor("chat", max_queue_size=1)
+    release = asyncio.Event()
+
+    async def blocked():
+        await release.wait()
+
+    await actor.submit(blocked)
+    await asyncio.sleep(0)  # worker takes the first operation
+    await actor.submit(blocked)  # fills the queue
+
+    third = asyncio.create_task(actor.submit(blocked))
+    await asyncio.sleep(0.01)
+    assert not third.done()
+
+    release.set()
+    await (await third)
@@ -0,0 +1,75 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_search_index import ChatSearchIndex, get_chat_search_index
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import (
+    AICMessage,
+    AICMessageGroup,
+    AICToolCall,
+    Chat,
+    ChatOptions,
+)
+
+
+def _chat(chat_id: str, content: str, output: str) -> Chat:
+    message = AICMessage(
+        id=f"{chat_id}-message",
+        timestamp="",
+        content=content,
+        tool_calls=[AICToolCall(id=f"{chat_id}-tool-call", code="print(1)", headline="", output=output)],
+    )
+    chat = Chat(
+        id=chat_id,
+        name=chat_id.capitalize(),
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[
+            AICMessageGroup(
+                id=f"{chat_id}-group",
+                actor_id={"type": "user", "id": "user"},
+                role="user",
+                analysis="",
+                task="",
+                materials_ids=[],
+                messages=[message],
+            )
+        ],
+    )
+    chat.mark_dirty("message_groups")
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_should_find_saved_messages_and_outputs(project_path: Path):
+    await save_chat_history(_chat("first", "Plot the quarterly revenue", "Traceback: ZeroDivisionError"))
+    await save_chat_history(_chat("second", "Summarize the revenue report", "done"))
+
+    hits = await get_chat_search_index().search("revenue")
+    assert {hit.chat_id for hit in hits} == {"first", "second"}
+    assert all("<mark>revenue</mark>" in hit.snippet for hit in hits)
+
+    hits = await get_chat_search_index().search("zerodiv")
+    assert [(hit.chat_id, hit.kind, hit.tool_call_id) for hit in hits] == [("first", "output", "first-tool-call")]
+
+    # Only the changed message is re-indexed
+    chat = _chat("second", "Summarize the sales report", "done")
+    await save_chat_history(chat)
+    assert [hit.chat_id for hit in await get_chat_search_index().search("revenue")] == ["first"]
+    assert await get_chat_search_index().search('"OR(') == []
+
+
+@pytest.mark.asyncio
+async def test_should_index_chats_changed_outside_of_the_process(project_path: Path):
+    await save_chat_history(_chat("first", "Plot the quarterly revenue", "done"))
+
+    chat_path = project_path / "chats" / "first.json"
+    chat_path.write_text(chat_path.read_text().replace("quarterly", "yearly"))
+    (project_path / "chats" / "second.json").write_text((project_path / "chats" / "first.json").read_text())
+
+    index = ChatSearchIndex(project_path)
+    assert {hit.chat_id for hit in await index.search("yearly")} == {"first", "second"}
+    assert await index.search("quarterly") == []
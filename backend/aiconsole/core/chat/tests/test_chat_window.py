@@ -0,0 +1,74 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_window import (
+    open_chat_window,
+    read_older_message_groups,
+    window_of_chat,
+)
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.types import AICMessage, AICMessageGroup, Chat, ChatOptions
+
+
+def _message_group(index: int) -> AICMessageGroup:
+    return AICMessageGroup(
+        id=f"group-{index}",
+        actor_id={"type": "user", "id": "user"},
+        role="user",
+        analysis="",
+        task="",
+        materials_ids=[],
+        messages=[AICMessage(id=f"message-{index}", timestamp="", content=f"Message {index}\nwith a newline")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_should_page_through_chat_file_from_the_end(project_path: Path):
+    chat = Chat(
+        id="chat",
+        name="Chat",
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[_message_group(i) for i in range(5)],
+    )
+    chat.mark_dirty("message_groups")
+    await save_chat_history(chat)
+
+    subscribed = []
+    window = await open_chat_window("chat", 2, subscribe=lambda: subscribed.append(True))
+
+    assert subscribed == [True]
+    assert window.chat.name == "Chat"
+    assert [group.id for group in window.chat.message_groups] == ["group-3", "group-4"]
+    assert window.cursor == "group-3"
+    assert not chat_cache().is_cached("chat")
+
+    older = await read_older_message_groups("chat", window.cursor, 2)
+    assert [group.id for group in older.chat.message_groups] == ["group-1", "group-2"]
+
+    oldest = await read_older_message_groups("chat", older.cursor, 2)
+    assert [group.id for group in oldest.chat.message_groups] == ["group-0"]
+    assert oldest.cursor is None
+
+    # Whole chat when it is already in memory
+    await chat_cache().get("chat")
+    window = await open_chat_window("chat", None, subscribe=lambda: None)
+    assert len(window.chat.message_groups) == 5
+    assert window.cursor is None
+
+
+def test_window_should_not_share_indexes_with_the_chat():
+    chat = Chat(
+        id="chat", name="Chat", last_modified=datetime.now(), message_groups=[_message_group(i) for i in range(3)]
+    )
+    assert chat.get_message_group("group-0") is not None
+
+    window = window_of_chat(chat, 1)
+
+    assert window.chat.get_message_group("group-0") is None
+    assert window.chat.get_message_group("group-2") is chat.message_groups[2]
+    assert chat.get_message_group("group-0") is chat.message_groups[0]
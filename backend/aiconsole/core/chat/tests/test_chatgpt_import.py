@@ -0,0 +1,107 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.chatgpt_import import (
+    ChatImportProgress,
+    convert_conversation,
+    import_chatgpt_conversations,
+    iter_json_array,
+)
+from aiconsole.core.chat.load_chat_history import load_chat_history
+
+
+def _node(id: str, parent: str | None, children: list[str], role: str | None = None, text: str = "") -> dict:
+    message = None
+    if role is not None:
+        message = {
+            "id": id,
+            "author": {"role": role},
+            "create_time": 1700000000,
+            "content": {"content_type": "text", "parts": [text]},
+        }
+    return {"id": id, "message": message, "parent": parent, "children": children}
+
+
+def _conversation(id: str, title: str = "Imported") -> dict:
+    return {
+        "id": id,
+        "title": title,
+        "update_time": 1700000100,
+        "current_node": "answer-2",
+        "mapping": {
+            "root": _node("root", None, ["system"]),
+            "system": _node("system", "root", ["question"], "system", "You are ChatGPT"),
+            "question": _node("question", "system", ["answer-1", "answer-2"], "user", "What is 2 + 2?"),
+            "answer-1": _node("answer-1", "question", [], "assistant", "5"),
+            "answer-2": _node("answer-2", "question", [], "assistant", "4"),
+        },
+    }
+
+
+def test_should_read_json_array_items_across_reads():
+    items = [
+        {"text": "zażółć gęślą jaźń"},
+        [1, 2, {"nested": "]"}],
+        {"escaped": 'a "quoted" \\ ] } text'},
+        "a string, with a comma",
+        True,
+        3,
+    ]
+    data = json.dumps(items, ensure_ascii=False, indent=2).encode()
+
+    result = list(iter_json_array(io.BytesIO(data), read_size=3))
+
+    assert [item for item, _ in result] == items
+    assert result[-1][1] == len(data)
+    assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"a": 1}'), read_size=3))
+
+
+def test_should_convert_the_current_branch_of_a_conversation():
+    chat_id, document = convert_conversation(_conversation("conversation-1"))
+
+    assert chat_id == convert_conversation(_conversation("conversation-1"))[0]
+    assert document is not None
+    assert document["name"] == "Imported"
+    assert [group["role"] for group in document["message_groups"]] == ["user", "assistant"]
+    assert [group["messages"][0]["content"] for group in document["message_groups"]] == ["What is 2 + 2?", "4"]
+
+    empty = _conversation("conversation-2")
+    empty["mapping"] = {"root": _node("root", None, [])}
+    assert convert_conversation(empty)[1] is None
+
+
+@pytest.mark.asyncio
+async def test_should_import_conversations_once(project_path: Path):
+    file_path = project_path / "conversations.json"
+    file_path.write_text(json.dumps([_conversation(f"conversation-{i}", f"Chat {i}") for i in range(5)]))
+    updates: list[tuple[int, int]] = []
+
+    async def on_progress(progress: ChatImportProgress):
+        updates.append((progress.imported, progress.bytes_read))
+
+    progress = await import_chatgpt_conversations(file_path, on_progress=on_progress, max_workers=1, batch_size=2)
+
+    assert (progress.imported, progress.skipped, progress.failed) == (5, 0, 0)
+    assert progress.bytes_read == progress.total_bytes == file_path.stat().st_size
+    assert [imported for imported, _ in updates] == [2, 4, 5]
+    assert len(get_chat_store().list_chat_ids()) == 5
+
+    # Written through the same index updates as saved chats
+    headlines = json.loads((project_path / ".aic" / "chat_headlines.json").read_text())["headlines"]
+    assert sorted(headline["name"] for headline in headlines.values()) == [f"Chat {i}" for i in range(5)]
+
+    chat_id, _ = convert_conversation(_conversation("conversation-3"))
+    chat = await load_chat_history(chat_id)
+    assert chat.name == "Chat 3"
+    assert chat.message_groups[1].messages[0].content == "4"
+
+    progress = await import_chatgpt_conversations(file_path, max_workers=1)
+
+    assert (progress.imported, progress.skipped) == (0, 5)
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    ChatMutation,
+    CreateMessageMutation,
+    SetIsStreamingMessageMutation,
+)
+from aiconsole.core.chat.coalescing_chat_mutator import (
+    CoalescingChatMutator,
+    flush_coalesced_mutations,
+)
+from aiconsole.core.chat.types import AICMessage, AICMessageGroup, Chat
+
+
+class _RecordingChatMutator:
+    def __init__(self):
+        self.chat_id = "chat"
+        self.request_id = "request"
+        self.chat = Chat(
+            id=self.chat_id,
+            name="",
+            last_modified=datetime.now(),
+            message_groups=[
+                AICMessageGroup(
+                    id="group",
+                    actor_id={"type": "agent", "id": "agent"},
+                    role="assistant",
+                    analysis="",
+                    task="",
+                    materials_ids=[],
+                    messages=[AICMessage(id="message", timestamp="", content="")],
+                )
+            ],
+        )
+        self.published: list[ChatMutation] = []
+
+    async def mutate(self, mutation: ChatMutation) -> None:
+        self.apply(mutation)
+        await self.publish(mutation)
+
+    def apply(self, mutation: ChatMutation) -> None:
+        apply_mutation(self.chat, mutation)
+
+    async def publish(self, mutation: ChatMutation) -> None:
+        self.published.append(mutation)
+
+
+def _append(delta: str, message_id: str = "message") -> AppendToContentMessageMutation:
+    return AppendToContentMessageMutation(message_id=message_id, content_delta=delta)
+
+
+@pytest.mark.asyncio
+async def test_should_merge_appends_and_flush_before_other_mutations():
+    inner = _RecordingChatMutator()
+    mutator = CoalescingChatMutator(inner, max_delay=60, max_bytes=1024)  # type: ignore[arg-type]
+
+    for delta in ["Hel", "lo", " world"]:
+        await mutator.mutate(_append(delta))
+
+    # Applied immediately, published later
+    assert inner.chat.message_groups[0].messages[0].content == "Hello world"
+    assert inner.published == []
+
+    await mutator.mutate(SetIsStreamingMessageMutation(message_id="message", is_streaming=False))
+
+    assert inner.published == [
+        _append("Hello world"),
+        SetIsStreamingMessageMutation(message_id="message", is_streaming=False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_should_flush_when_target_changes_or_window_is_exceeded():
+    inner = _RecordingChatMutator()
+    mutator = CoalescingChatMutator(inner, max_delay=60, max_bytes=4)  # type: ignore[arg-type]
+
+    await mutator.mutate(CreateMessageMutation(message_group_id="group", message_id="other", timestamp="", content=""))
+    await mutator.mutate(_append("ab"))
+    await mutator.mutate(_append("c", message_id="other"))
+    await mutator.mutate(_append("defg", message_id="other"))
+
+    assert inner.published[1:] == [_append("ab"), _append("cdefg", message_id="other")]
+
+
+@pytest.mark.asyncio
+async def test_should_flush_after_delay_and_on_demand():
+    inner = _RecordingChatMutator()
+    mutator = CoalescingChatMutator(inner, max_delay=0.01, max_bytes=1024)  # type: ignore[arg-type]
+
+    await mutator.mutate(_append("a"))
+    await asyncio.sleep(0.05)
+
+    assert inner.published == [_append("a")]
+
+    await mutator.mutate(_append("b"))
+    await flush_coalesced_mutations("chat")
+
+    assert inner.published == [_append("a"), _append("b")]
+
+
+@pytest.mark.asyncio
+async def test_should_not_copy_the_chat_while_streaming(monkeypatch: pytest.MonkeyPatch):
+    inner = _RecordingChatMutator()
+    mutator = CoalescingChatMutator(inner, max_delay=60, max_bytes=10)  # type: ignore[arg-type]
+    copies = 0
+    model_copy = AICMessageGroup.model_copy
+
+    def counting_model_copy(self, *args, **kwargs):
+        nonlocal copies
+        copies += 1
+        return model_copy(self, *args, **kwargs)
+
+    monkeypatch.setattr(AICMessageGroup, "model_copy", counting_model_copy)
+
+    # Many coalescing windows, each of them used to copy the whole streamed message group
+    for _ in range(2000):
+        await mutator.mutate(_append("token "))
+
+    assert copies == 0
+
+    await mutator.mutate(_append("?"))
+
+    assert inner.chat.snapshot().message_groups[0].messages[0].content == "token " * 2000
+    assert copies == 1
+
+
+@pytest.mark.asyncio
+async def test_should_wait_for_timer_flushes_and_log_their_failures(caplog: pytest.LogCaptureFixture):
+    inner = _RecordingChatMutator()
+    mutator = CoalescingChatMutator(inner, max_delay=0.01, max_bytes=1024)  # type: ignore[arg-type]
+    published = asyncio.Event()
+
+    async def publish(mutation: ChatMutation) -> None:
+        await published.wait()
+        raise RuntimeError("connection lost")
+
+    inner.publish = publish  # type: ignore[method-assign]
+
+    await mutator.mutate(_append("a"))
+    await asyncio.sleep(0.05)
+
+    # The timer flush is still publishing
+    flushed = asyncio.create_task(flush_coalesced_mutations("chat"))
+    await asyncio.sleep(0)
+    assert not flushed.done()
+
+    published.set()
+    await asyncio.wait_for(flushed, timeout=1)
+
+    assert "Failed to publish coalesced mutations of chat chat" in caplog.text
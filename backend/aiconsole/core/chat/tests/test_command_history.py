@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+from aiconsole.core.chat.command_history import CommandHistory
+
+
+def test_should_dedupe_limit_and_compact_the_log(project_path: Path):
+    history = CommandHistory(limit=3)
+
+    for command in ["first", "second", "FIRST", "third", "fourth"]:
+        history.add(command)
+
+    assert history.commands() == ["FIRST", "third", "fourth"]
+
+    for command in ["fifth", "sixth"]:
+        history.add(command)
+    history.close()
+
+    # Compacted after 2 * limit lines
+    assert len(history.path.read_text().splitlines()) == 3
+    assert CommandHistory(limit=3).commands() == ["fourth", "fifth", "sixth"]
+
+
+def test_should_move_legacy_history_to_the_log(project_path: Path):
+    legacy_path = project_path / ".aic" / "command_history.json"
+    legacy_path.parent.mkdir()
+    legacy_path.write_text(json.dumps(["old", "older"]))
+
+    history = CommandHistory()
+    history.add("new")
+    history.close()
+
+    assert CommandHistory().commands() == ["old", "older", "new"]
+
+
+def test_should_search_by_prefix_then_fuzzy(project_path: Path):
+    history = CommandHistory()
+    for command in ["plot revenue", "print the report", "Please summarize", "open pull request"]:
+        history.add(command)
+
+    assert history.search("pl") == ["Please summarize", "plot revenue", "open pull request"]
+    assert history.search("pr", limit=1) == ["print the report"]
+    assert history.search("xyz") == []
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_lock_manager import get_chat_lock
+from aiconsole.core.chat.locking import (
+    _schedule_compaction,
+    acquire_lock,
+    chats,
+    release_lock,
+)
+from aiconsole.core.chat.types import Chat
+
+
+@pytest.mark.asyncio
+async def test_should_release_the_lock_when_compaction_fails(
+    project_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    await acquire_lock("chat", "request")
+
+    async def fail(chat: Chat) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr("aiconsole.core.chat.locking.compact_chat_journal", fail)
+
+    # Awaited by the release, which then compacts again
+    _schedule_compaction("chat")
+    await release_lock("chat", "request")
+
+    assert "chat" not in chats
+    assert get_chat_lock("chat").holder is None
+    assert caplog.text.count("Failed to compact the journal of chat chat") == 2
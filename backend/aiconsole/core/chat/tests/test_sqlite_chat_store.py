@@ -0,0 +1,164 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_store import get_chat_store
+from aiconsole.core.chat.chat_window import open_chat_window
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.save_chat_history import save_chat_history
+from aiconsole.core.chat.sqlite_chat_store import (
+    SqliteChatStore,
+    migrate_json_chats_to_sqlite,
+)
+from aiconsole.core.chat.types import (
+    AICMessage,
+    AICMessageGroup,
+    AICToolCall,
+    Chat,
+    ChatOptions,
+)
+
+
+@pytest.fixture
+def sqlite_store(project_path: Path, monkeypatch: pytest.MonkeyPatch) -> SqliteChatStore:
+    monkeypatch.setattr("aiconsole.core.chat.chat_store.CHAT_STORE", "sqlite")
+    store = get_chat_store()
+    assert isinstance(store, SqliteChatStore)
+    return store
+
+
+def _chat(chat_id: str, groups: int) -> Chat:
+    chat = Chat(
+        id=chat_id,
+        name=chat_id.capitalize(),
+        title_edited=True,
+        last_modified=datetime.now(),
+        chat_options=ChatOptions(agent_id="agent"),
+        message_groups=[
+            AICMessageGroup(
+                id=f"{chat_id}-group-{i}",
+                actor_id={"type": "agent", "id": "agent"},
+                role="assistant",
+                analysis="",
+                task="",
+                materials_ids=[],
+                messages=[
+                    AICMessage(
+                        id=f"{chat_id}-message-{i}",
+                        timestamp="",
+                        content=f"Message {i}",
+                        tool_calls=[AICToolCall(id=f"{chat_id}-tool-call-{i}", code="print(1)", headline="")],
+                    )
+                ],
+            )
+            for i in range(groups)
+        ],
+    )
+    chat.mark_dirty("message_groups")
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_should_save_load_and_list_chats(sqlite_store: SqliteChatStore):
+    await save_chat_history(_chat("first", 3))
+    await save_chat_history(_chat("second", 1))
+
+    chat = await load_chat_history("first")
+    assert [group.id for group in chat.message_groups] == ["first-group-0", "first-group-1", "first-group-2"]
+    assert chat.message_groups[2].messages[0].tool_calls[0].id == "first-tool-call-2"
+
+    assert sqlite_store.list_chat_ids() == ["second", "first"]
+    assert [headline.name for headline in await sqlite_store.headlines(limit=1)] == ["Second"]
+
+    window = await open_chat_window("first", 2, subscribe=lambda: None)
+    assert [group.id for group in window.chat.message_groups] == ["first-group-1", "first-group-2"]
+    assert window.cursor == "first-group-1"
+
+    stream = sqlite_store.read_stream("first")
+    assert stream is not None
+    assert stream[0]["name"] == "First"
+    assert [group["messages"][0]["id"] for group in stream[1]] == [
+        "first-message-0",
+        "first-message-1",
+        "first-message-2",
+    ]
+
+    assert await sqlite_store.delete("second")
+    assert sqlite_store.list_chat_ids() == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_should_rewrite_only_changed_rows(sqlite_store: SqliteChatStore):
+    await save_chat_history(_chat("chat", 3))
+
+    stored = sqlite_store.read("chat")
+    assert stored is not None
+    content = stored[0]
+    content["message_groups"][1]["messages"][0]["content"] = "Edited"
+    del content["message_groups"][0]
+
+    statements: list[str] = []
+    sqlite_store._connect().set_trace_callback(statements.append)
+    sqlite_store.write("chat", content)
+
+    writes = [statement for statement in statements if statement.startswith(("INSERT", "DELETE"))]
+    assert sum("INTO messages" in statement for statement in writes) == 1
+    assert sum("INTO message_groups" in statement for statement in writes) == 2  # the remaining groups moved
+    assert sum("INTO tool_calls" in statement for statement in writes) == 0
+
+    loaded = (await load_chat_history("chat")).message_groups
+    assert [group.messages[0].content for group in loaded] == ["Edited", "Message 2"]
+
+
+@pytest.mark.asyncio
+async def test_should_write_only_the_header_of_renamed_chats(sqlite_store: SqliteChatStore):
+    chat = _chat("chat", 3)
+    await save_chat_history(chat)
+
+    statements: list[str] = []
+    sqlite_store._connect().set_trace_callback(statements.append)
+    chat.name = "Renamed"
+    chat.mark_dirty("name")
+    await save_chat_history(chat)
+
+    assert not any("message_groups" in statement or "tool_calls" in statement for statement in statements)
+    assert (await load_chat_history("chat")).name == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_should_reopen_connections_after_closing(sqlite_store: SqliteChatStore):
+    await save_chat_history(_chat("chat", 1))
+    connection = sqlite_store._connect()
+
+    sqlite_store.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+    assert len((await load_chat_history("chat")).message_groups) == 1
+
+
+@pytest.mark.asyncio
+async def test_should_copy_json_chats_into_sqlite(project_path: Path, monkeypatch: pytest.MonkeyPatch):
+    await save_chat_history(_chat("chat", 2))
+
+    assert migrate_json_chats_to_sqlite(project_path) == 1
+
+    monkeypatch.setattr("aiconsole.core.chat.chat_store.CHAT_STORE", "sqlite")
+    monkeypatch.setattr("aiconsole.core.chat.chat_store._stores", {})
+    chat = await load_chat_history("chat")
+    assert chat.name == "Chat"
+    assert len(chat.message_groups) == 2
+
+
+@pytest.mark.asyncio
+async def test_should_read_chats_with_more_groups_than_bound_variables(sqlite_store: SqliteChatStore):
+    await save_chat_history(_chat("long", 1200))
+    # The limit of older SQLite builds, newer ones allow more
+    sqlite_store._connect().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    loaded = await load_chat_history("long")
+
+    assert len(loaded.message_groups) == 1200
+    assert loaded.message_groups[-1].messages[0].tool_calls[0].id == "long-tool-call-1199"
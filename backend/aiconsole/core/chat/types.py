@@ -16,9 +16,16 @@
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field, field_serializer
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    SerializerFunctionWrapHandler,
+    field_serializer,
+    model_serializer,
+)
 
 from aiconsole.core.assets.types import EditableObject
 from aiconsole.core.chat.actor_id import ActorId
@@ -27,7 +34,74 @@ from aiconsole.core.gpt.tool_definition import ToolDefinition
 from aiconsole.core.gpt.types import GPTRole
 
 
-class AICToolCall(BaseModel):
+class _StreamingTextModel(BaseModel):
+    """
+    Model with str fields that are extended chunk by chunk while streaming.
+
+    append_text keeps appended chunks in a list and removes the field from __dict__,
+    the str is joined only once the field is read, compared or serialized.
+    """
+
+    _text_chunks: dict[str, list[str]] = PrivateAttr(default_factory=dict)
+
+    def append_text(self, field: str, delta: str) -> None:
+        chunks = self._text_chunks.get(field)
+
+        # Field present in __dict__ means it was read or assigned since the last append
+        if chunks is None or field in self.__dict__:
+            value = self.__dict__.pop(field)
+            chunks = self._text_chunks[field] = [value] if value else []
+
+        chunks.append(delta)
+
+    def text_length(self, field: str) -> int:
+        """Length of a str field, without joining the chunks of a streamed one."""
+        if field in self.__dict__:
+            return len(self.__dict__[field] or "")
+
+        return sum(len(chunk) for chunk in self._text_chunks.get(field, ()))
+
+    def _materialize_text(self, field: str) -> str:
+        value = "".join(self._text_chunks.pop(field))
+
+        # Keep the declared field order, serialized output follows __dict__
+        values = self.__dict__
+        values[field] = value
+        ordered = {name: values[name] for name in type(self).model_fields if name in values}
+        values.clear()
+        values.update(ordered)
+
+        return value
+
+    def _materialize_all_text(self) -> None:
+        for field in list(self._text_chunks):
+            if field in self.__dict__:
+                del self._text_chunks[field]
+            else:
+                self._materialize_text(field)
+
+    def __getattr__(self, name: str) -> Any:
+        # Called only for names missing from __dict__, so plain field access stays free
+        if not name.startswith("_"):
+            private = object.__getattribute__(self, "__pydantic_private__")
+            if private and name in private["_text_chunks"]:
+                return self._materialize_text(name)
+
+        return super().__getattr__(name)  # type: ignore[misc]
+
+    def __eq__(self, other: Any) -> bool:
+        self._materialize_all_text()
+        if isinstance(other, _StreamingTextModel):
+            other._materialize_all_text()
+        return super().__eq__(other)
+
+    @model_serializer(mode="wrap")
+    def _serialize_materialized(self, handler: SerializerFunctionWrapHandler):
+        self._materialize_all_text()
+        return handler(self)
+
+
+class AICToolCall(_StreamingTextModel):
     id: str
     language: LanguageStr | None = None
     code: str
@@ -38,7 +112,7 @@ class AICToolCall(BaseModel):
     is_executing: bool = False
 
 
-class AICMessage(BaseModel):
+class AICMessage(_StreamingTextModel):
     id: str
     timestamp: str
     content: str
@@ -78,6 +152,10 @@ class AICToolCallLocation:
     tool_call: AICToolCall
 
 
+# Parts of a chat that are saved independently
+ChatScope = Literal["message_groups", "chat_options", "name"]
+
+
 class ChatOptions(BaseModel):
     agent_id: Optional[str] = ""
     materials_ids: Optional[list[str]] = Field(default_factory=list)
@@ -97,30 +175,207 @@ class Chat(ChatHeadline):
     message_groups: list[AICMessageGroup]
     is_analysis_in_progress: bool = False
 
-    def get_message_group(self, message_group_id: str) -> AICMessageGroup | None:
+    # Parts of the chat modified since it was loaded or last saved
+    _dirty_scopes: set[str] = PrivateAttr(default_factory=set)
+
+    # Version of the chat in the chat store as of the last load or save (the mtime of its file for JSON),
+    # None if it is not stored
+    _file_mtime_ns: int | None = PrivateAttr(default=None)
+
+    # Sequence number of the last mutation journaled for or replayed into this chat
+    _journal_seq: int = PrivateAttr(default=0)
+
+    # Last committed version handed out to readers, with the live groups its groups were copied from
+    _snapshot: "Chat | None" = PrivateAttr(default=None)
+    _snapshot_sources: dict[str, AICMessageGroup] = PrivateAttr(default_factory=dict)
+    _changed_message_group_ids: set[str] = PrivateAttr(default_factory=set)
+    # Text appended to the chat but not sent to the clients yet: (id of the target, field) -> number of characters
+    _unpublished_text: dict[tuple[str, str], int] = PrivateAttr(default_factory=dict)
+
+    # id -> node indexes, built lazily and kept up to date by the mutation handlers
+    _message_groups_by_id: dict[str, AICMessageGroup] | None = PrivateAttr(default=None)
+    _message_locations_by_id: dict[str, AICMessageLocation] = PrivateAttr(default_factory=dict)
+    _tool_call_locations_by_id: dict[str, AICToolCallLocation] = PrivateAttr(default_factory=dict)
+
+    @property
+    def dirty_scopes(self) -> set[str]:
+        return self._dirty_scopes
+
+    def mark_dirty(self, scope: ChatScope) -> None:
+        self._dirty_scopes.add(scope)
+
+    @property
+    def file_mtime_ns(self) -> int | None:
+        return self._file_mtime_ns
+
+    @file_mtime_ns.setter
+    def file_mtime_ns(self, value: int | None) -> None:
+        self._file_mtime_ns = value
+
+    @property
+    def journal_seq(self) -> int:
+        return self._journal_seq
+
+    @journal_seq.setter
+    def journal_seq(self, value: int) -> None:
+        self._journal_seq = value
+
+    @property
+    def has_unpublished_changes(self) -> bool:
+        """Set while text applied to the chat is not sent to the clients yet, readers do not get that text."""
+        return bool(self._unpublished_text)
+
+    def add_unpublished_text(self, target_id: str, field: str, length: int) -> None:
+        key = (target_id, field)
+        self._unpublished_text[key] = self._unpublished_text.get(key, 0) + length
+
+    def mark_text_published(self, target_id: str, field: str) -> None:
+        self._unpublished_text.pop((target_id, field), None)
+
+    def mark_message_group_changed(self, message_group_id: str) -> None:
+        self._changed_message_group_ids.add(message_group_id)
+
+    def snapshot(self) -> "Chat":
+        """
+        Last published version of the chat, for readers that must not wait for writers. Must not be modified.
+        Built when a reader asks for it, writers never copy the chat.
+        """
+        return self.commit_snapshot()
+
+    def commit_snapshot(self) -> "Chat":
+        """
+        Copies the current state of the chat, without unpublished text, into a new snapshot.
+        Message groups not changed since the previous snapshot are shared with it instead of being copied.
+        """
+        previous_groups = (
+            {message_group.id: message_group for message_group in self._snapshot.message_groups}
+            if self._snapshot is not None
+            else {}
+        )
+
+        message_groups = []
         for message_group in self.message_groups:
-            if message_group.id == message_group_id:
-                return message_group
-        return None
+            is_unchanged = (
+                message_group.id not in self._changed_message_group_ids
+                and self._snapshot_sources.get(message_group.id) is message_group
+                and message_group.id in previous_groups
+            )
+            message_groups.append(
+                previous_groups[message_group.id] if is_unchanged else _copy_message_group(message_group)
+            )
+
+        # Cut off text that is not published yet, those groups are copied again by the next snapshot
+        changed_message_group_ids = set()
+        for (target_id, field), length in self._unpublished_text.items():
+            for message_group in message_groups:
+                if message_group.id in previous_groups and message_group is previous_groups[message_group.id]:
+                    continue  # shared with a snapshot that was already handed out
+
+                target = _find_text_target(message_group, target_id)
+                if target is not None:
+                    value = getattr(target, field) or ""
+                    setattr(target, field, value[: max(len(value) - length, 0)])
+                    changed_message_group_ids.add(message_group.id)
+                    break
+
+        self._snapshot = Chat.model_construct(
+            **{
+                name: getattr(self, name)
+                for name in Chat.model_fields
+                if name not in ("chat_options", "message_groups")
+            },
+            chat_options=self.chat_options.model_copy(deep=True),
+            message_groups=message_groups,
+        )
+        self._snapshot_sources = {message_group.id: message_group for message_group in self.message_groups}
+        self._changed_message_group_ids = changed_message_group_ids
+
+        return self._snapshot
+
+    def _ensure_indexes(self) -> dict[str, AICMessageGroup]:
+        if self._message_groups_by_id is None:
+            self.rebuild_indexes()
+        return self._message_groups_by_id  # type: ignore[return-value]
+
+    def rebuild_indexes(self) -> None:
+        """
+        Recreates all id indexes from message_groups.
+        Needed only if message_groups were modified without going through the mutation handlers.
+        """
+        self._message_groups_by_id = {}
+        self._message_locations_by_id = {}
+        self._tool_call_locations_by_id = {}
 
-    def get_message_location(self, message_id: str) -> AICMessageLocation | None:
         for message_group in self.message_groups:
-            for message in message_group.messages:
-                if message.id == message_id:
-                    return AICMessageLocation(message_group=message_group, message=message)
-        return None
+            self._index_message_group(message_group)
+
+    def _index_message_group(self, message_group: AICMessageGroup) -> None:
+        self._ensure_indexes()[message_group.id] = message_group
+        for message in message_group.messages:
+            self._index_message(message_group, message)
+
+    def _index_message(self, message_group: AICMessageGroup, message: AICMessage) -> None:
+        self._message_locations_by_id[message.id] = AICMessageLocation(message_group=message_group, message=message)
+        for tool_call in message.tool_calls:
+            self._index_tool_call(message_group, message, tool_call)
+
+    def _index_tool_call(self, message_group: AICMessageGroup, message: AICMessage, tool_call: AICToolCall) -> None:
+        self._tool_call_locations_by_id[tool_call.id] = AICToolCallLocation(
+            message_group=message_group,
+            message=message,
+            tool_call=tool_call,
+        )
+
+    def _unindex_message_group(self, message_group: AICMessageGroup) -> None:
+        self._ensure_indexes().pop(message_group.id, None)
+        for message in message_group.messages:
+            self._unindex_message(message)
+
+    def _unindex_message(self, message: AICMessage) -> None:
+        self._message_locations_by_id.pop(message.id, None)
+        for tool_call in message.tool_calls:
+            self._tool_call_locations_by_id.pop(tool_call.id, None)
+
+    def add_message_group(self, message_group: AICMessageGroup) -> None:
+        self._ensure_indexes()
+        self.message_groups.append(message_group)
+        self._index_message_group(message_group)
+
+    def remove_message_group(self, message_group: AICMessageGroup) -> None:
+        self._ensure_indexes()
+        self.message_groups = [group for group in self.message_groups if group is not message_group]
+        self._unindex_message_group(message_group)
+
+    def add_message(self, message_group: AICMessageGroup, message: AICMessage) -> None:
+        self._ensure_indexes()
+        message_group.messages.append(message)
+        self._index_message(message_group, message)
+
+    def remove_message(self, message_group: AICMessageGroup, message: AICMessage) -> None:
+        self._ensure_indexes()
+        message_group.messages = [m for m in message_group.messages if m is not message]
+        self._unindex_message(message)
+
+    def add_tool_call(self, message_group: AICMessageGroup, message: AICMessage, tool_call: AICToolCall) -> None:
+        self._ensure_indexes()
+        message.tool_calls.append(tool_call)
+        self._index_tool_call(message_group, message, tool_call)
+
+    def remove_tool_call(self, message: AICMessage, tool_call: AICToolCall) -> None:
+        self._ensure_indexes()
+        message.tool_calls = [tc for tc in message.tool_calls if tc is not tool_call]
+        self._tool_call_locations_by_id.pop(tool_call.id, None)
+
+    def get_message_group(self, message_group_id: str) -> AICMessageGroup | None:
+        return self._ensure_indexes().get(message_group_id)
+
+    def get_message_location(self, message_id: str) -> AICMessageLocation | None:
+        self._ensure_indexes()
+        return self._message_locations_by_id.get(message_id)
 
     def get_tool_call_location(self, tool_call_id: str) -> AICToolCallLocation | None:
-        for message_group in self.message_groups:
-            for message in message_group.messages:
-                for tool_call in message.tool_calls:
-                    if tool_call.id == tool_call_id:
-                        return AICToolCallLocation(
-                            message_group=message_group,
-                            message=message,
-                            tool_call=tool_call,
-                        )
-        return None
+        self._ensure_indexes()
+        return self._tool_call_locations_by_id.get(tool_call_id)
 
 
 class Command(BaseModel):
@@ -129,3 +384,29 @@ class Command(BaseModel):
 
 class ChatHeadlines(BaseModel):
     headlines: list[ChatHeadline]
+
+
+def _copy_message_group(message_group: AICMessageGroup) -> AICMessageGroup:
+    # Joined first, deep copying the chunk lists of a streamed text costs far more than copying one str
+    for message in message_group.messages:
+        message._materialize_all_text()
+        for tool_call in message.tool_calls:
+            tool_call._materialize_all_text()
+
+    return message_group.model_copy(deep=True)
+
+
+def _find_text_target(
+    message_group: AICMessageGroup, target_id: str
+) -> AICMessageGroup | AICMessage | AICToolCall | None:
+    if message_group.id == target_id:
+        return message_group
+
+    for message in message_group.messages:
+        if message.id == target_id:
+            return message
+        for tool_call in message.tool_calls:
+            if tool_call.id == target_id:
+                return tool_call
+
+    return None
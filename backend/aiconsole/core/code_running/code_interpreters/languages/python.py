@@ -220,12 +220,19 @@ matplotlib.use('{backend}')
         self.kc.execute(code)  # execute_interactive
 
     async def _capture_output(self, message_queue):
+        # Imported here, the project paths import the code interpreters
+        from aiconsole.core.blobs.blob_store import BlobStore, spill_image_output
+
         while True:
             if self.listener_thread:
                 try:
                     output = message_queue.get(timeout=0.1)
                     _log.debug("Output from queue: %s", output)
                     if content := output.get("content", None):
+                        if output["type"] == "image":
+                            # Images are stored once in the project and referenced, not inlined in the chat
+                            media_type = "image/" + output["format"].removeprefix("base64.")
+                            content = spill_image_output(BlobStore(), content, media_type)
                         yield content
                 except queue.Empty:
                     if self.finish_flag:
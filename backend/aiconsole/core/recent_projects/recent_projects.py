@@ -18,10 +18,10 @@ import os
 from pathlib import Path
 
 from aiconsole.consts import AICONSOLE_USER_CONFIG_DIR, MAX_RECENT_PROJECTS
+from aiconsole.core.chat.chat_store import get_chat_store
 from aiconsole.core.chat.list_possible_historic_chat_ids import (
     list_possible_historic_chat_ids,
 )
-from aiconsole.core.chat.load_chat_history import load_chat_history
 from aiconsole.core.recent_projects.registry import recent_projects_stats
 from aiconsole.core.recent_projects.types import (
     RecentProject,
@@ -84,12 +84,9 @@ async def get_recent_project() -> list[RecentProject]:
         materials_count = recent_projects_stats.get_materials_counts(path)
         agents_count = recent_projects_stats.get_agents_count(path)
 
-        recent_chat_names: list[str] = []
-        for id in chat_ids[:_RECENT_PROJECTS_LAST_CHATS_COUNT]:
-            try:
-                recent_chat_names.append((await load_chat_history(id, path)).name)
-            except Exception:
-                _log.exception(f"Error loading chat {id}")
+        recent_chat_names = [
+            headline.name for headline in await get_chat_store(path).headlines(limit=_RECENT_PROJECTS_LAST_CHATS_COUNT)
+        ]
 
         if path.exists():
             incorrect_path = False
@@ -29,6 +29,10 @@ import { API_HOOKS, getBaseURL } from '../../store/useAPIStore';
 import { useWebSocketStore } from '../ws/useWebSocketStore';
 import { ChatOpenedServerMessage, ServerMessage } from '../ws/serverMessages';
 import { v4 as uuidv4 } from 'uuid';
+import { ChatStreamPosition } from '@/store/editables/chat/ChatSlice';
+
+// Number of the last message groups sent when a chat is opened, the older ones are fetched on scrolling up
+export const CHAT_WINDOW_SIZE = 50;
 
 const previewMaterial: (material: Material) => Promise<RenderedMaterial> = async (material: Material) =>
   ky
@@ -57,16 +61,19 @@ async function fetchEditableObject<T extends EditableObject>({
   id,
   location,
   type,
+  window,
 }: {
   editableObjectType: EditableObjectType;
   id: string;
   location?: MaterialDefinitionSource;
   type?: string;
+  // For chats, number of the last message groups to fetch, all of them if not given
+  window?: number;
 }): Promise<T> {
   if (editableObjectType === 'chat') {
     const response: ChatOpenedServerMessage = (await useWebSocketStore
       .getState()
-      .sendMessageAndWaitForResponse({ type: 'OpenChatClientMessage', chat_id: id, request_id: uuidv4() }, (response: ServerMessage) => {
+      .sendMessageAndWaitForResponse({ type: 'OpenChatClientMessage', chat_id: id, request_id: uuidv4(), window }, (response: ServerMessage) => {
         if (response.type === 'ChatOpenedServerMessage') {
           return response.chat.id === id;
         } else {
@@ -99,6 +106,35 @@ async function closeChat(id: string): Promise<ServerMessage> {
   return response;
 }
 
+// Opens the chat again without waiting for it, with a stream position only the missed mutations are sent
+async function reopenChat(id: string, streamPosition?: ChatStreamPosition) {
+  await useWebSocketStore.getState().sendMessage({
+    type: 'OpenChatClientMessage',
+    chat_id: id,
+    request_id: uuidv4(),
+    window: CHAT_WINDOW_SIZE,
+    stream_id: streamPosition?.streamId,
+    since_seq: streamPosition?.seq,
+  });
+}
+
+// Fetches the message groups older than the one with the cursor id, they are added to the chat when received
+async function fetchOlderMessageGroups(id: string, cursor: string): Promise<ServerMessage> {
+  const requestId = uuidv4();
+  return useWebSocketStore.getState().sendMessageAndWaitForResponse(
+    {
+      type: 'FetchOlderMessageGroupsClientMessage',
+      chat_id: id,
+      request_id: requestId,
+      before: cursor,
+      limit: CHAT_WINDOW_SIZE,
+    },
+    (response: ServerMessage) => {
+      return response.type === 'OlderMessageGroupsServerMessage' && response.request_id === requestId;
+    },
+  );
+}
+
 async function doesEdibleExist(
   editableObjectType: EditableObjectType,
   id: string,
@@ -186,5 +222,7 @@ export const EditablesAPI = {
   updateEditableObject,
   getPathForEditableObject,
   closeChat,
+  reopenChat,
+  fetchOlderMessageGroups,
   setAgentAvatar,
 };
@@ -67,7 +67,7 @@ export function applyMutation(chat: Chat, mutation: ChatMutation) {
       message_group.messages.push({
         id: mutation.message_id,
         content: mutation.content,
-        timestamp: new Date().toISOString(),
+        timestamp: mutation.timestamp || new Date().toISOString(),
         tool_calls: [],
         is_streaming: false,
       });
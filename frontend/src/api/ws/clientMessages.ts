@@ -50,10 +50,26 @@ export const OpenChatClientMessageSchema = BaseClientMessageSchema.extend({
   type: z.literal('OpenChatClientMessage'),
   chat_id: z.string(),
   request_id: z.string(),
+  // Number of the last message groups to send, all of them if not given
+  window: z.number().optional(),
+  // When reopening, stream_id and seq of the last received mutation, only the mutations published after it are sent
+  stream_id: z.string().optional(),
+  since_seq: z.number().optional(),
 });
 
 export type OpenChatClientMessage = z.infer<typeof OpenChatClientMessageSchema>;
 
+export const FetchOlderMessageGroupsClientMessageSchema = BaseClientMessageSchema.extend({
+  type: z.literal('FetchOlderMessageGroupsClientMessage'),
+  request_id: z.string(),
+  chat_id: z.string(),
+  // Id of the message group the older ones are sent for
+  before: z.string(),
+  limit: z.number(),
+});
+
+export type FetchOlderMessageGroupsClientMessage = z.infer<typeof FetchOlderMessageGroupsClientMessageSchema>;
+
 export const StopChatClientMessageSchema = BaseClientMessageSchema.extend({
   type: z.literal('StopChatClientMessage'),
   request_id: z.string(),
@@ -91,6 +107,7 @@ export const ClientMessageSchema = z.union([
   AcquireLockClientMessageSchema,
   ReleaseLockClientMessageSchema,
   OpenChatClientMessageSchema,
+  FetchOlderMessageGroupsClientMessageSchema,
   StopChatClientMessageSchema,
   CloseChatClientMessageSchema,
   AcceptCodeClientMessageSchema,
@@ -10,6 +10,29 @@ import { EditablesAPI } from '../api/EditablesAPI';
 import { Chat } from '@/types/editables/chatTypes';
 import { v4 as uuidv4 } from 'uuid';
 
+// Moves the stream position of the open chat to seq, false if the message with it must not be applied
+function advanceChatStream(chatId: string, seq: number | null | undefined): boolean {
+  const { chat, chatStreamPosition } = useChatStore.getState();
+  if (seq == null || !chatStreamPosition || chat?.id !== chatId) {
+    return true;
+  }
+
+  if (seq <= chatStreamPosition.seq) {
+    // Already applied, replayed after reconnecting
+    return false;
+  }
+
+  if (seq > chatStreamPosition.seq + 1) {
+    // Some mutations were missed, the chat is replaced when it is reopened
+    useChatStore.setState({ chatStreamPosition: undefined });
+    EditablesAPI.reopenChat(chatId);
+    return false;
+  }
+
+  useChatStore.setState({ chatStreamPosition: { ...chatStreamPosition, seq } });
+  return true;
+}
+
 export async function handleServerMessage(message: ServerMessage) {
   const showToast = useToastsStore.getState().showToast;
 
@@ -95,15 +118,75 @@ export async function handleServerMessage(message: ServerMessage) {
       if (!chat) {
         throw new Error('Chat is not initialized');
       }
-      applyMutation(chat, message.mutation);
+
+      if (!advanceChatStream(message.chat_id, message.seq)) {
+        break;
+      }
+
+      try {
+        applyMutation(chat, message.mutation);
+      } catch (error) {
+        if (!useChatStore.getState().chatCursor) {
+          throw error;
+        }
+        // The mutated message group is older than the loaded ones, it is fetched with the mutation applied
+        break;
+      }
       useChatStore.setState({ chat });
       break;
     }
+    case 'ChatMutationAckServerMessage':
+      // The mutation came from this client and is already applied
+      advanceChatStream(message.chat_id, message.seq);
+      break;
     case 'ChatOpenedServerMessage':
       useChatStore.setState({
         chat: message.chat,
+        chatCursor: message.cursor ?? undefined,
+        chatStreamPosition:
+          message.stream_id != null && message.seq != null
+            ? { streamId: message.stream_id, seq: message.seq }
+            : undefined,
       });
       break;
+    case 'OlderMessageGroupsServerMessage': {
+      const chat = deepCopyChat(useChatStore.getState().chat);
+      if (!chat || chat.id !== message.chat_id) {
+        break;
+      }
+
+      const loadedIds = new Set(chat.message_groups.map((group) => group.id));
+      chat.message_groups = [
+        ...message.message_groups.filter((group) => !loadedIds.has(group.id)),
+        ...chat.message_groups,
+      ];
+      useChatStore.setState({ chat, chatCursor: message.cursor ?? undefined });
+      break;
+    }
+    case 'ChatResyncRequiredServerMessage': {
+      // Mutations of the open chat were dropped, the ChatOpenedServerMessage sent on reopening replaces it
+      const chatId = useChatStore.getState().chat?.id;
+      if (chatId && message.chat_ids.includes(chatId)) {
+        useChatStore.setState({ chatStreamPosition: undefined });
+        EditablesAPI.reopenChat(chatId);
+      }
+      break;
+    }
+    case 'ChatImportProgressServerMessage':
+      // Imported chats are listed as they are written
+      useEditablesStore.getState().initChatHistory();
+      if (message.is_finished) {
+        showToast(
+          message.error
+            ? { title: 'Import failed', message: message.error, variant: 'error' }
+            : {
+                title: 'Chats imported',
+                message: `Imported ${message.imported} chats, skipped ${message.skipped}, failed ${message.failed}.`,
+                variant: 'success',
+              },
+        );
+      }
+      break;
     case 'ResponseServerMessage': {
       if (message.is_error) {
         EditablesAPI.closeChat(message.payload.chat_id);
@@ -15,7 +15,7 @@
 // limitations under the License.
 
 import { z } from 'zod';
-import { ChatSchema } from '@/types/editables/chatTypes';
+import { AICMessageGroupSchema, ChatSchema } from '@/types/editables/chatTypes';
 import { AssetTypeSchema } from '@/types/editables/assetTypes';
 import { ChatMutationSchema } from './chat/chatMutations';
 
@@ -95,6 +95,8 @@ export const NotifyAboutChatMutationServerMessageSchema = BaseServerMessageSchem
   request_id: z.string(),
   chat_id: z.string(),
   mutation: ChatMutationSchema, // Assuming ChatMutationSchema is defined
+  // Position in the mutation stream of the chat
+  seq: z.number().nullable().optional(),
 });
 
 export type NotifyAboutChatMutationServerMessage = z.infer<typeof NotifyAboutChatMutationServerMessageSchema>;
@@ -102,10 +104,58 @@ export type NotifyAboutChatMutationServerMessage = z.infer<typeof NotifyAboutCha
 export const ChatOpenedServerMessageSchema = BaseServerMessageSchema.extend({
   type: z.literal('ChatOpenedServerMessage'),
   chat: ChatSchema,
+  // Id of the oldest sent message group if there are older ones, see FetchOlderMessageGroupsClientMessage
+  cursor: z.string().nullable().optional(),
+  // Mutation stream of the chat and the seq of the last mutation included in the chat
+  stream_id: z.string().nullable().optional(),
+  seq: z.number().nullable().optional(),
 });
 
 export type ChatOpenedServerMessage = z.infer<typeof ChatOpenedServerMessageSchema>;
 
+export const OlderMessageGroupsServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('OlderMessageGroupsServerMessage'),
+  request_id: z.string(),
+  chat_id: z.string(),
+  message_groups: z.array(AICMessageGroupSchema),
+  cursor: z.string().nullable().optional(),
+});
+
+export type OlderMessageGroupsServerMessage = z.infer<typeof OlderMessageGroupsServerMessageSchema>;
+
+// Sent instead of the mutation to the client it came from, which already applied it
+export const ChatMutationAckServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('ChatMutationAckServerMessage'),
+  request_id: z.string(),
+  chat_id: z.string(),
+  seq: z.number(),
+});
+
+export type ChatMutationAckServerMessage = z.infer<typeof ChatMutationAckServerMessageSchema>;
+
+// Mutations of these chats were dropped because the connection fell behind, they have to be reopened
+export const ChatResyncRequiredServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('ChatResyncRequiredServerMessage'),
+  chat_ids: z.array(z.string()),
+});
+
+export type ChatResyncRequiredServerMessage = z.infer<typeof ChatResyncRequiredServerMessageSchema>;
+
+// Progress of a chat import started with POST /api/chats/import/chatgpt, sent to all connections
+export const ChatImportProgressServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('ChatImportProgressServerMessage'),
+  import_id: z.string(),
+  imported: z.number(),
+  skipped: z.number(),
+  failed: z.number(),
+  bytes_read: z.number(),
+  total_bytes: z.number(),
+  is_finished: z.boolean().optional(),
+  error: z.string().nullable().optional(),
+});
+
+export type ChatImportProgressServerMessage = z.infer<typeof ChatImportProgressServerMessageSchema>;
+
 export const ResponseServerMessageSchema = BaseServerMessageSchema.extend({
   request_id: z.string(),
   is_error: z.boolean(),
@@ -131,6 +181,10 @@ export const ServerMessageSchema = z.discriminatedUnion('type', [
   SettingsServerMessageSchema,
   NotifyAboutChatMutationServerMessageSchema,
   ChatOpenedServerMessageSchema,
+  OlderMessageGroupsServerMessageSchema,
+  ChatMutationAckServerMessageSchema,
+  ChatResyncRequiredServerMessageSchema,
+  ChatImportProgressServerMessageSchema,
   ResponseServerMessageSchema,
 ]);
 
@@ -19,6 +19,8 @@ import { ErrorEvent } from 'reconnecting-websocket/events';
 
 import { create } from 'zustand';
 import { useAPIStore } from '../../store/useAPIStore';
+import { useChatStore } from '../../store/editables/chat/useChatStore';
+import { EditablesAPI } from '../api/EditablesAPI';
 import { ClientMessage } from './clientMessages';
 import { handleServerMessage } from './handleServerMessage';
 import { ServerMessage, ServerMessageSchema } from './serverMessages';
@@ -49,11 +51,19 @@ export const useWebSocketStore = create<WebSockeStore>((set, get) => ({
 
     const getBaseHostWithPort = useAPIStore.getState().getBaseHostWithPort;
     const ws = new ReconnectingWebSocket(`ws://${getBaseHostWithPort()}/ws`);
+    let wasConnected = false;
 
     ws.onopen = () => {
       set({ ws });
 
       console.log('WebSocket connection established');
+
+      // The new connection is not subscribed to the open chat, it gets the mutations missed in between if still kept
+      const { chat, chatStreamPosition } = useChatStore.getState();
+      if (wasConnected && chat) {
+        EditablesAPI.reopenChat(chat.id, chatStreamPosition);
+      }
+      wasConnected = true;
     };
 
     ws.onmessage = async (e: MessageEvent) => {
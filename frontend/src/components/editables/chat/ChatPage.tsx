@@ -14,7 +14,7 @@
 // See the License for the specific language governing permissions and
 // limitations under the License.
 
-import { EditablesAPI } from '@/api/api/EditablesAPI';
+import { CHAT_WINDOW_SIZE, EditablesAPI } from '@/api/api/EditablesAPI';
 import AlertDialog from '@/components/common/AlertDialog';
 import { ContextMenu } from '@/components/common/ContextMenu';
 import { QuestionMarkIcon } from '@/components/common/icons/QuestionMarkIcon';
@@ -53,6 +53,40 @@ export function ChatWindowScrollToBottomSave() {
   return <></>;
 }
 
+// Fetches the older message groups of a windowed chat once the top of the loaded ones is scrolled into view
+const OlderMessageGroupsLoader = () => {
+  const chatCursor = useChatStore((state) => state.chatCursor);
+  const fetchOlderMessageGroups = useChatStore((state) => state.fetchOlderMessageGroups);
+  const [element, setElement] = useState<HTMLDivElement | null>(null);
+
+  useEffect(() => {
+    if (!element || !chatCursor) {
+      return;
+    }
+
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        fetchOlderMessageGroups();
+      }
+    });
+    observer.observe(element);
+
+    return () => {
+      observer.disconnect();
+    };
+  }, [element, chatCursor, fetchOlderMessageGroups]);
+
+  if (!chatCursor) {
+    return null;
+  }
+
+  return (
+    <div ref={setElement} className="flex justify-center py-4">
+      <Spinner width={30} height={30} />
+    </div>
+  );
+};
+
 const ScrollToBottomButton = () => {
   const [isScrollingToBottom] = useAnimating();
   const [isSticky] = useSticky();
@@ -146,14 +180,14 @@ export function ChatPage() {
       });
     } else {
       //For id === 'new' This will get a default new asset
-      EditablesAPI.fetchEditableObject<Chat>({ editableObjectType, id }).then((chat) => {
+      EditablesAPI.fetchEditableObject<Chat>({ editableObjectType, id, window: CHAT_WINDOW_SIZE }).then((chat) => {
         setChat(chat);
       });
     }
 
     return () => {
       EditablesAPI.closeChat(id);
-      useChatStore.setState({ chat: undefined });
+      useChatStore.setState({ chat: undefined, chatCursor: undefined });
     };
   }, [copyId, id, editableObjectType, forceRefresh, setChat]);
 
@@ -275,6 +309,7 @@ export function ChatPage() {
                   <EmptyChat />
                 ) : (
                   <div className="flex flex-col overflow-y-auto w-full">
+                    <OlderMessageGroupsLoader />
                     {chat.message_groups.map((group) => (
                       <MessageGroup group={group} key={group.id} />
                     ))}
@@ -15,12 +15,38 @@
 // limitations under the License.
 
 import { useChatStore } from '@/store/editables/chat/useChatStore';
+import { getBaseURL } from '@/store/useAPIStore';
 import { AICToolCall } from '@/types/editables/chatTypes';
 import { useCallback, useState } from 'react';
 import SyntaxHighlighter, { SyntaxHighlighterProps } from 'react-syntax-highlighter';
 import { duotoneDark as vs2015 } from 'react-syntax-highlighter/dist/cjs/styles/prism';
 import { EditableContentMessage } from './EditableContentMessage';
 
+// References to outputs kept in the blob store of the project, see backend/aiconsole/core/blobs/blob_store.py
+const BLOB_REFERENCE_RE = /!\[([\w.+-]+\/[\w.+-]+)\]\(\/api\/blobs\/([0-9a-f]{64}(?:\.[a-z0-9]+)?)\)/g;
+
+type OutputPart = { type: 'text'; text: string } | { type: 'blob'; mediaType: string; name: string };
+
+function splitBlobReferences(output: string): OutputPart[] {
+  const parts: OutputPart[] = [];
+  let start = 0;
+
+  for (const match of output.matchAll(BLOB_REFERENCE_RE)) {
+    const index = match.index ?? 0;
+    if (index > start) {
+      parts.push({ type: 'text', text: output.slice(start, index) });
+    }
+    parts.push({ type: 'blob', mediaType: match[1], name: match[2] });
+    start = index + match[0].length;
+  }
+
+  if (start < output.length || parts.length === 0) {
+    parts.push({ type: 'text', text: output.slice(start) });
+  }
+
+  return parts;
+}
+
 interface OutputProps {
   tool_call: AICToolCall;
   syntaxHighlighterCustomStyles?: SyntaxHighlighterProps['style'];
@@ -60,12 +86,36 @@ export function ToolOutput({ tool_call, syntaxHighlighterCustomStyles }: OutputP
         isEditing={isEditing}
         setIsEditing={setIsEditing}
       >
-        <SyntaxHighlighter
-          style={syntaxHighlighterCustomStyles || vs2015}
-          children={tool_call.output || ''}
-          language={'text'}
-          className="basis-0 flex-grow rounded-md p-2 overflow-auto"
-        />
+        <div className="flex flex-col basis-0 flex-grow gap-2">
+          {splitBlobReferences(tool_call.output || '').map((part, index) =>
+            part.type === 'text' ? (
+              <SyntaxHighlighter
+                key={index}
+                style={syntaxHighlighterCustomStyles || vs2015}
+                children={part.text}
+                language={'text'}
+                className="rounded-md p-2 overflow-auto"
+              />
+            ) : part.mediaType.startsWith('image/') ? (
+              <img
+                key={index}
+                src={`${getBaseURL()}/api/blobs/${part.name}`}
+                alt={part.mediaType}
+                className="max-w-full rounded-md self-start"
+              />
+            ) : (
+              <a
+                key={index}
+                href={`${getBaseURL()}/api/blobs/${part.name}`}
+                target="_blank"
+                rel="noreferrer"
+                className="text-primary hover:underline self-start"
+              >
+                Full output ({part.mediaType})
+              </a>
+            ),
+          )}
+        </div>
       </EditableContentMessage>
     </div>
   );
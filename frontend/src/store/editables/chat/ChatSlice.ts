@@ -21,14 +21,25 @@ import { Chat } from '@/types/editables/chatTypes';
 import { useEditablesStore } from '../useEditablesStore';
 import { ChatStore } from './useChatStore';
 
+// Mutation stream of the open chat and the seq of the last mutation applied to it
+export type ChatStreamPosition = {
+  streamId: string;
+  seq: number;
+};
+
 export type ChatSlice = {
   chat?: Chat;
+  chatStreamPosition?: ChatStreamPosition;
+  // Id of the oldest loaded message group if the chat has older ones that are not loaded yet
+  chatCursor?: string;
+  isFetchingOlderMessageGroups: boolean;
   lastUsedChat?: Chat;
   isChatLoading: boolean;
   isChatOptionsExpanded: boolean;
   setLastUsedChat: (chat?: Chat) => void;
   setChat: (chat: Chat) => void;
   renameChat: (newChat: Chat) => Promise<void>;
+  fetchOlderMessageGroups: () => Promise<void>;
   setIsChatLoading: (isLoading: boolean) => void;
   setIsChatOptionsExpanded: (isExpanded: boolean) => void;
 };
@@ -36,6 +47,9 @@ export type ChatSlice = {
 export const createChatSlice: StateCreator<ChatStore, [], [], ChatSlice> = (set, get) => ({
   isChatLoading: false,
   chat: undefined,
+  chatStreamPosition: undefined,
+  chatCursor: undefined,
+  isFetchingOlderMessageGroups: false,
   agent: undefined,
   lastUsedChat: undefined,
   isChatOptionsExpanded: true,
@@ -53,6 +67,19 @@ export const createChatSlice: StateCreator<ChatStore, [], [], ChatSlice> = (set,
     //If it's chat we need to reload chat history because there is no autoreload on change for chats
     useEditablesStore.getState().initChatHistory();
   },
+  fetchOlderMessageGroups: async () => {
+    const { chat, chatCursor, isFetchingOlderMessageGroups } = get();
+    if (!chat || !chatCursor || isFetchingOlderMessageGroups) {
+      return;
+    }
+
+    set({ isFetchingOlderMessageGroups: true });
+    try {
+      await EditablesAPI.fetchOlderMessageGroups(chat.id, chatCursor);
+    } finally {
+      set({ isFetchingOlderMessageGroups: false });
+    }
+  },
   setIsChatLoading: (isLoading: boolean) => {
     set({ isChatLoading: isLoading });
   },